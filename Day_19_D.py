@@ -9,7 +9,6 @@ Main Application Module: Streamlit UI entry point with Feedback, Regeneration, a
 import streamlit as st
 import datetime
 import logging
-import json 
 import time
 
 # --- 1. UI Setup (MUST be the first Streamlit command) ---
@@ -32,10 +31,11 @@ from .app.Day_19_C import (
 # Note: Assuming Day_19_A.py is the config file
 from .app.Day_19_A import (
     BASE_URL, SUGGESTED_FAQS, UNCLEAR_QUERY_RESPONSE, FAQ_SEED_QUESTIONS, FINAL_FALLBACK_MESSAGE,
-    DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES, LANGUAGE_FAIL_MESSAGE, LEAD_SCORE_WEIGHTS, LEAD_TRIGGER_KEYWORDS
+    DEFAULT_LANGUAGE, SUPPORTED_LANGUAGES, LANGUAGE_FAIL_MESSAGE, LEAD_SCORE_WEIGHTS
 )
 from .app.Day_19_E import log_chatbot_interaction, get_all_indexed_urls, update_cached_answer, log_lead_data
 from .app.language_middleware import LanguageTranslator # New Import
+from .app.keyword_matcher import LEAD_TRIGGER_MATCHER
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -384,7 +384,7 @@ if st.session_state.faq_submitted_query is not None:
 if prompt_to_process:
     
     # 1. Immediate Keyword Check (Pop-up on first high-intent question)
-    if not st.session_state.lead_logged and any(k in prompt_to_process.lower() for k in LEAD_TRIGGER_KEYWORDS):
+    if not st.session_state.lead_logged and LEAD_TRIGGER_MATCHER.matches(prompt_to_process):
         st.session_state.show_lead_form = True
         # If triggered by a hard keyword, only trigger the form and rerun, don't process the answer yet.
         # This gives the user the immediate chance to fill the form.
@@ -524,10 +524,8 @@ if st.session_state.messages and st.session_state.messages[-1]["role"] == "user"
         if st.session_state.debug_mode and top_k_metadata_list:
              with st.expander("🔎 RAG Debug (Top K Metadata)"):
                  for i, meta in enumerate(top_k_metadata_list):
-                     try:
-                         headings_list = json.loads(meta.get('headings', '[]'))
-                     except:
-                         headings_list = ["Error parsing headings"]
+                     # Headings are pre-parsed by the chunk store (app/chunk_store.py)
+                     headings_list = list(meta.get('headings', ()))
                          
                      st.json({
                          "Rank": i + 1, "Distance": meta.get('distance'),
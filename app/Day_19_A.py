@@ -33,14 +33,52 @@ CRAWL_DOMAIN = "leanextconsulting.com"
 CRAWLER_CACHE_DIR = "crawler_cache"
 if not os.path.exists(CRAWLER_CACHE_DIR):
     os.makedirs(CRAWLER_CACHE_DIR)
+CRAWL_REQUEST_TIMEOUT_SECONDS = 15
+# Raw HTML + text sidecars in crawler_cache/ (app/page_cache.py): "zstd" needs the
+# optional `zstandard` package and falls back to "gzip" without it
+CRAWL_CACHE_COMPRESSION = os.getenv("CRAWL_CACHE_COMPRESSION", "zstd")
+CRAWL_MAX_CONNECTIONS = 8      # Async crawler pool size (app/crawler.py)
+CRAWL_HOST_BURST = 2           # Requests a host may get back-to-back; SCRAPE_DELAY_SECONDS is the steady rate
+# Incremental re-index (python -m app.indexer): validators + text hashes per canonical URL
+CRAWL_MANIFEST_PATH = os.path.join(CRAWLER_CACHE_DIR, "manifest.json")
+CRAWL_SUMMARY_PATH = os.path.join(CRAWLER_CACHE_DIR, "last_run_summary.json")
+INDEX_EMBED_BATCH_SIZE = 64   # Chunks per encode() + upsert call
+INDEX_HTML_READ_CHARS = 64 * 1024   # Cached HTML is parsed in pieces of this size
+# Index-time de-duplication (app/dedup.py)
+INDEX_BOILERPLATE_MIN_PAGES = 3       # A block on at least this many pages ...
+INDEX_BOILERPLATE_MIN_SHARE = 0.5     # ... and on this share of all pages is boilerplate
+INDEX_NEAR_DUP_JACCARD = 0.85         # Estimated shingle Jaccard at which a chunk is a near-duplicate
+INDEX_MINHASH_PERMUTATIONS = 64
+INDEX_MINHASH_BANDS = 16              # LSH bands (64 / 16 = 4 rows per band)
 
 # --- CACHE and LOGGING Configuration ---
 CACHE_DB_PATH = "chat_cache.db"
-CACHE_MATCH_THRESHOLD = 0.85
+CACHE_MATCH_THRESHOLD = 0.85   # Cosine similarity needed for a semantic cache hit
+CACHE_EMBEDDINGS_PATH = "chat_cache.embeddings"  # Append-only vectors of cached questions
+CACHE_FOLLOWUP_MAX_WORDS = 3   # With chat history, queries this short are follow-ups and bypass the cache
+# Offline FAQ answer pre-generation (python -m app.faq_pregen)
+FAQ_PREGEN_WORKERS = 4
+FAQ_PREGEN_REQUESTS_PER_MINUTE = 30   # Gemini calls/min across all workers
 # USER_QUERY_DB_PATH is deprecated, using a single unified log for analytics
 ANALYTICS_DB_PATH = "chatbot_logs.db" 
 RELATED_QS_LIMIT = 5
 
+# --- SERVING / CONCURRENCY Configuration ---
+# The RAG pipeline is synchronous (Chroma + sentence-transformers), so /chat runs it
+# on a dedicated thread pool. Requests beyond workers + queue are rejected with 503.
+CHAT_EXECUTOR_WORKERS = int(os.getenv("CHAT_EXECUTOR_WORKERS", "4"))
+CHAT_EXECUTOR_MAX_QUEUE = int(os.getenv("CHAT_EXECUTOR_MAX_QUEUE", "16"))
+CHAT_RETRY_AFTER_SECONDS = 2   # Minimum Retry-After hint sent with a 503
+# Threads for running independent stages of one turn concurrently (Day_19_C)
+PIPELINE_STAGE_WORKERS = int(os.getenv("PIPELINE_STAGE_WORKERS", "8"))
+
+# --- CONVERSATION SESSIONS (server-side history keyed by the widget's session_id) ---
+SESSION_TTL_SECONDS = 30 * 60
+SESSION_MAX_SESSIONS = 5000        # LRU eviction beyond this
+SESSION_MAX_TURNS = 3              # Prior turns kept per session (same as the lead-score cap)
+SESSION_HISTORY_WEIGHT = 0.3       # Share of the retrieval vector given to prior turns
+SESSION_HISTORY_DECAY = 0.5        # Each older turn counts this much of the next newer one
+
 # --- RAG and Embedding Parameters ---
 CHUNK_SIZE = 300               
 OVERLAP = 80                   
@@ -49,12 +87,61 @@ EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
 AUTOCOMPLETE_K = 10
 QUERY_PREDICTION_THRESHOLD = 0.35 
 UNCLEAR_QUERY_THRESHOLD = 0.65  
+# Prompt context packing: merge overlapping chunks, drop near-duplicates, stay in budget
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MIN_OVERLAP_WORDS = 5       # Shared words needed to stitch two chunks of a page
+CONTEXT_DUPLICATE_JACCARD = 0.8     # 3-word-shingle similarity treated as a duplicate
 FAQ_COLLECTION_NAME = "leanext_faq_suggestions" # New collection for FAQ index
 
+# KB search backend behind Day_19_B.search_leanext_kb():
+#   "chroma" -> collection.query() (HNSW)
+#   "numpy"  -> whole collection held in RAM, exact top-k via one mat-vec product
+#   "mmap"   -> same exact search over the exported read-only index file
+#               (python -m app.mmap_index), shared by all gunicorn workers
+KB_SEARCH_BACKEND = os.getenv("KB_SEARCH_BACKEND", "chroma")
+
+# Hybrid retrieval: BM25 over the same chunks fused with the vector ranking (RRF)
+KB_HYBRID_SEARCH = os.getenv("KB_HYBRID_SEARCH", "1") == "1"
+KB_HYBRID_CANDIDATES = 20     # Candidates taken from each ranking before fusion
+KB_RRF_K = 60
+# While the embedding model is still loading, a BM25-only hit reports distance
+# 1 - coverage (share of the query's term weight it matched; see
+# BM25Index.coverage), so UNCLEAR_QUERY_THRESHOLD still rejects weak matches.
+# Hits below this coverage are dropped outright.
+KB_LEXICAL_MIN_COVERAGE = 0.2
+
+# Versioned KB artifacts (app/kb_versions.py): every indexer run publishes an
+# immutable app/kb_index_versions/<version>/ and switches the CURRENT pointer; running
+# servers pick it up in the background and hot-swap without a restart.
+KB_VERSIONS_DIR = os.path.join(os.path.dirname(__file__), "kb_index_versions")
+KB_VERSIONS_KEEP = 3             # Published versions kept on disk (older ones are pruned)
+KB_VERSION_POLL_SECONDS = float(os.getenv("KB_VERSION_POLL_SECONDS", "30"))  # 0 disables polling
+KB_ADMIN_TOKEN = os.getenv("KB_ADMIN_TOKEN")  # X-Admin-Token for POST /admin/kb/reload; unset disables it
+
+# Query embeddings are micro-batched across concurrent requests: the first query
+# waits at most EMBED_BATCH_MAX_WAIT_MS for company before one forward pass.
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# Process-wide LRU of query embeddings shared by KB, FAQ and answer-cache lookups
+EMBED_CACHE_MAX_ENTRIES = 4096
+EMBED_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
 # --- LLM Models and API Configuration ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") 
 MODEL_CLOUD = "gemini-2.5-flash"
 API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_CLOUD}:generateContent?key={GEMINI_API_KEY}"
+# Server-sent-events variant used by the streaming /chat/stream endpoint
+API_STREAM_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_CLOUD}:streamGenerateContent?alt=sse&key={GEMINI_API_KEY}"
+
+# Shared keep-alive HTTP client for every Gemini call (app/gemini_client.py)
+GEMINI_HTTP_MAX_CONNECTIONS = 20
+GEMINI_HTTP_KEEPALIVE_CONNECTIONS = 10
+GEMINI_HTTP_KEEPALIVE_EXPIRY = 60.0     # seconds an idle connection is kept open
+GEMINI_HTTP2 = os.getenv("GEMINI_HTTP2", "1") == "1"   # used only if the 'h2' package is installed
+GEMINI_CONNECT_TIMEOUT = 5.0
+GEMINI_MAX_RETRIES = 2                  # retries on 429 / 5xx / transport errors
+GEMINI_RETRY_BACKOFF_SECONDS = 0.5      # base for exponential backoff with full jitter
 
 # --- FEATURE 1: MULTILINGUAL CONFIGURATION ---
 # Supported languages for auto-detection and translation
@@ -66,6 +153,13 @@ LANGUAGE_MAP = {
     "kn": "Kannada", "bn": "Bengali", "gu": "Gujarati", "default": "English"
 }
 LANGUAGE_FAIL_MESSAGE = "Sorry, I encountered an issue with language translation. Please try again in English or another supported language."
+# Offline detection: a script must cover this share of the letters to win
+SCRIPT_DETECTION_MIN_SHARE = 0.3
+# Translations are cached on (text, src, dest): in-memory LRU in front of SQLite
+TRANSLATION_CACHE_DB_PATH = "translation_cache.db"
+TRANSLATION_CACHE_MAX_ENTRIES = 2048
+# Canned responses pre-translated per language (python -m app.canned_translations)
+CANNED_TRANSLATIONS_PATH = os.path.join(os.path.dirname(__file__), "canned_translations.json")
 
 # --- FEATURE 2: ANALYTICS API CONFIGURATION ---
 ANALYTICS_API_KEY = os.getenv("ANALYTICS_API_KEY")
@@ -89,6 +183,11 @@ LEAD_TRIGGER_KEYWORDS = [
     "courses", "software solutions", "IMS", "consulting services", "opex", "six sigma", "LEAN"
 ]
 
+# --- Local spell correction (skips the Gemini cleaning call when confident) ---
+SPELL_MAX_EDIT_DISTANCE = 2
+SPELL_CONFIDENCE_THRESHOLD = 0.8   # Min per-word confidence to trust the local result
+SPELL_MIN_WORD_LENGTH = 4          # Unknown words this short are never corrected locally
+
 # --- Prompts and Fallbacks ---
 GEMINI_RAG_SYSTEM_PROMPT = (
     "You are a helpful, professional chatbot for Leanext Consulting. "
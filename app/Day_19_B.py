@@ -7,14 +7,53 @@ Key ideas:
 - Always reuse the persisted DB at app/chroma_db_leanext.
 - Provide a simple search_leanext_kb(query, n_results=5) helper
   that other modules (Day_19_D, FastAPI, etc.) can call.
+- KB_SEARCH_BACKEND picks who answers it: Chroma's .query(), the
+  in-memory NumPy index (app/vector_index.py) or the memory-mapped index
+  file (app/mmap_index.py). All return Chroma's shape.
+- get_kb_search_collection() gives the pipeline (Day_19_C) a collection-like
+  handle backed by whichever of those is configured: the live KBSnapshot
+  (app/kb_versions.py), which also carries the BM25 index, chunk store and
+  version id of the same KB version. New versions are swapped in without a
+  restart; a request keeps the snapshot it started with. The "numpy" and
+  "mmap" backends load every version from its published artifact; "chroma"
+  cannot see an out-of-process re-index until restarted.
+- With KB_HYBRID_SEARCH, a BM25 index over the same chunks is fused with
+  the vector ranking (app/lexical_index.py); until the embedding model has
+  loaded, BM25 answers alone.
+- load_or_build_knowledge_base() is the one entry point that may write:
+  it runs the incremental indexer (app/indexer.py) when asked to, or when
+  there is no KB yet.
 """
 
 import os
+import threading
 from typing import Any, Dict, List, Optional
 
+import numpy as np
 from chromadb import PersistentClient
 from chromadb.api.models.Collection import Collection
 
+from app.Day_19_A import (
+    COLLECTION_NAME,
+    KB_SEARCH_BACKEND,
+    KB_HYBRID_SEARCH,
+    KB_HYBRID_CANDIDATES,
+    KB_RRF_K,
+    KB_LEXICAL_MIN_COVERAGE,
+)
+from app.embedding_batcher import (
+    embed_query,
+    embed_query_vector,
+    embed_query_vectors,
+    is_embedding_model_ready,
+    warm_up_embedding_model,
+)
+from app.chunk_store import ChunkStore
+from app.kb_versions import KBSnapshot, KBVersionManager, kb_version_index_path
+from app.lexical_index import BM25Index, reciprocal_rank_fusion
+from app.mmap_index import MmapVectorIndex
+from app.vector_index import InMemoryVectorIndex
+
 
 # -------------------------------------------------------------------
 # 1. Resolve the *persisted* Chroma path inside the app package
@@ -26,9 +65,17 @@ CHROMA_PERSIST_DIRECTORY = os.path.join(
     "chroma_db_leanext"
 )
 
+# Exported by `python -m app.mmap_index`; opened read-only by every worker
+KB_MMAP_INDEX_PATH = os.path.join(
+    os.path.dirname(__file__),  # app/
+    "kb_index.lbx"
+)
+
 
 _client: Optional[PersistentClient] = None
 _kb_collection: Optional[Collection] = None
+_kb_version_manager: Optional[KBVersionManager] = None
+_kb_version_manager_lock = threading.Lock()
 
 
 # -------------------------------------------------------------------
@@ -92,10 +139,214 @@ def get_kb_collection() -> Collection:
     return _kb_collection
 
 
+def load_or_build_knowledge_base(reindex: bool = False, force: bool = False) -> Optional[Collection]:
+    """
+    Return the KB collection, building it with the incremental indexer
+    (app/indexer.py) when none exists yet or when `reindex` is set.
+    Returns None if the KB can neither be loaded nor built.
+    """
+    global _kb_collection
+
+    if not reindex:
+        try:
+            collection = get_kb_collection()
+            if collection.count() > 0:
+                return collection
+        except RuntimeError as e:
+            print(f"[Day_19_B] {e} Building the KB now.")
+
+    # Imported here: the indexer pulls in the crawler and the HTML extraction
+    # pipeline, which serving never needs
+    from app.indexer import run_incremental_index
+
+    try:
+        os.makedirs(CHROMA_PERSIST_DIRECTORY, exist_ok=True)
+        client = get_chroma_client()
+        existing = {col.name for col in client.list_collections()}
+        if existing & {"leanext_kb", "leanext_main", "leanext_docs"}:
+            collection = _pick_kb_collection(client)
+        else:
+            collection = client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+        run_incremental_index(collection, force=force)
+    except Exception as e:
+        print(f"[Day_19_B] Failed to build the knowledge base: {e}")
+        return None
+
+    # Swap in a snapshot of the new chunks; requests in flight finish on the old one
+    _kb_collection = collection
+    get_kb_version_manager().check_for_update(force=True)
+    return collection
+
+
+def _load_kb_snapshot(version: Optional[str] = None) -> KBSnapshot:
+    """
+    Build a snapshot for the configured KB_SEARCH_BACKEND. "mmap" maps the
+    published artifact of `version` (KB_MMAP_INDEX_PATH if nothing has been
+    published yet); "numpy" copies that artifact into RAM (the KB collection
+    if nothing has been published); "chroma" queries this process's
+    collection itself.
+    """
+    if KB_SEARCH_BACKEND == "mmap":
+        path = kb_version_index_path(version) if version else KB_MMAP_INDEX_PATH
+        return KBSnapshot(version, vector_index=MmapVectorIndex.open(path), name="leanext_kb (mmap)")
+    if KB_SEARCH_BACKEND == "numpy":
+        if version:
+            published = MmapVectorIndex.open(kb_version_index_path(version))
+            index = InMemoryVectorIndex(
+                ids=list(published.ids),
+                embeddings=np.array(published.matrix),
+                documents=list(published.documents),
+                metadatas=list(published.metadatas),
+                space=published.space,
+            )
+        else:
+            index = InMemoryVectorIndex.from_collection(get_kb_collection())
+        return KBSnapshot(version, vector_index=index, name="leanext_kb (numpy)")
+    collection = get_kb_collection()
+    return KBSnapshot(collection=collection, name=collection.name)
+
+
+def get_kb_version_manager() -> KBVersionManager:
+    """Return the singleton manager of the live KB snapshot."""
+    global _kb_version_manager
+
+    if _kb_version_manager is None:
+        with _kb_version_manager_lock:
+            if _kb_version_manager is None:
+                # mmap and numpy load published artifacts, so they follow CURRENT. A
+                # Chroma client keeps serving the HNSW index it opened, so "chroma"
+                # only swaps after an in-process re-index (the same client wrote it).
+                _kb_version_manager = KBVersionManager(
+                    _load_kb_snapshot, versioned=KB_SEARCH_BACKEND in ("mmap", "numpy")
+                )
+
+    return _kb_version_manager
+
+
+def get_kb_snapshot() -> KBSnapshot:
+    """The live KB snapshot. Hold on to it for a whole request to stay on one version."""
+    return get_kb_version_manager().current()
+
+
+def get_kb_vector_index() -> InMemoryVectorIndex:
+    """
+    Return the exact-search index of the live snapshot (NumPy / mmap backends).
+    With "chroma" a NumPy copy of the collection is built on each call.
+    """
+    snapshot = get_kb_snapshot()
+    if snapshot.vector_index is not None:
+        return snapshot.vector_index
+    return InMemoryVectorIndex.from_collection(get_kb_collection())
+
+
+def get_kb_search_collection() -> KBSnapshot:
+    """
+    Collection-like handle (.query/.count) for the configured KB_SEARCH_BACKEND:
+    the live snapshot, which also carries its BM25 index and chunk store.
+    """
+    return get_kb_snapshot()
+
+
+def get_kb_lexical_index() -> BM25Index:
+    """Return the BM25 index over the chunks of the live snapshot."""
+    return get_kb_snapshot().lexical_index
+
+
+def get_kb_index_version() -> str:
+    """
+    Short fingerprint of the KB contents (chunk ids + texts). Anything generated
+    from the KB (e.g. pre-generated FAQ answers) is tagged with it.
+    """
+    return get_kb_snapshot().version
+
+
+def get_kb_chunk_store() -> ChunkStore:
+    """Return the store of pre-parsed chunk metadata (headings decoded once) of the live snapshot."""
+    return get_kb_snapshot().chunk_store
+
+
+def _empty_result(num_queries: int = 1) -> Dict[str, Any]:
+    return {
+        "ids": [[] for _ in range(num_queries)],
+        "documents": [[] for _ in range(num_queries)],
+        "metadatas": [[] for _ in range(num_queries)],
+        "distances": [[] for _ in range(num_queries)],
+    }
+
+
 # -------------------------------------------------------------------
 # 3. Public search helpers
 # -------------------------------------------------------------------
 
+def search_kb_hybrid(
+    query: str,
+    n_results: int = 5,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Any = None,
+    query_vector: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    BM25 + vector retrieval fused with reciprocal rank fusion, in Chroma's shape.
+    `query_vector` replaces the embedding of `query` for the vector side
+    (e.g. a query blended with conversation history); BM25 always uses the text.
+
+    Distances stay meaningful for the callers' thresholds: a hit found by the
+    vector search keeps its own distance; a BM25-only hit gets the largest
+    vector-candidate distance (its true distance is at least that). While the
+    embedding model is still loading, BM25 answers alone: a hit reports
+    1 - its query coverage, and hits under KB_LEXICAL_MIN_COVERAGE are dropped.
+    """
+    if not query or not query.strip():
+        return _empty_result()
+
+    snapshot = collection if isinstance(collection, KBSnapshot) else get_kb_snapshot()
+    lexical = snapshot.lexical_index
+    lexical_hits = lexical.search(query, n_results=KB_HYBRID_CANDIDATES, where=where)
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    for row, _score in lexical_hits:
+        entries[lexical.ids[row]] = {
+            "document": lexical.documents[row],
+            "metadata": lexical.metadatas[row] or {},
+            "distance": None,
+        }
+    lexical_ranking = [lexical.ids[row] for row, _score in lexical_hits]
+
+    if not is_embedding_model_ready():
+        warm_up_embedding_model()
+        ranked = []
+        for row, score in lexical_hits[:n_results]:
+            coverage = lexical.coverage(query, score)
+            if coverage >= KB_LEXICAL_MIN_COVERAGE:
+                ranked.append((lexical.ids[row], 1.0 - coverage))
+    else:
+        dense = (collection or snapshot).query(
+            query_embeddings=[query_vector.tolist() if query_vector is not None else embed_query(query)],
+            n_results=max(n_results, KB_HYBRID_CANDIDATES),
+            where=where or {},
+            include=["documents", "metadatas", "distances"],
+        )
+        dense_ids = dense["ids"][0] if dense.get("ids") else []
+        for _id, doc, meta, dist in zip(
+            dense_ids, dense["documents"][0], dense["metadatas"][0], dense["distances"][0]
+        ):
+            entries[_id] = {"document": doc, "metadata": meta, "distance": dist}
+
+        floor = max((e["distance"] for e in entries.values() if e["distance"] is not None), default=1.0)
+        fused = reciprocal_rank_fusion([dense_ids, lexical_ranking], k=KB_RRF_K)[:n_results]
+        ranked = [
+            (_id, entries[_id]["distance"] if entries[_id]["distance"] is not None else floor)
+            for _id, _score in fused
+        ]
+
+    return {
+        "ids": [[_id for _id, _ in ranked]],
+        "documents": [[entries[_id]["document"] for _id, _ in ranked]],
+        "metadatas": [[entries[_id]["metadata"] for _id, _ in ranked]],
+        "distances": [[dist for _, dist in ranked]],
+    }
+
+
 def search_leanext_kb(
     query: str,
     n_results: int = 5,
@@ -103,6 +354,8 @@ def search_leanext_kb(
 ) -> Dict[str, Any]:
     """
     Low-level wrapper around Chroma's .query().
+    The query vector comes from the shared micro-batcher, so concurrent
+    searches share one embedding forward pass.
 
     Returns the *raw* Chroma response:
       {
@@ -113,12 +366,20 @@ def search_leanext_kb(
       }
     """
     if not query or not query.strip():
-        return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        return _empty_result()
+
+    if KB_HYBRID_SEARCH:
+        return search_kb_hybrid(query, n_results=n_results, where=where)
+
+    if KB_SEARCH_BACKEND in ("numpy", "mmap"):
+        return get_kb_vector_index().query(
+            embed_query_vector(query), n_results=n_results, where=where
+        )
 
     collection = get_kb_collection()
 
     result = collection.query(
-        query_texts=[query],
+        query_embeddings=[embed_query(query)],
         n_results=n_results,
         where=where or {},
         include=["documents", "metadatas", "distances"],
@@ -127,6 +388,31 @@ def search_leanext_kb(
     return result
 
 
+def search_leanext_kb_batch(
+    queries: List[str],
+    n_results: int = 5,
+    where: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Same as search_leanext_kb() for several queries at once.
+    Row i of every field belongs to queries[i].
+    """
+    if not queries:
+        return _empty_result(0)
+
+    vectors = embed_query_vectors(queries)
+
+    if KB_SEARCH_BACKEND in ("numpy", "mmap"):
+        return get_kb_vector_index().query_batch(vectors, n_results=n_results, where=where)
+
+    return get_kb_collection().query(
+        query_embeddings=[v.tolist() for v in vectors],
+        n_results=n_results,
+        where=where or {},
+        include=["documents", "metadatas", "distances"],
+    )
+
+
 def search_leanext_kb_formatted(
     query: str,
     n_results: int = 5,
@@ -2,20 +2,42 @@
 RAG Engine Module: Contains all core business logic for processing a user query,
 including cleaning, retrieval from ChromaDB, and generation via the Gemini API.
 """
-import requests
-import streamlit as st
-import json
 import time
 import logging
+from concurrent.futures import CancelledError, ThreadPoolExecutor
 # FIX: Update imports to Day_18_A
 from .Day_19_A import (
-    GEMINI_API_KEY, API_URL, TOP_K_CHUNKS, AUTOCOMPLETE_K, QUERY_PREDICTION_THRESHOLD, 
+    GEMINI_API_KEY, TOP_K_CHUNKS, AUTOCOMPLETE_K, QUERY_PREDICTION_THRESHOLD, 
     CLEANING_SYSTEM_PROMPT, FINAL_FALLBACK_MESSAGE, GEMINI_RAG_SYSTEM_PROMPT, 
     SMALL_TALK_TRIGGERS, UNCLEAR_QUERY_THRESHOLD, RELATED_QS_LIMIT, BASE_URL, FAQ_COLLECTION_NAME,
-    LANGUAGE_FAIL_MESSAGE, DEFAULT_LANGUAGE, UNCLEAR_QUERY_RESPONSE, LEAD_SCORE_WEIGHTS, LEAD_TRIGGER_KEYWORDS
+    DEFAULT_LANGUAGE, UNCLEAR_QUERY_RESPONSE, LEAD_SCORE_WEIGHTS,
+    PIPELINE_STAGE_WORKERS, KB_HYBRID_SEARCH
 )
 # FIX: Update imports to Day_18_E
 from .Day_19_E import get_cached_answer, save_answer_to_cache
+# Follow-ups that lean on the chat history are kept out of the shared cache
+from .semantic_cache import is_history_dependent
+# Query embeddings are micro-batched across concurrent requests
+from .embedding_batcher import embed_query, embed_query_vector, is_embedding_model_ready
+# Hybrid BM25 + vector retrieval over the KB
+from .Day_19_B import search_kb_hybrid, get_kb_chunk_store
+# A KB snapshot pins one index version for the whole turn
+from .kb_versions import KBSnapshot
+# All Gemini calls share one pooled keep-alive client (retries + jitter)
+from .gemini_client import extract_text, generate_content, stream_generate_content
+# Independent pipeline stages run concurrently on a shared pool
+from .stage_graph import StageGraph
+# Local typo correction that lets most queries skip the Gemini cleaning call
+from .spell_corrector import get_spell_corrector
+# Concurrent duplicate turns share one pipeline run
+from .single_flight import get_answer_flight
+# Precompiled whole-word matchers for small talk / lead trigger keywords
+from .keyword_matcher import SMALL_TALK_MATCHER, LEAD_TRIGGER_MATCHER
+# Budgeted prompt context (merges overlapping chunks, drops duplicates)
+from .context_packer import get_context_packer
+# Server-side sessions: prior turns' embeddings steer retrieval
+from .session_store import combine_with_history
+from .embedding_cache import normalize_text
 # NEW: Import the language middleware
 from .language_middleware import LanguageTranslator
 
@@ -25,48 +47,71 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Global translator instance
 language_translator = LanguageTranslator()
 
+# Shared pool for concurrent pipeline stages (see _build_turn_graph)
+_STAGE_POOL = ThreadPoolExecutor(max_workers=PIPELINE_STAGE_WORKERS, thread_name_prefix="rag-stage")
+
 
 def check_small_talk(query):
     """Checks if the *English* query is a basic small talk phrase."""
-    normalized_query = query.lower()
-    for key, response in SMALL_TALK_TRIGGERS.items():
-        if key in normalized_query:
-            return response
-    return None
+    trigger = SMALL_TALK_MATCHER.first(query)
+    return SMALL_TALK_TRIGGERS[trigger] if trigger else None
 
-def clean_query_with_gemini(raw_query):
-    """Stage 0: Uses Gemini to correct spelling and grammar (NLP Enhancement)."""
+def clean_query_with_gemini(raw_query, before_gemini=None):
+    """
+    Stage 0: Uses Gemini to correct spelling and grammar (NLP Enhancement).
+    `before_gemini()` runs right before the Gemini request, only when the
+    local corrector escalates (e.g. a batch job's rate limiter).
+    """
     # Note: This is called after translation to English, so it cleans the English query.
+    # Local symmetric-delete correction first; only low-confidence queries go to Gemini.
+    try:
+        locally_cleaned = get_spell_corrector().try_local(raw_query)
+    except Exception as e:
+        logging.warning(f"Local spell correction failed, escalating to Gemini: {e}")
+        locally_cleaned = None
+    if locally_cleaned is not None:
+        return locally_cleaned, None
+
     if not GEMINI_API_KEY: return raw_query, "[ERROR: API Key Missing for Cleaning]"
     payload = {"contents": [{ "parts": [{ "text": raw_query }] }], "systemInstruction": { "parts": [{ "text": CLEANING_SYSTEM_PROMPT }] }}
+    if before_gemini is not None:
+        before_gemini()
     try:
-        response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, data=json.dumps(payload), timeout=10)
-        response.raise_for_status() 
-        result = response.json()
+        result = generate_content(payload, timeout=10)
         candidates = result.get('candidates')
         if not candidates: return raw_query, "[WARNING: Gemini returned no candidates]"
-        cleaned_text = candidates[0].get('content', {}).get('parts', [{}])[0].get('text', raw_query).strip()
+        cleaned_text = extract_text(result, raw_query).strip()
         return cleaned_text, None
     except Exception as e:
          logging.error(f"Query Cleaning Failed: {e}")
          return raw_query, f"[ERROR: Query Cleaning Failed: {e}]"
 
 
-def retrieve_context(query, collection, is_autocomplete=False, history_queries=""):
+def retrieve_context(query, collection, is_autocomplete=False, history_queries="", history_vectors=None):
     """
     Retrieves the top K most relevant text chunks from ChromaDB using the *English* query.
     Returns combined_context, best_distance, and a list of top K metadata objects.
-    (Implementation remains the same as it handles English queries only)
+    With `history_vectors` (cached embeddings of a session's prior turns) the query
+    vector is blended with them instead of re-embedding "query | Previous Context: ...".
     """
     n_results = AUTOCOMPLETE_K if is_autocomplete else TOP_K_CHUNKS
-    effective_query = f"{query} | Previous Context: {history_queries}" if history_queries else query
+    query_vector = None
+    if history_vectors and is_embedding_model_ready():
+        query_vector = combine_with_history(embed_query_vector(query), history_vectors)
+        effective_query = query
+    else:
+        effective_query = f"{query} | Previous Context: {history_queries}" if history_queries else query
     
     default_metadata_list = []
     
     try:
-        results = collection.query(
-            query_texts=[effective_query], n_results=n_results, include=['documents', 'metadatas', 'distances']
-        )
+        if KB_HYBRID_SEARCH:
+            results = search_kb_hybrid(effective_query, n_results=n_results, collection=collection, query_vector=query_vector)
+        else:
+            embedding = query_vector.tolist() if query_vector is not None else embed_query(effective_query)
+            results = collection.query(
+                query_embeddings=[embedding], n_results=n_results, include=['documents', 'metadatas', 'distances']
+            )
     except Exception as e:
         logging.error(f"ChromaDB Retrieval Error: {e}")
         return None, 1.0, default_metadata_list 
@@ -76,13 +121,11 @@ def retrieve_context(query, collection, is_autocomplete=False, history_queries="
         
     top_k_results = []
     
-    for doc, meta, dist in zip(results['documents'][0], results['metadatas'][0], results['distances'][0]):
-        try:
-            meta['headings'] = json.loads(meta.get('headings', '[]'))
-        except json.JSONDecodeError:
-            meta['headings'] = []
-            
-        top_k_results.append({'document': doc, 'metadata': meta, 'distance': dist})
+    # Metadata comes from the pre-parsed chunk store (headings already decoded);
+    # the dicts returned by the search are never modified.
+    chunk_store = collection.chunk_store if isinstance(collection, KBSnapshot) else get_kb_chunk_store()
+    for chunk_id, doc, meta, dist in zip(results['ids'][0], results['documents'][0], results['metadatas'][0], results['distances'][0]):
+        top_k_results.append({'document': doc, 'metadata': chunk_store.lookup(chunk_id, meta), 'distance': dist})
         
     if is_autocomplete:
         unique_snippets = set()
@@ -95,13 +138,15 @@ def retrieve_context(query, collection, is_autocomplete=False, history_queries="
         return list(unique_snippets)[:5], 0.0, default_metadata_list 
 
     else:
-        context_list = []
-        for res in top_k_results:
-            source = res['metadata'].get('path', 'Unknown')
-            context_list.append(f"Source Page ({source}): {res['document']}")
-            
-        combined_context = "\n\n---\n\n".join(context_list)
-        best_distance = top_k_results[0]['distance']
+        packed = get_context_packer().pack(top_k_results)
+        logging.info(
+            f"Context packed: {packed.raw_tokens} -> {packed.packed_tokens} tokens "
+            f"(saved {packed.raw_tokens - packed.packed_tokens}; merged {packed.merged}, "
+            f"duplicates {packed.dropped_duplicates}, over budget {packed.dropped_budget})"
+        )
+        combined_context = packed.text
+        # Fused (hybrid) order is not distance order; the gate uses the closest hit
+        best_distance = min(res['distance'] for res in top_k_results)
         
         return combined_context, best_distance, [res['metadata'] for res in top_k_results]
 
@@ -118,7 +163,7 @@ def get_similar_faq_suggestions(query, faq_collection, limit=3):
     try:
         # Perform similarity search against the FAQ index
         results = faq_collection.query(
-            query_texts=[query], 
+            query_embeddings=[embed_query(query)], 
             n_results=limit, 
             include=['metadatas']
         )
@@ -165,12 +210,9 @@ def calculate_lead_score(query: str, history_queries: str, distance: float) -> f
     score += min(turn_count, 3) * weights["history_turn_score"]
     
     # 3. Keyword Trigger Score (Highest weight)
-    # Check current query for high-intent keywords
-    lower_query = query.lower()
-    for keyword in LEAD_TRIGGER_KEYWORDS:
-        if keyword in lower_query:
-            score += weights["keyword_score_trigger"]
-            break # Triggered, no need to check others
+    # Check current query for high-intent keywords (one pass, whole words)
+    if LEAD_TRIGGER_MATCHER.matches(query):
+        score += weights["keyword_score_trigger"]
 
     return score
 
@@ -184,7 +226,8 @@ def regenerate_answer(raw_query: str, chroma_collection, history_queries=""):
 
     # Handle translation failure
     if detected_lang_code.startswith("ERROR"):
-        return LANGUAGE_FAIL_MESSAGE, "Translation Error", 1.0, [], True, None, detected_lang_code.split('-')[1],0.0
+        failed_lang = detected_lang_code.split('-')[1]
+        return language_translator.failure_message(failed_lang), "Translation Error", 1.0, [], True, None, failed_lang, 0.0
 
     # 2. Clean English Query
     cleaned_english_question, _ = clean_query_with_gemini(english_query)
@@ -202,23 +245,8 @@ def regenerate_answer(raw_query: str, chroma_collection, history_queries=""):
         source = "Regen Failed (Unclear)"
     else:
         # 4. Generate English Answer
-        user_prompt = f"CONTEXT:\n---\n{context or 'Use company knowledge'}\n---\n\nUSER QUESTION: {cleaned_english_question}"
-        payload = {
-            "contents": [{ "parts": [{ "text": user_prompt }] }],
-            "systemInstruction": { "parts": [{ "text": GEMINI_RAG_SYSTEM_PROMPT }] },
-        }
-
-        try:
-            start = time.time()
-            response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, data=json.dumps(payload), timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            
-            final_english_answer = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', FINAL_FALLBACK_MESSAGE).strip()
-            source = f"Gemini API (Regenerated: {time.time()-start:.1f}s)"
-            
-        except Exception:
-            final_english_answer = FINAL_FALLBACK_MESSAGE
+        final_english_answer, source = generate_english_answer(context, cleaned_english_question, source_label="Regenerated")
+        if source == "Gemini Error":
             source = "Gemini Error (Regen)"
             
     # 5. Translate English Answer back to User's Language
@@ -234,91 +262,347 @@ def regenerate_answer(raw_query: str, chroma_collection, history_queries=""):
     # Returns the 7-tuple needed by Day_18_D.py's regeneration loop
     return translated_answer, source, distance, top_k_metadata_list, is_unclear, query_to_cache, detected_lang_code,lead_score
 
-def answer_query_with_cache_first(raw_query: str, chroma_collection, history_queries=""):
+def _build_rag_payload(context, cleaned_english_question):
+    """Gemini request body for grounded answer generation."""
+    user_prompt = f"CONTEXT:\n---\n{context or 'Use company knowledge'}\n---\n\nUSER QUESTION: {cleaned_english_question}"
+    return {
+        "contents": [{ "parts": [{ "text": user_prompt }] }],
+        "systemInstruction": { "parts": [{ "text": GEMINI_RAG_SYSTEM_PROMPT }] },
+    }
+
+
+def generate_english_answer(context, cleaned_english_question, source_label="Fetch"):
+    """Stage: one Gemini generateContent call. Returns (final_english_answer, source)."""
+    payload = _build_rag_payload(context, cleaned_english_question)
+
+    try:
+        start = time.time()
+        result = generate_content(payload, timeout=30)
+
+        final_english_answer = extract_text(result, FINAL_FALLBACK_MESSAGE).strip()
+        return final_english_answer, f"Gemini API ({source_label}: {time.time()-start:.1f}s)"
+
+    except Exception as e:
+        logging.error(f"Gemini generation failed: {e}")
+        return FINAL_FALLBACK_MESSAGE, "Gemini Error"
+
+
+def _build_turn_graph(raw_query, chroma_collection, history_queries, history_vectors=None):
     """
-    Implements the Multilingual Cache-First strategy.
-    Returns: translated_answer, source, distance, top_k_metadata_list, is_unclear, query_to_cache (always None here), detected_lang_code
+    Dependency graph of one cache-first turn:
+
+        translate ─┬─> cache
+                   ├─> clean ───────────┬─> retrieve ──> generate
+                   └─> retrieve_draft ··┘  (soft: only if cleaning changed nothing)
+
+    `retrieve_draft` speculatively retrieves with the uncleaned English query
+    while Gemini cleans it. It is a soft dependency of `retrieve`: reused (and
+    waited for) only when cleaning changed nothing, so retrieval drops off the
+    critical path for already-clean queries, and a changed query retrieves
+    right away instead of waiting for a draft it would discard. A cache hit
+    cancels whichever of `clean` / `retrieve_draft` has not started, and
+    cleaning skips its Gemini call if the hit is already known.
+    Stages are lazy: generation only runs once the caller asks for it.
     """
-    
+    def _retrieve(clean, translate):
+        cleaned_english_question = clean[0]
+        if cleaned_english_question.strip().lower() == translate[0].strip().lower():
+            return graph.future("retrieve_draft")
+        return retrieve_context(cleaned_english_question, chroma_collection, history_queries=history_queries, history_vectors=history_vectors)
+
+    def _clean(translate):
+        def _skip_if_cache_hit():
+            cache = graph.future("cache")
+            if cache.done() and not cache.cancelled() and cache.exception() is None and cache.result():
+                raise CancelledError("Cache hit; cleaning is not needed")
+        return clean_query_with_gemini(translate[0], before_gemini=_skip_if_cache_hit)
+
+    def _generate(clean, retrieve):
+        return generate_english_answer(retrieve[0], clean[0])
+
+    graph = StageGraph(_STAGE_POOL)
+    graph.add("translate", lambda: language_translator.to_english(raw_query))
+    graph.add("cache", lambda translate: get_cached_answer(translate[0], history_queries), deps=["translate"])
+    graph.add("clean", _clean, deps=["translate"])
+    graph.add("retrieve_draft", lambda translate: retrieve_context(translate[0], chroma_collection, history_queries=history_queries, history_vectors=history_vectors), deps=["translate"])
+    graph.add("retrieve", _retrieve, deps=["clean", "translate"])
+    graph.add("generate", _generate, deps=["clean", "retrieve"])
+    return graph
+
+
+def _session_history(session, history_queries):
+    """(history_queries, history_vectors) from a session with turns, else the caller's text history."""
+    if session is not None and len(session):
+        return session.history_text(), session.history_vectors()
+    return history_queries, None
+
+
+def _remember_turn(session, english_query):
+    """Append the turn to the session, embedding it once (a cache hit after retrieval)."""
+    if session is None:
+        return
+    vector = embed_query_vector(english_query) if is_embedding_model_ready() else None
+    session.add_turn(english_query, vector)
+
+
+def _index_version_of(collection):
+    """KB version the answer is generated against (None for a bare Chroma collection)."""
+    return collection.version if isinstance(collection, KBSnapshot) else None
+
+
+def _start_turn(raw_query, chroma_collection, history_queries, session):
+    """
+    Steps 1-2 shared by the blocking and the streaming turn: translation and
+    small talk. Returns (graph, english_query, detected_lang_code, history_queries, early_result);
+    `early_result` is the finished result tuple when the turn ends here.
+    """
+    history_queries, history_vectors = _session_history(session, history_queries)
+    graph = _build_turn_graph(raw_query, chroma_collection, history_queries, history_vectors)
+
     # 1. Translate Raw Query to English
-    english_query, detected_lang_code = language_translator.to_english(raw_query)
-    
+    english_query, detected_lang_code = graph.result("translate")
+
     # Handle translation failure
     if detected_lang_code.startswith("ERROR"):
-        return LANGUAGE_FAIL_MESSAGE, "Translation Error", 1.0, [], True, None, detected_lang_code.split('-')[1], 0.0
+        failed_lang = detected_lang_code.split('-')[1]
+        early = (language_translator.failure_message(failed_lang), "Translation Error", 1.0, [], True, None, failed_lang, 0.0)
+        return graph, english_query, failed_lang, history_queries, early
 
-    # 2. Check English Small Talk
+    # 2. Check English Small Talk (microseconds, no need to fan out first)
     smalltalk_response = check_small_talk(english_query)
     if smalltalk_response:
         # Translate small talk response back to user's language
         translated_smalltalk = language_translator.from_english(smalltalk_response, detected_lang_code)
-        return translated_smalltalk, "Small Talk Response", None, [], False, None, detected_lang_code, 0.0
+        early = (translated_smalltalk, "Small Talk Response", None, [], False, None, detected_lang_code, 0.0)
+        return graph, english_query, detected_lang_code, history_queries, early
+
+    return graph, english_query, detected_lang_code, history_queries, None
+
+
+def _flight_key(english_query, detected_lang_code, history_queries):
+    return (normalize_text(english_query), detected_lang_code, normalize_text(history_queries))
+
+
+def answer_query_with_cache_first(raw_query: str, chroma_collection, history_queries="", session=None):
+    """
+    Implements the Multilingual Cache-First strategy.
+    Independent stages run concurrently (see _build_turn_graph): the cache lookup,
+    Gemini cleaning and a draft retrieval all start as soon as translation finishes.
+    Concurrent turns with the same English query, language and history are
+    coalesced after translation: one runs the pipeline, the rest share its result.
+    With a `session` (app/session_store.py) its recorded turns replace `history_queries`
+    and this turn is added to it.
+    Returns: translated_answer, source, distance, top_k_metadata_list, is_unclear, query_to_cache (always None here), detected_lang_code, lead_score
+    """
+    graph, english_query, detected_lang_code, history_queries, early = _start_turn(
+        raw_query, chroma_collection, history_queries, session
+    )
+    if early:
+        return early
+
+    result = get_answer_flight().do(
+        _flight_key(english_query, detected_lang_code, history_queries),
+        lambda: _answer_after_translation(graph, detected_lang_code, history_queries, _index_version_of(chroma_collection)),
+    )
+
+    is_unclear = result[4]
+    if not is_unclear:
+        _remember_turn(session, english_query)
+    return result
+
 
-    # 3. Check English Cache
-    cached = get_cached_answer(english_query)
+def _prepare_generation(graph, detected_lang_code, history_queries):
+    """
+    Steps 3-5 shared by the blocking and the streaming turn: cache lookup,
+    cleaning and retrieval, then the UNCLEAR check.
+    Returns (result, plan): the finished result tuple for a cache hit or an
+    unclear query (plan None), else (None, plan) with
+    plan = (cleaned_english_question, context, distance, top_k_metadata_list, lead_score).
+    """
+    # 3-5. Cache lookup, cleaning and draft retrieval in parallel
+    graph.start("cache", "clean", "retrieve_draft")
+
+    cached = graph.result("cache")
     if cached:
+        # Speculative work is moot now; stages still queued never run
+        graph.cancel("clean", "retrieve_draft")
         english_answer, source_tag, matched_query = cached
         # Translate cached English answer back
         translated_answer = language_translator.from_english(english_answer, detected_lang_code)
-        return translated_answer, f"Cache HIT (Matched: '{matched_query[:20]}...')", None, [], False, None, detected_lang_code, 0.0
+        return (translated_answer, f"Cache HIT (Matched: '{matched_query[:20]}...')", None, [], False, None, detected_lang_code, 0.0), None
 
-    # 4. Clean English Query (Needed for RAG & Unclear check)
-    cleaned_english_question, _ = clean_query_with_gemini(english_query)
+    cleaned_english_question, _ = graph.result("clean")
+    context, distance, top_k_metadata_list = graph.result("retrieve")
 
-    # 5. Retrieve Context (using cleaned English query)
-    context, distance, top_k_metadata_list = retrieve_context(cleaned_english_question, chroma_collection, history_queries=history_queries)
-    
     # NEW: Calculate Lead Score before proceeding with RAG/Unclear logic
     lead_score = calculate_lead_score(cleaned_english_question, history_queries, distance)
 
-    is_unclear = False
     if distance is not None and distance > UNCLEAR_QUERY_THRESHOLD:
-        is_unclear = True
-        # If unclear, return None as English answer, let the app handle the "Did you mean..." suggestion
-        final_english_answer = None 
-        source = "Unclear Query"
-        # FIX: Added lead_score variable
-        return unclear_response_in_lang, source, distance, top_k_metadata_list, is_unclear, None, detected_lang_code, lead_score
-    else:
-        # 6. Generate English Answer
-        # FIX: Remove the redundant line: if context is None: distance = 1.0
-        
-        user_prompt = f"CONTEXT:\n---\n{context or 'Use company knowledge'}\n---\n\nUSER QUESTION: {cleaned_english_question}"
-        payload = {
-            "contents": [{ "parts": [{ "text": user_prompt }] }],
-            "systemInstruction": { "parts": [{ "text": GEMINI_RAG_SYSTEM_PROMPT }] },
-        }
-
-        try:
-            start = time.time()
-            response = requests.post(API_URL, headers={'Content-Type': 'application/json'}, data=json.dumps(payload), timeout=30)
-            response.raise_for_status()
-            result = response.json()
-            
-            final_english_answer = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', FINAL_FALLBACK_MESSAGE).strip()
-            source = f"Gemini API (Fetch: {time.time()-start:.1f}s)"
-            
-        except Exception:
-            final_english_answer = FINAL_FALLBACK_MESSAGE
-            source = "Gemini Error"
-            
-        # 7. Post-processing: Cache and Translate
-        if not source.startswith("Gemini Error") and final_english_answer != FINAL_FALLBACK_MESSAGE:
-            cache_source_tag = top_k_metadata_list[0].get('canonical', 'RAG') if top_k_metadata_list else 'RAG'
-            # Saves the cleaned English Q/A to the cache immediately on a fresh RAG hit
-            save_answer_to_cache(cleaned_english_question, final_english_answer, cache_source_tag) 
-            
-        # Translate to user's language only if an answer was generated
-        if final_english_answer:
-            translated_answer = language_translator.from_english(final_english_answer, detected_lang_code)
-        else:
-            translated_answer = FINAL_FALLBACK_MESSAGE # Should only happen if final_english_answer is None
-    
-    # Handle the 'Unclear' case: no answer is generated, only context/distance is returned
-    if is_unclear:
         # For an unclear query, we return a generic response in the detected language
         unclear_response_in_lang = language_translator.from_english(UNCLEAR_QUERY_RESPONSE, detected_lang_code)
-        return unclear_response_in_lang, source, distance, top_k_metadata_list, is_unclear, None, detected_lang_code,lead_score
-        
-    # Final successful RAG/Cache path
-    return translated_answer, source, distance, top_k_metadata_list, is_unclear, None, detected_lang_code,lead_score
\ No newline at end of file
+        return (unclear_response_in_lang, "Unclear Query", distance, top_k_metadata_list, True, None, detected_lang_code, lead_score), None
+
+    return None, (cleaned_english_question, context, distance, top_k_metadata_list, lead_score)
+
+
+def _log_cache_save_failure(future):
+    """Done-callback of the background cache write: nobody waits on it, so failures are logged here."""
+    error = future.exception()
+    if error is not None:
+        logging.error(f"Saving the answer to the cache failed: {error}")
+    elif future.result() is False:
+        logging.warning("Saving the answer to the cache failed (see [semantic_cache] log)")
+
+
+def _finish_answer(final_english_answer, source, plan, detected_lang_code, index_version=None, history_queries=""):
+    """
+    Step 7 shared by both turns: cache write alongside back-translation. Returns the result tuple.
+    Follow-ups that depend on `history_queries` are not written to the cache.
+    """
+    cleaned_english_question, _context, distance, top_k_metadata_list, lead_score = plan
+
+    cacheable = not is_history_dependent(cleaned_english_question, history_queries)
+    if cacheable and not source.startswith("Gemini Error") and final_english_answer != FINAL_FALLBACK_MESSAGE:
+        cache_source_tag = top_k_metadata_list[0].get('canonical', 'RAG') if top_k_metadata_list else 'RAG'
+        # Saves the cleaned English Q/A to the cache immediately on a fresh RAG hit
+        save = _STAGE_POOL.submit(save_answer_to_cache, cleaned_english_question, final_english_answer, cache_source_tag, index_version)
+        save.add_done_callback(_log_cache_save_failure)
+
+    translated_answer = language_translator.from_english(final_english_answer, detected_lang_code)
+
+    # Final successful RAG path
+    return translated_answer, source, distance, top_k_metadata_list, False, None, detected_lang_code, lead_score
+
+
+def _answer_after_translation(graph, detected_lang_code, history_queries, index_version=None):
+    """Steps 3-7 of answer_query_with_cache_first (the part that is coalesced)."""
+    result, plan = _prepare_generation(graph, detected_lang_code, history_queries)
+    if result:
+        return result
+
+    # 6. Generate English Answer
+    final_english_answer, source = graph.result("generate")
+
+    # 7. Post-processing: cache write runs alongside back-translation
+    return _finish_answer(final_english_answer, source, plan, detected_lang_code, index_version, history_queries)
+
+
+# --- STREAMING VARIANT (Server-Sent Events) ---
+
+def build_chat_response(query, answer, source, distance, top_k_metadata_list, detected_lang_code, lead_score):
+    """The fields the widget reads from /chat (and from the final /chat/stream event)."""
+    return {
+        "answer": answer,
+        "source": source,
+        "distance": distance,
+        "detected_lang": detected_lang_code,
+        "related_page": match_landing_page(query, top_k_metadata_list),
+        "lead_score": lead_score,
+    }
+
+
+def _stream_done_event(query, answer, source, distance, top_k_metadata_list, detected_lang_code, lead_score):
+    """Final SSE payload: same fields the widget reads from the JSON /chat response."""
+    return "done", build_chat_response(query, answer, source, distance, top_k_metadata_list, detected_lang_code, lead_score)
+
+
+def _stream_result_events(query, result):
+    """A finished result tuple as one token event plus the done event."""
+    answer, source, distance, top_k_metadata_list, _is_unclear, _, detected_lang_code, lead_score = result
+    yield "token", {"text": answer}
+    yield _stream_done_event(query, answer, source, distance, top_k_metadata_list, detected_lang_code, lead_score)
+
+
+def stream_answer_query(raw_query: str, chroma_collection, history_queries="", session=None):
+    """
+    Streaming variant of answer_query_with_cache_first().
+    Translation, small talk, cache, cleaning and retrieval are the same stages
+    (_start_turn / _prepare_generation); only generation differs. Concurrent
+    duplicates of either variant are coalesced under the same flight key: the
+    leader streams, waiters receive the finished answer as one token.
+    Yields (event, data) tuples: ("token", {"text": ...}) as the English answer is generated,
+    ("reset", {"reason": ...}) if generation fails after tokens were sent (the client must
+    discard the text streamed so far), then exactly one ("done", {...}) carrying the full answer plus source/distance/landing-page metadata.
+    Non-English answers cannot be translated token by token, so they are sent as one token after translation.
+    """
+    graph, english_query, detected_lang_code, history_queries, early = _start_turn(
+        raw_query, chroma_collection, history_queries, session
+    )
+    if early:
+        yield from _stream_result_events(raw_query if early[1] == "Translation Error" else english_query, early)
+        return
+
+    # Identical concurrent turns (streamed or not) share one run; waiters get the whole answer at once
+    flight = get_answer_flight()
+    flight_key = _flight_key(english_query, detected_lang_code, history_queries)
+    future, leader = flight.begin(flight_key)
+    if not leader:
+        result = future.result()
+        if not result[4]:
+            _remember_turn(session, english_query)
+        yield from _stream_result_events(english_query, result)
+        return
+
+    try:
+        result = None
+        for event in _stream_after_translation(graph, detected_lang_code, history_queries, _index_version_of(chroma_collection)):
+            if event[0] == "result":
+                result = event[1]
+            else:
+                yield event
+    except GeneratorExit:
+        # Client went away mid-stream: waiters must not hang on the abandoned run
+        flight.finish(flight_key, future, error=RuntimeError("Streaming turn closed before the answer was complete"))
+        raise
+    except Exception as e:
+        flight.finish(flight_key, future, error=e)
+        raise
+    flight.finish(flight_key, future, result)
+
+    if not result[4]:
+        _remember_turn(session, english_query)
+    yield _stream_done_event(english_query, result[0], result[1], result[2], result[3], result[6], result[7])
+
+
+def _stream_after_translation(graph, detected_lang_code, history_queries, index_version=None):
+    """
+    Steps 3-7 of stream_answer_query (the coalesced part): token events while
+    the English answer streams, then ("result", result tuple) last. Every
+    path ends with the translated answer sent as a token unless the English
+    tokens already carried it. If Gemini fails after tokens went out, a
+    ("reset", {...}) event tells the client to drop the partial text before
+    the fallback answer is sent.
+    """
+    result, plan = _prepare_generation(graph, detected_lang_code, history_queries)
+    if result:
+        yield "token", {"text": result[0]}
+        yield "result", result
+        return
+
+    # 6. Generate (streamed)
+    cleaned_english_question, context = plan[0], plan[1]
+    payload = _build_rag_payload(context, cleaned_english_question)
+    stream_tokens = detected_lang_code == DEFAULT_LANGUAGE
+    pieces = []
+    failed_mid_stream = False
+    try:
+        start = time.time()
+        for piece in stream_generate_content(payload, timeout=30):
+            pieces.append(piece)
+            if stream_tokens:
+                yield "token", {"text": piece}
+        final_english_answer = "".join(pieces).strip() or FINAL_FALLBACK_MESSAGE
+        source = f"Gemini API (Stream: {time.time()-start:.1f}s)"
+    except Exception as e:
+        logging.error(f"Gemini streaming failed: {e}")
+        final_english_answer = FINAL_FALLBACK_MESSAGE
+        source = "Gemini Error"
+        failed_mid_stream = stream_tokens and bool(pieces)
+        if failed_mid_stream:
+            yield "reset", {"reason": "generation_failed"}
+
+    # 7. Cache + Translate
+    result = _finish_answer(final_english_answer, source, plan, detected_lang_code, index_version, history_queries)
+    if not stream_tokens or not pieces or failed_mid_stream:
+        yield "token", {"text": result[0]}
+    yield "result", result
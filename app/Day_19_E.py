@@ -4,13 +4,18 @@ Debug + introspection helpers for the Leanext Chroma index.
 
 These helpers are meant to be called from FastAPI routes like `/debug/indexed`
 or internal tools, but they do NOT modify the index.
+
+Also hosts the answer-cache entry points Day_19_C imports
+(get_cached_answer / save_answer_to_cache), backed by the semantic cache
+in app/semantic_cache.py.
 """
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from chromadb.api.models.Collection import Collection
 
 from app.Day_19_B import get_chroma_client
+from app.semantic_cache import get_semantic_cache
 
 
 # -------------------------------------------------------------------
@@ -108,3 +113,48 @@ def list_indexed_documents(
                 return results
 
     return results
+
+
+# -------------------------------------------------------------------
+# 3. Answer cache (chat_cache.db, semantic lookup)
+# -------------------------------------------------------------------
+
+def get_cached_answer(query: str, history_queries: str = "") -> Optional[Tuple[str, str, str]]:
+    """
+    Return (answer, source, matched_query) for the nearest cached question
+    if it is similar enough (CACHE_MATCH_THRESHOLD), otherwise None.
+    Follow-ups that depend on `history_queries` are never served from the cache.
+    """
+    if not query or not query.strip():
+        return None
+
+    try:
+        hit = get_semantic_cache().lookup(query, history=history_queries)
+    except Exception as e:
+        print(f"[Day_19_E] Cache lookup failed: {e}")
+        return None
+
+    if hit is None:
+        return None
+
+    answer, source, matched_query, _similarity = hit
+    return answer, source, matched_query
+
+
+def save_answer_to_cache(
+    query: str, answer: str, source: str, index_version: Optional[str] = None, history_queries: str = ""
+) -> bool:
+    """Store an English Q/A pair; paraphrases of `query` will hit it later (not for history-dependent follow-ups)."""
+    if not query or not answer:
+        return False
+
+    try:
+        return get_semantic_cache().save(query, answer, source, index_version=index_version, history=history_queries)
+    except Exception as e:
+        print(f"[Day_19_E] Cache save failed: {e}")
+        return False
+
+
+def update_cached_answer(query: str, answer: str, source: str) -> bool:
+    """Overwrite the cached answer for `query` (e.g. after a liked regeneration)."""
+    return save_answer_to_cache(query, answer, source)
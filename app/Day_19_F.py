@@ -9,6 +9,7 @@ Functions:
 - load_faq_suggestions()    → Prewarm + cache all FAQ docs
 - get_similar_faqs()        → Return top-k similar FAQs
 - get_faq_collection()      → Return the dedicated FAQ collection
+- reset_faq_cache()         → Drop both caches after a KB swap
 
 Used by main.py for:
 - startup warm
@@ -20,6 +21,7 @@ from chromadb.api.models.Collection import Collection
 
 # Import the correct chroma client from Day_19_B
 from app.Day_19_B import get_chroma_client
+from app.embedding_batcher import embed_query
 
 
 # internal module-level caches
@@ -137,7 +139,7 @@ def get_similar_faqs(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         return (_cached_faq_docs or [])[:top_k]
 
     res = faq_col.query(
-        query_texts=[query],
+        query_embeddings=[embed_query(query)],
         n_results=top_k,
         include=["documents", "metadatas", "distances"]
     )
@@ -157,3 +159,18 @@ def get_similar_faqs(query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         })
 
     return out
+
+
+# ------------------------------------------------------
+# 4. Reset after a KB swap
+# ------------------------------------------------------
+
+def reset_faq_cache(index_version: Optional[str] = None) -> None:
+    """
+    KB version listener: forget the FAQ collection handle and cached FAQ
+    docs, then re-warm them (runs on the swap thread, not a request).
+    """
+    global _faq_collection, _cached_faq_docs
+    _faq_collection = None
+    _cached_faq_docs = None
+    load_faq_suggestions()
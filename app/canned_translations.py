@@ -0,0 +1,150 @@
+# app/canned_translations.py
+"""
+Pre-translated canned responses (small talk, fallbacks, error messages).
+
+Key ideas:
+- Every fixed English reply in Day_19_A is translated once, offline, into
+  every code in SUPPORTED_LANGUAGES and written to CANNED_TRANSLATIONS_PATH.
+- The table is keyed by the English text itself and carries a version hash
+  of the full set of source strings. If a string in Day_19_A is edited, its
+  old entry simply stops matching and the pipeline falls back to a live
+  translation until the table is rebuilt; the version tells you when to.
+- LanguageTranslator.from_english() looks here first, so small talk and
+  fallback paths never touch the network once the table is built.
+
+Build (needs network access for googletrans):
+    python -m app.canned_translations
+start.sh runs it with --if-stale on every deploy, so the table is only
+rebuilt when it is missing or the source strings changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.Day_19_A import (
+    SMALL_TALK_TRIGGERS,
+    FINAL_FALLBACK_MESSAGE,
+    UNCLEAR_QUERY_RESPONSE,
+    LANGUAGE_FAIL_MESSAGE,
+    SUPPORTED_LANGUAGES,
+    DEFAULT_LANGUAGE,
+    CANNED_TRANSLATIONS_PATH,
+)
+
+
+def canned_english_strings() -> List[str]:
+    """Every fixed English reply the pipeline can send back."""
+    strings = list(SMALL_TALK_TRIGGERS.values())
+    strings += [FINAL_FALLBACK_MESSAGE, UNCLEAR_QUERY_RESPONSE, LANGUAGE_FAIL_MESSAGE]
+    return list(dict.fromkeys(strings))
+
+
+def canned_strings_version(strings: Optional[List[str]] = None) -> str:
+    """Short hash of the source strings; changes whenever one of them does."""
+    digest = hashlib.sha256()
+    for text in sorted(strings if strings is not None else canned_english_strings()):
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+# -------------------------------------------------------------------
+# 1. Build step
+# -------------------------------------------------------------------
+
+def build_canned_translations(path: str = CANNED_TRANSLATIONS_PATH) -> Dict[str, Dict[str, str]]:
+    """Translate every canned string into every supported language and write the table."""
+    from googletrans import Translator
+
+    translator = Translator()
+    strings = canned_english_strings()
+    table: Dict[str, Dict[str, str]] = {}
+
+    for lang in SUPPORTED_LANGUAGES:
+        if lang == DEFAULT_LANGUAGE:
+            continue
+        table[lang] = {}
+        for text in strings:
+            table[lang][text] = translator.translate(text, src=DEFAULT_LANGUAGE, dest=lang).text
+        print(f"[canned_translations] {lang}: {len(table[lang])} strings")
+
+    payload = {
+        "version": canned_strings_version(strings),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "translations": table,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+    print(f"[canned_translations] Wrote version {payload['version']} to {path}")
+    return table
+
+
+def canned_translations_stale(path: str = CANNED_TRANSLATIONS_PATH) -> bool:
+    """True if the table at `path` is missing, unreadable or built from other source strings."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("version") != canned_strings_version()
+    except (OSError, ValueError):
+        return True
+
+
+# -------------------------------------------------------------------
+# 2. Runtime lookup
+# -------------------------------------------------------------------
+
+_table: Optional[Dict[str, Dict[str, str]]] = None
+_table_lock = threading.Lock()
+
+
+def load_canned_translations(path: str = CANNED_TRANSLATIONS_PATH) -> Dict[str, Dict[str, str]]:
+    """
+    Read the table from disk and make it the one lookups use (called at
+    startup). An absent or unreadable file means live translation.
+    """
+    global _table
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+    except FileNotFoundError:
+        print(f"[canned_translations] No table at {path}; canned replies will be translated live")
+        payload = {}
+    except (OSError, ValueError) as e:
+        print(f"[canned_translations] Could not read {path}: {e}")
+        payload = {}
+
+    if payload and payload.get("version") != canned_strings_version():
+        print(
+            "[canned_translations] Table is stale (source strings changed); "
+            "edited strings will be translated live until it is rebuilt"
+        )
+    _table = payload.get("translations") or {}
+    return _table
+
+
+def get_canned_translation(text: str, lang: str) -> Optional[str]:
+    """Return the precomputed translation of a canned reply, or None."""
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                load_canned_translations()
+
+    return _table.get(lang, {}).get(text)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-translate the canned replies into every supported language.")
+    parser.add_argument("--if-stale", action="store_true", help="only rebuild when the table is missing or out of date")
+    args = parser.parse_args()
+    if args.if_stale and not canned_translations_stale():
+        print(f"[canned_translations] Table is up to date ({canned_strings_version()})")
+    else:
+        build_canned_translations()
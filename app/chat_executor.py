@@ -0,0 +1,239 @@
+# app/chat_executor.py
+"""
+Bounded worker pool for running the synchronous RAG pipeline off the event loop.
+
+Key ideas:
+- search_leanext_kb() (Chroma query + query embedding) is blocking, so the
+  async /chat endpoint hands it to a dedicated ThreadPoolExecutor instead of
+  running it on the single uvicorn event loop.
+- Admission control: at most `max_workers + max_queue` requests are admitted
+  at a time. Anything beyond that is rejected immediately (-> 503 with a
+  Retry-After hint) instead of queueing forever and dragging every other
+  request's latency with it.
+- Lightweight accounting (queue depth, wait time, rejections) for /debug/stats.
+- Streaming responses hold one admitted slot for the whole stream: the
+  generator runs on a worker thread and hands items to the event loop.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+from app.Day_19_A import (
+    CHAT_EXECUTOR_WORKERS,
+    CHAT_EXECUTOR_MAX_QUEUE,
+    CHAT_RETRY_AFTER_SECONDS,
+)
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when the pipeline queue is full and a request cannot be admitted."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pipeline executor saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# -------------------------------------------------------------------
+# 1. Bounded executor
+# -------------------------------------------------------------------
+
+class BoundedPipelineExecutor:
+    """
+    ThreadPoolExecutor wrapper with a hard cap on admitted work.
+
+    `admitted` counts requests that are either waiting for a worker or
+    running on one. A slot is released when the underlying future is done
+    (finished, failed or cancelled before it started), never when the
+    awaiting coroutine goes away, so client disconnects cannot leak slots.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="rag-pipeline",
+        )
+        self._lock = threading.Lock()
+
+        self._admitted = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_service = 0.0
+
+    # ---- admission -------------------------------------------------
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _try_admit(self) -> bool:
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                return False
+            self._admitted += 1
+            return True
+
+    def _release(self, _future: Optional[Future] = None) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    def retry_after_hint(self) -> int:
+        """Rough seconds until a slot frees up, never below the configured floor."""
+        with self._lock:
+            finished = self._completed + self._failed
+            avg_service = self._total_service / finished if finished else 0.0
+            backlog = self._admitted
+        estimate = math.ceil(avg_service * backlog / self.max_workers)
+        return max(CHAT_RETRY_AFTER_SECONDS, estimate)
+
+    # ---- execution -------------------------------------------------
+
+    def _instrument(self, fn: Callable[..., Any], enqueued_at: float) -> Callable[..., Any]:
+        def _task(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            wait = started - enqueued_at
+            with self._lock:
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._total_service += time.perf_counter() - started
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        return _task
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        """
+        Admit and schedule `fn` on the pool, returning a concurrent Future.
+        Raises ExecutorSaturatedError when the queue is full.
+        """
+        if not self._try_admit():
+            raise ExecutorSaturatedError(self.retry_after_hint())
+
+        try:
+            future = self._pool.submit(self._instrument(fn, time.perf_counter()), *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Async entry point used by FastAPI routes."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stream(self, gen_fn: Callable[..., Iterator[Any]], *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        Run a synchronous generator on the pool and return an async iterator
+        over its items. Admission happens *now* (ExecutorSaturatedError is
+        raised before any response is started); the slot is held until the
+        generator finishes or the consumer goes away.
+        """
+        loop = asyncio.get_running_loop()
+        items: "asyncio.Queue[Any]" = asyncio.Queue()
+        stop = threading.Event()
+        end = object()
+
+        def _emit(item: Any) -> None:
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+            except RuntimeError:
+                stop.set()  # event loop already closed
+
+        def _pump() -> None:
+            gen = gen_fn(*args, **kwargs)
+            try:
+                for item in gen:
+                    if stop.is_set():
+                        break
+                    _emit((item, None))
+            except Exception as e:
+                _emit((end, e))
+                return
+            finally:
+                gen.close()
+            _emit((end, None))
+
+        self.submit(_pump)
+
+        async def _consume() -> AsyncIterator[Any]:
+            try:
+                while True:
+                    item, error = await items.get()
+                    if error is not None:
+                        raise error
+                    if item is end:
+                        return
+                    yield item
+            finally:
+                stop.set()
+
+        return _consume()
+
+    # ---- introspection ---------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._running + self._completed + self._failed
+            finished = self._completed + self._failed
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(1000 * self._total_wait / started, 2) if started else 0.0,
+                "max_wait_ms": round(1000 * self._max_wait, 2),
+                "avg_service_ms": round(1000 * self._total_service / finished, 2) if finished else 0.0,
+            }
+
+
+# -------------------------------------------------------------------
+# 2. Process-wide singleton
+# -------------------------------------------------------------------
+
+_executor: Optional[BoundedPipelineExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_pipeline_executor() -> BoundedPipelineExecutor:
+    """Return the singleton executor sized from Day_19_A settings."""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedPipelineExecutor(
+                    max_workers=CHAT_EXECUTOR_WORKERS,
+                    max_queue=CHAT_EXECUTOR_MAX_QUEUE,
+                )
+                print(
+                    f"[chat_executor] Pipeline pool ready: {CHAT_EXECUTOR_WORKERS} workers, "
+                    f"queue {CHAT_EXECUTOR_MAX_QUEUE}"
+                )
+
+    return _executor
@@ -0,0 +1,93 @@
+# app/chunk_store.py
+"""
+Pre-parsed, id-keyed store of KB chunk metadata.
+
+Key ideas:
+- Chroma stores `headings` as a JSON string. It is decoded once, when the
+  store is built, instead of on every retrieved chunk of every query.
+- Each chunk is a compact `__slots__` record (path, canonical, url, title,
+  headings tuple). Records are shared and read-only; nobody mutates the
+  dicts Chroma hands back any more.
+- ChunkMeta.get() mirrors dict.get(), so existing callers such as
+  match_landing_page() and the Streamlit debug view keep working.
+"""
+
+import json
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+
+def _parse_headings(raw: Any) -> Tuple[str, ...]:
+    if isinstance(raw, (list, tuple)):
+        return tuple(raw)
+    try:
+        parsed = json.loads(raw or "[]")
+    except (TypeError, ValueError):
+        return ()
+    return tuple(parsed) if isinstance(parsed, list) else ()
+
+
+class ChunkMeta:
+    """Read-only metadata record for one KB chunk."""
+
+    __slots__ = ("id", "path", "canonical", "url", "title", "headings", "extra")
+
+    _FIELDS = ("path", "canonical", "url", "title", "headings")
+
+    def __init__(self, chunk_id: str, metadata: Optional[Dict[str, Any]]):
+        metadata = metadata or {}
+        self.id = chunk_id
+        self.path = metadata.get("path")
+        self.canonical = metadata.get("canonical")
+        self.url = metadata.get("url")
+        self.title = metadata.get("title")
+        self.headings = _parse_headings(metadata.get("headings"))
+        extra = {k: v for k, v in metadata.items() if k not in self._FIELDS}
+        self.extra = extra or None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._FIELDS:
+            value = getattr(self, key)
+        else:
+            value = self.extra.get(key) if self.extra else None
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain JSON-ready dict (headings as a list)."""
+        out = dict(self.extra or {})
+        for key in self._FIELDS:
+            value = getattr(self, key)
+            if value is not None:
+                out[key] = list(value) if key == "headings" else value
+        return out
+
+    def __repr__(self) -> str:
+        return f"ChunkMeta(id={self.id!r}, path={self.path!r})"
+
+
+class ChunkStore:
+    """id -> ChunkMeta, built once from a collection's ids and metadatas."""
+
+    def __init__(self, ids: Sequence[str], metadatas: Iterable[Optional[Dict[str, Any]]]):
+        self._records: Dict[str, ChunkMeta] = {
+            chunk_id: ChunkMeta(chunk_id, meta) for chunk_id, meta in zip(ids, metadatas)
+        }
+        print(f"[chunk_store] Parsed metadata for {len(self._records)} chunks")
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def lookup(self, chunk_id: str, fallback: Optional[Dict[str, Any]] = None) -> ChunkMeta:
+        """
+        Record for `chunk_id`. Chunks missing from the store (e.g. indexed after
+        it was built) are parsed from `fallback`, the metadata the search returned.
+        """
+        record = self._records.get(chunk_id)
+        if record is None:
+            record = ChunkMeta(chunk_id, fallback)
+        return record
@@ -0,0 +1,258 @@
+# app/context_packer.py
+"""
+Token-budgeted assembly of the RAG prompt context.
+
+Key ideas:
+- Chunks are cut with OVERLAP, so neighbouring chunks of one page repeat
+  text. The index pipeline records each chunk's `chunk_index`; chunks of
+  the same `path` with consecutive indexes are stitched in page order,
+  dropping the words the second one repeats. Chunks indexed before
+  `chunk_index` existed fall back to matching a tail/head overlap of at
+  least CONTEXT_MIN_OVERLAP_WORDS words. The stitched text is cut from the
+  original chunks, so line breaks, lists and tables keep their formatting.
+- A passage whose 3-word shingles are CONTEXT_DUPLICATE_JACCARD similar to
+  (or mostly contained in) an already kept passage is dropped, e.g. the
+  same boilerplate paragraph on two pages.
+- Passages are added in the order the retriever ranked them (the fused
+  hybrid order, where BM25-only hits carry a placeholder distance; a
+  stitched passage takes its better rank) until CONTEXT_TOKEN_BUDGET is
+  spent (tokens estimated as chars / 4). A passage that does not fit is
+  skipped; only the very first one is truncated to fit.
+- Each pack reports its raw vs packed size; totals are kept for /debug/stats.
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.Day_19_A import (
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_MIN_OVERLAP_WORDS,
+    CONTEXT_DUPLICATE_JACCARD,
+)
+
+
+_CHARS_PER_TOKEN = 4
+_SEPARATOR = "\n\n---\n\n"
+_WORD_RE = re.compile(r"\S+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _shingles(words: List[str]) -> Set[Tuple[str, ...]]:
+    lowered = [w.lower() for w in words]
+    if len(lowered) < 3:
+        return {tuple(lowered)}
+    return {tuple(lowered[i:i + 3]) for i in range(len(lowered) - 2)}
+
+
+def _chunk_index(metadata: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(metadata["chunk_index"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _overlap(left: List[str], right: List[str], min_words: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if < min_words)."""
+    for k in range(min(len(left), len(right)), min_words - 1, -1):
+        if left[-k:] == right[:k]:
+            return k
+    return 0
+
+
+class PackedContext(NamedTuple):
+    text: str
+    raw_tokens: int
+    packed_tokens: int
+    passages: int
+    merged: int
+    dropped_duplicates: int
+    dropped_budget: int
+
+
+class _Passage:
+    """Original chunk text plus the character span of every word in it."""
+
+    __slots__ = ("path", "text", "spans", "words", "rank", "first", "last")
+
+    def __init__(self, path: str, text: str, rank: int, chunk_index: Optional[int] = None):
+        self.path = path
+        self.text = text
+        self.spans = [m.span() for m in _WORD_RE.finditer(text)]
+        self.words = [text[start:end] for start, end in self.spans]
+        self.rank = rank
+        self.first = self.last = chunk_index
+
+    def extend(self, other: "_Passage", overlap: int) -> None:
+        """Append `other` after its first `overlap` words (which repeat our tail)."""
+        cut = other.spans[overlap - 1][1]
+        shift = len(self.text) - cut
+        self.text += other.text[cut:]
+        self.spans += [(start + shift, end + shift) for start, end in other.spans[overlap:]]
+        self.words += other.words[overlap:]
+        self.rank = min(self.rank, other.rank)
+        self.last = other.last
+
+    def head(self, n_words: int) -> str:
+        """Original text up to the end of the first `n_words` words."""
+        return self.text[: self.spans[n_words - 1][1]] if n_words else ""
+
+
+class ContextPacker:
+    """Builds the context block for one prompt from ranked chunks."""
+
+    def __init__(self, token_budget: int, min_overlap_words: int, duplicate_jaccard: float):
+        self.token_budget = token_budget
+        self.min_overlap_words = min_overlap_words
+        self.duplicate_jaccard = duplicate_jaccard
+        self._lock = threading.Lock()
+
+        self._packs = 0
+        self._raw_tokens = 0
+        self._packed_tokens = 0
+
+    # ---- steps -----------------------------------------------------
+
+    def _stitch_overlap(self, a: _Passage, b: _Passage) -> int:
+        """Words at the head of `b` that repeat the tail of `a` if `b` continues `a`, else 0."""
+        if a.path != b.path:
+            return 0
+        if a.last is not None and b.first is not None:
+            if b.first != a.last + 1:
+                return 0
+            return _overlap(a.words, b.words, 1)
+        return _overlap(a.words, b.words, self.min_overlap_words)
+
+    def _merge_same_page(self, passages: List[_Passage]) -> Tuple[List[_Passage], int]:
+        merged_count = 0
+        changed = True
+        while changed:
+            changed = False
+            for i, a in enumerate(passages):
+                for j, b in enumerate(passages):
+                    if i == j:
+                        continue
+                    k = self._stitch_overlap(a, b)
+                    if k:
+                        a.extend(b, k)
+                        del passages[j]
+                        merged_count += 1
+                        changed = True
+                        break
+                if changed:
+                    break
+        return passages, merged_count
+
+    def _is_duplicate(self, shingles: Set[Tuple[str, ...]], kept: List[Set[Tuple[str, ...]]]) -> bool:
+        for other in kept:
+            inter = len(shingles & other)
+            if not inter:
+                continue
+            if inter / len(shingles | other) >= self.duplicate_jaccard:
+                return True
+            if inter / len(shingles) >= 0.9:  # almost entirely contained in a kept passage
+                return True
+        return False
+
+    @staticmethod
+    def _render(passage: _Passage, text: Optional[str] = None) -> str:
+        return f"Source Page ({passage.path}): {(text if text is not None else passage.text).strip()}"
+
+    # ---- public API ------------------------------------------------
+
+    def pack(self, results: List[Dict[str, Any]]) -> PackedContext:
+        """
+        `results` are dicts with 'document', 'metadata' and 'distance', in the
+        retriever's ranking (best first). Returns the packed context string
+        plus size accounting.
+        """
+        raw_text = _SEPARATOR.join(
+            f"Source Page ({r['metadata'].get('path', 'Unknown')}): {r['document']}" for r in results
+        )
+        raw_tokens = estimate_tokens(raw_text)
+
+        passages = [
+            _Passage(r["metadata"].get("path", "Unknown"), r["document"] or "", rank, _chunk_index(r["metadata"]))
+            for rank, r in enumerate(results)
+        ]
+        passages, merged = self._merge_same_page(passages)
+        passages.sort(key=lambda p: p.rank)
+
+        kept_text: List[str] = []
+        kept_shingles: List[Set[Tuple[str, ...]]] = []
+        used = 0
+        dropped_duplicates = 0
+        dropped_budget = 0
+
+        for passage in passages:
+            shingles = _shingles(passage.words)
+            if self._is_duplicate(shingles, kept_shingles):
+                dropped_duplicates += 1
+                continue
+
+            rendered = self._render(passage)
+            cost = estimate_tokens(rendered) + (estimate_tokens(_SEPARATOR) if kept_text else 0)
+            if used + cost > self.token_budget:
+                if kept_text:
+                    dropped_budget += 1
+                    continue
+                # Best passage alone is over budget: keep as many words as fit
+                chars_left = self.token_budget * _CHARS_PER_TOKEN - len(self._render(passage, ""))
+                fits = 0
+                while fits < len(passage.spans) and passage.spans[fits][1] <= chars_left:
+                    fits += 1
+                rendered = self._render(passage, passage.head(fits))
+                cost = estimate_tokens(rendered)
+
+            kept_text.append(rendered)
+            kept_shingles.append(shingles)
+            used += cost
+
+        text = _SEPARATOR.join(kept_text)
+        packed_tokens = estimate_tokens(text)
+
+        with self._lock:
+            self._packs += 1
+            self._raw_tokens += raw_tokens
+            self._packed_tokens += packed_tokens
+
+        return PackedContext(
+            text, raw_tokens, packed_tokens, len(kept_text), merged, dropped_duplicates, dropped_budget
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            saved = self._raw_tokens - self._packed_tokens
+            return {
+                "token_budget": self.token_budget,
+                "packs": self._packs,
+                "raw_tokens": self._raw_tokens,
+                "packed_tokens": self._packed_tokens,
+                "tokens_saved": saved,
+                "saved_rate": round(saved / self._raw_tokens, 4) if self._raw_tokens else 0.0,
+            }
+
+
+# -------------------------------------------------------------------
+# Process-wide singleton
+# -------------------------------------------------------------------
+
+_packer: Optional[ContextPacker] = None
+_packer_lock = threading.Lock()
+
+
+def get_context_packer() -> ContextPacker:
+    """Return the singleton packer configured from Day_19_A."""
+    global _packer
+
+    if _packer is None:
+        with _packer_lock:
+            if _packer is None:
+                _packer = ContextPacker(
+                    CONTEXT_TOKEN_BUDGET, CONTEXT_MIN_OVERLAP_WORDS, CONTEXT_DUPLICATE_JACCARD
+                )
+
+    return _packer
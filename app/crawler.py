@@ -0,0 +1,309 @@
+# app/crawler.py
+"""
+Concurrent asyncio crawler for the website KB.
+
+Key ideas:
+- One httpx.AsyncClient with a bounded pool (CRAWL_MAX_CONNECTIONS) and
+  keep-alive; HTTP/2 when the optional `h2` package is installed.
+- Politeness is a per-host token bucket: SCRAPE_DELAY_SECONDS becomes a rate
+  of 1 / delay requests per second with a small burst (CRAWL_HOST_BURST),
+  instead of every request sleeping the full delay in a serial loop. Other
+  hosts (and parsing) keep going while one host waits for a token.
+- BFS frontier seeded from the sitemap and BASE_URL + URL_PATHS, with depth
+  tracking up to SCRAPE_MAX_DEPTH. URLs are de-duplicated by canonical form
+  before they are queued and again by the page's rel=canonical once parsed.
+  Paths containing one of URL_EXCLUSIONS (privacy policy, terms) are never
+  queued, so the indexer drops them from the KB on its next clean run.
+- Conditional GETs (ETag / Last-Modified) and unchanged sitemap <lastmod>
+  work as in app/indexer.py; fetched pages are written compressed into
+  crawler_cache/ (app/page_cache.py) under their canonical URL.
+- The crawler does not decide what a page means: the caller passes
+  `parse(html, url)`, which must return at least "canonical" and "links".
+  It runs on a worker thread so the event loop keeps fetching.
+"""
+
+import asyncio
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import httpx
+
+from app.Day_19_A import (
+    BASE_URL,
+    URL_PATHS,
+    SITEMAP_URL,
+    CRAWL_DOMAIN,
+    SCRAPE_MAX_DEPTH,
+    SCRAPE_DELAY_SECONDS,
+    CRAWLER_USER_AGENT,
+    CRAWL_REQUEST_TIMEOUT_SECONDS,
+    CRAWL_MAX_CONNECTIONS,
+    CRAWL_HOST_BURST,
+    URL_EXCLUSIONS,
+)
+from app.page_cache import has_cached_html, read_cached_html, write_cached_html
+
+try:
+    import h2  # noqa: F401  (only needed for HTTP/2)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+_SKIPPED_EXTENSIONS = (
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico",
+    ".zip", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".mp4", ".mp3",
+    ".css", ".js", ".xml",
+)
+_SITEMAP_NS = re.compile(r"^\{[^}]*\}")
+
+
+# -------------------------------------------------------------------
+# 1. URLs
+# -------------------------------------------------------------------
+
+def _strip_www(host: str) -> str:
+    return host[4:] if host.startswith("www.") else host
+
+
+def canonical_url(url: str) -> str:
+    """Lower-cased scheme/host, no www., fragment or trailing slash (home is 'https://host')."""
+    parts = urlsplit(url.strip())
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    return urlunsplit(((parts.scheme or "https").lower(), _strip_www(parts.netloc.lower()), path, parts.query, ""))
+
+
+def is_crawlable(url: str) -> bool:
+    parts = urlsplit(url)
+    return (
+        parts.scheme in ("http", "https")
+        and _strip_www(parts.netloc.lower()) == CRAWL_DOMAIN
+        and not parts.path.lower().endswith(_SKIPPED_EXTENSIONS)
+        and not any(excluded in parts.path.lower() for excluded in URL_EXCLUSIONS)
+    )
+
+
+# -------------------------------------------------------------------
+# 2. Per-host politeness
+# -------------------------------------------------------------------
+
+class TokenBucket:
+    """`rate` tokens per second, at most `burst` banked. acquire() waits for one."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class HostScheduler:
+    """One TokenBucket per host, created on first use."""
+
+    def __init__(self, delay_seconds: float, burst: int):
+        self.rate = 1.0 / delay_seconds if delay_seconds > 0 else 0.0
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def wait(self, url: str) -> None:
+        host = urlsplit(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+
+# -------------------------------------------------------------------
+# 3. Crawler
+# -------------------------------------------------------------------
+
+class CrawlResult(NamedTuple):
+    url: str                       # canonical form of the URL that was requested
+    depth: int
+    status: int                    # HTTP status; 304 also for lastmod skips; 0 = network error
+    source: str                    # "fetched" | "not_modified" | "lastmod" | "error" | "http"
+    page: Optional[Dict[str, Any]]  # parse() output, None if there was no HTML
+    validators: Dict[str, Optional[str]]
+
+
+class AsyncCrawler:
+    """BFS crawl of CRAWL_DOMAIN with a bounded pool and per-host token buckets."""
+
+    def __init__(
+        self,
+        parse: Callable[[str, str], Dict[str, Any]],
+        previous: Optional[Dict[str, Dict[str, Any]]] = None,
+        max_depth: int = SCRAPE_MAX_DEPTH,
+        max_connections: int = CRAWL_MAX_CONNECTIONS,
+        delay_seconds: float = SCRAPE_DELAY_SECONDS,
+        host_burst: int = CRAWL_HOST_BURST,
+    ):
+        self.parse = parse
+        self.previous = previous or {}
+        self.max_depth = max_depth
+        self.max_connections = max(1, max_connections)
+        self.scheduler = HostScheduler(delay_seconds, host_burst)
+
+        self.sitemap: Dict[str, Optional[str]] = {}
+        self.results: List[CrawlResult] = []
+        self._seen: Set[str] = set()
+        self._order: Dict[str, int] = {}
+        self._queue: "asyncio.Queue[Tuple[str, int]]" = asyncio.Queue()
+
+    def _enqueue(self, url: str, depth: int) -> None:
+        url = canonical_url(url)
+        if url in self._seen or not is_crawlable(url):
+            return
+        self._seen.add(url)
+        self._order[url] = len(self._order)
+        self._queue.put_nowait((url, depth))
+
+    def _client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(CRAWL_REQUEST_TIMEOUT_SECONDS),
+            headers={"User-Agent": CRAWLER_USER_AGENT},
+            follow_redirects=True,
+        )
+
+    async def _fetch_sitemap(self, client: httpx.AsyncClient, sitemap_url: str, depth: int = 0) -> None:
+        """Collect canonical URL -> <lastmod> for every in-domain <loc>; follows sitemap indexes once."""
+        await self.scheduler.wait(sitemap_url)
+        try:
+            response = await client.get(sitemap_url)
+            if response.status_code != 200:
+                print(f"[crawler] Sitemap {sitemap_url} unavailable: HTTP {response.status_code}")
+                return
+            root = ET.fromstring(response.content)
+        except (httpx.HTTPError, ET.ParseError) as e:
+            print(f"[crawler] Sitemap {sitemap_url} unavailable: {e}")
+            return
+
+        for node in root:
+            fields = {_SITEMAP_NS.sub("", child.tag): (child.text or "").strip() for child in node}
+            loc = fields.get("loc")
+            if not loc:
+                continue
+            if _SITEMAP_NS.sub("", node.tag) == "sitemap":
+                if depth == 0:
+                    await self._fetch_sitemap(client, loc, depth + 1)
+            elif is_crawlable(loc):
+                self.sitemap[canonical_url(loc)] = fields.get("lastmod") or None
+
+    async def _get(
+        self, client: httpx.AsyncClient, url: str, entry: Optional[Dict[str, Any]]
+    ) -> Tuple[int, str, Optional[str], Dict[str, Optional[str]]]:
+        """Conditional GET -> (status, source, html, validators)."""
+        headers = {}
+        if entry and has_cached_html(url):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        await self.scheduler.wait(url)
+        try:
+            response = await client.get(url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"[crawler] Fetch failed for {url}: {e}")
+            return 0, "error", None, {}
+
+        validators = {
+            "etag": response.headers.get("ETag") or (entry or {}).get("etag"),
+            "last_modified": response.headers.get("Last-Modified") or (entry or {}).get("last_modified"),
+        }
+        if response.status_code == 304:
+            return 304, "not_modified", read_cached_html(url), validators
+        if response.status_code != 200 or "html" not in response.headers.get("Content-Type", "html"):
+            return response.status_code, "http", None, validators
+        return 200, "fetched", response.text, validators
+
+    async def _process(self, client: httpx.AsyncClient, url: str, depth: int) -> None:
+        entry = self.previous.get(url)
+        lastmod = self.sitemap.get(url)
+
+        html = None
+        if entry and lastmod and entry.get("lastmod") == lastmod and entry.get("text_hash"):
+            status, source, html, validators = 304, "lastmod", read_cached_html(url), {}
+        if html is None:
+            status, source, html, validators = await self._get(client, url, entry)
+
+        page = None
+        if html is not None:
+            page = await asyncio.get_running_loop().run_in_executor(None, self.parse, html, url)
+            self._seen.add(page["canonical"])
+            if source == "fetched":
+                write_cached_html(page["canonical"], html)
+            if depth < self.max_depth:
+                for link in page["links"]:
+                    self._enqueue(link, depth + 1)
+
+        self.results.append(CrawlResult(url, depth, status, source, page, validators))
+
+    async def _worker(self, client: httpx.AsyncClient) -> None:
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                await self._process(client, url, depth)
+            except Exception as e:
+                print(f"[crawler] Failed on {url}: {e}")
+                self.results.append(CrawlResult(url, depth, 0, "error", None, {}))
+            finally:
+                self._queue.task_done()
+
+    async def crawl(self, seeds: List[str]) -> List[CrawlResult]:
+        """Crawl from `seeds` plus the sitemap; results come back in BFS (depth, discovery) order."""
+        started = time.monotonic()
+        async with self._client() as client:
+            await self._fetch_sitemap(client, SITEMAP_URL)
+            for url in list(seeds) + list(self.sitemap):
+                self._enqueue(url, 0)
+
+            workers = [asyncio.create_task(self._worker(client)) for _ in range(self.max_connections)]
+            await self._queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        self.results.sort(key=lambda r: (r.depth, self._order.get(r.url, 0)))
+        print(
+            f"[crawler] {len(self.results)} URLs in {time.monotonic() - started:.1f}s "
+            f"({self.max_connections} connections, http2={_HTTP2_AVAILABLE})"
+        )
+        return self.results
+
+
+def crawl_site(
+    parse: Callable[[str, str], Dict[str, Any]],
+    previous: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Tuple[Dict[str, Optional[str]], List[CrawlResult]]:
+    """Blocking entry point for the indexer: (sitemap lastmods, crawl results)."""
+
+    async def _run() -> Tuple[Dict[str, Optional[str]], List[CrawlResult]]:
+        crawler = AsyncCrawler(parse, previous)
+        results = await crawler.crawl([urljoin(BASE_URL, p) for p in URL_PATHS])
+        return crawler.sitemap, results
+
+    return asyncio.run(_run())
@@ -0,0 +1,167 @@
+# app/dedup.py
+"""
+Index-time removal of boilerplate blocks and near-duplicate chunks.
+
+Key ideas:
+- Every page of the site shares header/nav/footer and repeated body blocks
+  ("Contact us", newsletter blurbs, client logos). The parser splits text
+  into DOM blocks (p, li, div, h1-h6, ...); each block gets a 64-bit
+  fingerprint of its normalised words. A block whose fingerprint appears on
+  at least INDEX_BOILERPLATE_MIN_PAGES pages and INDEX_BOILERPLATE_MIN_SHARE
+  of all pages is boilerplate and never reaches a chunk.
+- Chunks that are still near-identical (e.g. the same course blurb on two
+  pages) are caught with MinHash over 3-word shingles plus LSH banding:
+  only chunks sharing a band are compared, and a chunk whose estimated
+  Jaccard similarity with a kept chunk reaches INDEX_NEAR_DUP_JACCARD is
+  dropped.
+- The deduplicator counts blocks, chunks and bytes removed; the indexer
+  writes those counts into last_run_summary.json.
+"""
+
+import hashlib
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.Day_19_A import (
+    INDEX_BOILERPLATE_MIN_PAGES,
+    INDEX_BOILERPLATE_MIN_SHARE,
+    INDEX_NEAR_DUP_JACCARD,
+    INDEX_MINHASH_PERMUTATIONS,
+    INDEX_MINHASH_BANDS,
+)
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+# -------------------------------------------------------------------
+# 1. Fingerprints
+# -------------------------------------------------------------------
+
+def block_fingerprint(words: Sequence[str]) -> int:
+    """64-bit fingerprint of a block's lower-cased words."""
+    text = " ".join(w.lower() for w in words)
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def find_boilerplate_blocks(
+    pages_blocks: Iterable[Iterable[int]],
+    min_pages: int = INDEX_BOILERPLATE_MIN_PAGES,
+    min_share: float = INDEX_BOILERPLATE_MIN_SHARE,
+) -> Set[int]:
+    """Fingerprints present on enough distinct pages to count as boilerplate."""
+    counts: Counter = Counter()
+    n_pages = 0
+    for blocks in pages_blocks:
+        counts.update(set(blocks))
+        n_pages += 1
+    needed = max(min_pages, min_share * n_pages)
+    return {fp for fp, pages in counts.items() if pages >= needed}
+
+
+def boilerplate_digest(fingerprints: Iterable[int]) -> str:
+    """Stable id of a boilerplate set; when it changes, every page must be re-chunked."""
+    digest = hashlib.sha256()
+    for fp in sorted(fingerprints):
+        digest.update(fp.to_bytes(8, "big"))
+    return digest.hexdigest()[:16]
+
+
+# -------------------------------------------------------------------
+# 2. MinHash + LSH
+# -------------------------------------------------------------------
+
+class MinHasher:
+    """MinHash signatures over 3-word shingles (universal hashing mod 2^61 - 1)."""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        # a, b < 2^31 keep a * x + b (x < 2^32) inside uint64
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        words = text.lower().split()
+        if len(words) < 3:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashed = (np.outer(x, self._a) + self._b) % np.uint64(_MERSENNE_PRIME) & np.uint64(_MAX_HASH)
+        return hashed.min(axis=0)
+
+
+class ChunkDeduplicator:
+    """Boilerplate-block filter + near-duplicate chunk filter for one indexing run."""
+
+    def __init__(
+        self,
+        boilerplate: Set[int],
+        threshold: float = INDEX_NEAR_DUP_JACCARD,
+        num_perm: int = INDEX_MINHASH_PERMUTATIONS,
+        bands: int = INDEX_MINHASH_BANDS,
+    ):
+        self.boilerplate = boilerplate
+        self.threshold = threshold
+        self.bands = max(1, min(bands, num_perm))
+        self._rows = num_perm // self.bands
+        self._hasher = MinHasher(self._rows * self.bands)
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+        self._signatures: Dict[str, np.ndarray] = {}
+
+        self._blocks_removed = 0
+        self._block_bytes_removed = 0
+        self._chunks_seen = 0
+        self._chunks_removed = 0
+        self._chunk_bytes_removed = 0
+
+    # ---- boilerplate blocks ----------------------------------------
+
+    def is_boilerplate(self, fingerprint: int, words: Sequence[str]) -> bool:
+        if fingerprint not in self.boilerplate:
+            return False
+        self._blocks_removed += 1
+        self._block_bytes_removed += len(" ".join(words).encode("utf-8"))
+        return True
+
+    # ---- near-duplicate chunks -------------------------------------
+
+    def _bands(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self._rows:(band + 1) * self._rows].tobytes()) for band in range(self.bands)]
+
+    def _add(self, chunk_id: str, signature: np.ndarray) -> None:
+        self._signatures[chunk_id] = signature
+        for key in self._bands(signature):
+            self._buckets[key].append(chunk_id)
+
+    def add_existing(self, chunk_id: str, document: str) -> None:
+        """Register a chunk already in the collection (from an unchanged page)."""
+        self._add(chunk_id, self._hasher.signature(document))
+
+    def keep(self, chunk_id: str, document: str) -> bool:
+        """False if `document` near-duplicates a chunk kept earlier; otherwise remember it."""
+        self._chunks_seen += 1
+        signature = self._hasher.signature(document)
+        candidates = {other for key in self._bands(signature) for other in self._buckets.get(key, ())}
+        for other in candidates:
+            if float(np.mean(self._signatures[other] == signature)) >= self.threshold:
+                self._chunks_removed += 1
+                self._chunk_bytes_removed += len(document.encode("utf-8"))
+                return False
+        self._add(chunk_id, signature)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "boilerplate_fingerprints": len(self.boilerplate),
+            "boilerplate_blocks_removed": self._blocks_removed,
+            "boilerplate_bytes_removed": self._block_bytes_removed,
+            "chunks_checked": self._chunks_seen,
+            "near_duplicate_chunks_removed": self._chunks_removed,
+            "near_duplicate_bytes_removed": self._chunk_bytes_removed,
+        }
@@ -0,0 +1,227 @@
+# app/embedding_batcher.py
+"""
+Cross-request micro-batching of query embeddings.
+
+Key ideas:
+- Every KB / FAQ lookup used to embed exactly one query inside
+  collection.query(query_texts=[...]). On CPU-only hosts one forward pass
+  over N sentences is far cheaper than N single-sentence passes.
+- Callers push their text onto a queue and block on a Future. A single
+  background thread drains the queue, waiting at most EMBED_BATCH_MAX_WAIT_MS
+  (or until EMBED_BATCH_MAX_SIZE items) before encoding the whole batch with
+  all-MiniLM-L6-v2 and fanning the vectors back out.
+- Vectors are L2-normalised, matching Chroma's default embedding function,
+  so they can be passed straight to collection.query(query_embeddings=...).
+- The public helpers consult the shared LRU in app/embedding_cache.py first,
+  so a query that was already embedded this process never hits the model.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from app.Day_19_A import (
+    EMBEDDING_MODEL_NAME,
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_MAX_WAIT_MS,
+)
+from app.embedding_cache import get_embedding_cache, normalize_text
+
+
+# -------------------------------------------------------------------
+# 1. Model singleton
+# -------------------------------------------------------------------
+
+_model: Optional[SentenceTransformer] = None
+_model_lock = threading.Lock()
+_warmup_thread: Optional[threading.Thread] = None
+
+
+def get_embedding_model() -> SentenceTransformer:
+    """Return the process-wide sentence-transformer (loaded on first use)."""
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+                print(f"[embedding_batcher] Loaded embedding model: {EMBEDDING_MODEL_NAME}")
+
+    return _model
+
+
+def is_embedding_model_ready() -> bool:
+    """True once the model is in memory (embedding calls will not block on loading)."""
+    return _model is not None
+
+
+def warm_up_embedding_model() -> None:
+    """Start loading the model on a background thread (once), if it is not loaded yet."""
+    global _warmup_thread
+
+    with _model_lock:
+        if _model is not None or _warmup_thread is not None:
+            return
+        _warmup_thread = threading.Thread(target=get_embedding_model, name="embedding-warmup", daemon=True)
+    _warmup_thread.start()
+
+
+# -------------------------------------------------------------------
+# 2. Micro-batcher
+# -------------------------------------------------------------------
+
+class QueryEmbeddingBatcher:
+    """
+    Collects queries arriving within a few milliseconds of each other and
+    embeds them in one forward pass.
+    """
+
+    def __init__(self, max_batch_size: int, max_wait_ms: float):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+
+            # Identical texts in the same batch are encoded once.
+            unique_texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = get_embedding_model().encode(
+                    unique_texts,
+                    batch_size=len(unique_texts),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                    show_progress_bar=False,
+                ).astype(np.float32, copy=False)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            by_text = dict(zip(unique_texts, vectors))
+            for text, future in batch:
+                future.set_result(by_text[text])
+
+            with self._stats_lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the Future resolves to a float32 vector."""
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def embed_many(self, texts: List[str]) -> List[np.ndarray]:
+        futures = [self.submit(t) for t in texts]
+        return [f.result() for f in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "pending": self._queue.qsize(),
+            }
+
+
+_batcher: Optional[QueryEmbeddingBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher() -> QueryEmbeddingBatcher:
+    """Return the process-wide batcher sized from Day_19_A settings."""
+    global _batcher
+
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = QueryEmbeddingBatcher(
+                    max_batch_size=EMBED_BATCH_MAX_SIZE,
+                    max_wait_ms=EMBED_BATCH_MAX_WAIT_MS,
+                )
+
+    return _batcher
+
+
+# -------------------------------------------------------------------
+# 3. Public helpers
+# -------------------------------------------------------------------
+
+def embed_query_vector(text: str) -> np.ndarray:
+    """Embed one query as a normalised, read-only float32 numpy vector."""
+    key = normalize_text(text)
+    cache = get_embedding_cache()
+
+    vector = cache.get(key)
+    if vector is None:
+        vector = cache.put(key, get_embedding_batcher().embed(key))
+    return vector
+
+
+def embed_query_vectors(texts: List[str]) -> List[np.ndarray]:
+    """Embed several queries; only cache misses are sent to the batcher."""
+    keys = [normalize_text(t) for t in texts]
+    cache = get_embedding_cache()
+
+    found = {k: cache.get(k) for k in dict.fromkeys(keys)}
+    missing = [k for k, v in found.items() if v is None]
+    if missing:
+        for key, vector in zip(missing, get_embedding_batcher().embed_many(missing)):
+            found[key] = cache.put(key, vector)
+
+    return [found[k] for k in keys]
+
+
+def embed_query(text: str) -> List[float]:
+    """
+    Embed one query as a plain list of floats, the shape Chroma expects for
+    collection.query(query_embeddings=[...]).
+    """
+    return embed_query_vector(text).tolist()
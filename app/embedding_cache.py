@@ -0,0 +1,114 @@
+# app/embedding_cache.py
+"""
+Process-wide LRU cache of query embeddings.
+
+Key ideas:
+- One user turn embeds essentially the same English text several times
+  (KB retrieval, FAQ suggestions, semantic answer cache). With this cache
+  each distinct query is encoded once per process.
+- Keys are normalised text (Unicode NFKC, lower-cased, whitespace collapsed).
+  all-MiniLM-L6-v2 is an uncased model, so this does not change the vector.
+- Bounded both by entry count and by bytes (vector + key); least recently
+  used entries are evicted first.
+"""
+
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.Day_19_A import EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_MAX_BYTES
+
+
+def normalize_text(text: str) -> str:
+    """Canonical cache key for a query string."""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+class EmbeddingLRUCache:
+    """Thread-safe LRU keyed on normalised text, storing read-only float32 vectors."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _entry_size(key: str, vector: np.ndarray) -> int:
+        return vector.nbytes + len(key.encode("utf-8"))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return vector
+
+    def put(self, key: str, vector: np.ndarray) -> np.ndarray:
+        vector = np.array(vector, dtype=np.float32, copy=True)
+        vector.setflags(write=False)
+        size = self._entry_size(key, vector)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._entry_size(key, old)
+
+            self._entries[key] = vector
+            self._bytes += size
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                old_key, old_vec = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(old_key, old_vec)
+                self._evictions += 1
+
+        return vector
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+_cache: Optional[EmbeddingLRUCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingLRUCache:
+    """Return the process-wide embedding cache."""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingLRUCache(
+                    max_entries=EMBED_CACHE_MAX_ENTRIES,
+                    max_bytes=EMBED_CACHE_MAX_BYTES,
+                )
+
+    return _cache
@@ -0,0 +1,134 @@
+# app/faq_pregen.py
+"""
+Offline pre-generation of answers for the FAQ library.
+
+Key ideas:
+- FAQ_SEED_QUESTIONS and SUGGESTED_FAQS are the one-click buttons of the
+  widget and the Streamlit UI. This job runs each of them through the same
+  clean -> retrieve -> generate steps as a live turn and stores the answer in
+  the answer cache (chat_cache.db), tagged with the KB index version.
+  A click after deploy is then a cache hit.
+- Questions already cached for the current index version are skipped, so
+  the job is cheap to re-run on every deploy; --force regenerates them.
+- FAQ_PREGEN_WORKERS threads share one rate limiter that spaces Gemini calls
+  to FAQ_PREGEN_REQUESTS_PER_MINUTE: every generation call, and every
+  cleaning call the local spell corrector escalates.
+- --languages also translates every answer into each supported language.
+  This warms the translation cache, which from_english() reads at serve time.
+
+Run after (re)indexing:
+    python -m app.faq_pregen [--force] [--languages]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from app.Day_19_A import (
+    FAQ_SEED_QUESTIONS,
+    SUGGESTED_FAQS,
+    SUPPORTED_LANGUAGES,
+    DEFAULT_LANGUAGE,
+    UNCLEAR_QUERY_THRESHOLD,
+    FINAL_FALLBACK_MESSAGE,
+    FAQ_PREGEN_WORKERS,
+    FAQ_PREGEN_REQUESTS_PER_MINUTE,
+)
+from app.Day_19_B import get_kb_index_version, get_kb_search_collection
+from app.Day_19_C import (
+    clean_query_with_gemini,
+    retrieve_context,
+    generate_english_answer,
+    language_translator,
+)
+from app.Day_19_E import save_answer_to_cache
+from app.semantic_cache import get_semantic_cache
+
+
+class _RateLimiter:
+    """Spaces calls at least 60 / per_minute seconds apart across threads."""
+
+    def __init__(self, per_minute: float):
+        self._interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def faq_questions() -> List[str]:
+    """Every one-click question, de-duplicated, suggested ones first."""
+    return list(dict.fromkeys(q.strip() for q in SUGGESTED_FAQS + FAQ_SEED_QUESTIONS if q.strip()))
+
+
+def _pregenerate_one(question: str, index_version: str, collection, limiter: _RateLimiter,
+                     force: bool, languages: bool) -> str:
+    cache = get_semantic_cache()
+    if not force and cache.index_version_of(question) == index_version:
+        return "skipped"
+
+    cleaned_question, _ = clean_query_with_gemini(question, before_gemini=limiter.wait)
+
+    context, distance, top_k_metadata_list = retrieve_context(cleaned_question, collection)
+    if context is None or (distance is not None and distance > UNCLEAR_QUERY_THRESHOLD):
+        return "unclear"
+
+    limiter.wait()
+    answer, source = generate_english_answer(context, cleaned_question, source_label="FAQ Pregen")
+    if source.startswith("Gemini Error") or answer == FINAL_FALLBACK_MESSAGE:
+        return "failed"
+
+    cache_source_tag = top_k_metadata_list[0].get('canonical', 'RAG') if top_k_metadata_list else 'RAG'
+    # Stored under the question as the button sends it, so the click is an exact hit
+    if not save_answer_to_cache(question, answer, cache_source_tag, index_version=index_version):
+        return "failed"
+
+    if languages:
+        for lang in SUPPORTED_LANGUAGES:
+            if lang != DEFAULT_LANGUAGE:
+                language_translator.from_english(answer, lang)
+
+    return "generated"
+
+
+def pregenerate_faq_answers(force: bool = False, languages: bool = False) -> Dict[str, int]:
+    """Generate and cache answers for every FAQ button. Returns outcome counts."""
+    index_version = get_kb_index_version()
+    collection = get_kb_search_collection()
+    limiter = _RateLimiter(FAQ_PREGEN_REQUESTS_PER_MINUTE)
+    questions = faq_questions()
+
+    print(f"[faq_pregen] {len(questions)} questions, index version {index_version}")
+    counts: Dict[str, int] = {"generated": 0, "skipped": 0, "unclear": 0, "failed": 0}
+
+    with ThreadPoolExecutor(max_workers=FAQ_PREGEN_WORKERS, thread_name_prefix="faq-pregen") as pool:
+        futures = {
+            pool.submit(_pregenerate_one, q, index_version, collection, limiter, force, languages): q
+            for q in questions
+        }
+        for future, question in futures.items():
+            try:
+                outcome = future.result()
+            except Exception as e:
+                print(f"[faq_pregen] '{question[:40]}' failed: {e}")
+                outcome = "failed"
+            counts[outcome] += 1
+
+    print(f"[faq_pregen] Done: {counts}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate cached answers for the FAQ library.")
+    parser.add_argument("--force", action="store_true", help="regenerate answers already cached for this index version")
+    parser.add_argument("--languages", action="store_true", help="also pre-translate answers into every supported language")
+    args = parser.parse_args()
+    pregenerate_faq_answers(force=args.force, languages=args.languages)
@@ -0,0 +1,237 @@
+# app/gemini_client.py
+"""
+Shared, pooled HTTP client for every Gemini call.
+
+Key ideas:
+- One httpx.Client (and one httpx.AsyncClient per event loop) per process,
+  with connection pooling and keep-alive, so the cleaning call and the
+  generation call in a turn reuse the same TLS connection instead of each
+  paying a fresh handshake to generativelanguage.googleapis.com.
+- HTTP/2 is used when GEMINI_HTTP2 is on and the optional `h2` package is
+  installed; otherwise HTTP/1.1 keep-alive.
+- Every call takes its own read timeout. Transport errors, 429 and 5xx are
+  retried up to GEMINI_MAX_RETRIES times with exponential backoff and full
+  jitter (a 429's Retry-After is honoured, capped).
+- Sync helpers for the pipeline, which runs on worker threads (main.py's
+  bounded executor); async twins (agenerate_content,
+  astream_generate_content) for code running on the event loop. Both
+  share the retry policy and SSE parsing.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import httpx
+
+from app.Day_19_A import (
+    API_URL,
+    API_STREAM_URL,
+    GEMINI_HTTP_MAX_CONNECTIONS,
+    GEMINI_HTTP_KEEPALIVE_CONNECTIONS,
+    GEMINI_HTTP_KEEPALIVE_EXPIRY,
+    GEMINI_HTTP2,
+    GEMINI_CONNECT_TIMEOUT,
+    GEMINI_MAX_RETRIES,
+    GEMINI_RETRY_BACKOFF_SECONDS,
+)
+
+try:
+    import h2  # noqa: F401  (only needed for HTTP/2)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+_MAX_RETRY_AFTER_SECONDS = 5.0
+_HEADERS = {"Content-Type": "application/json"}
+
+
+# -------------------------------------------------------------------
+# 1. Client singletons
+# -------------------------------------------------------------------
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+_async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "http2": GEMINI_HTTP2 and _HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=GEMINI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=GEMINI_HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=GEMINI_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "headers": _HEADERS,
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide synchronous client."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_kwargs())
+                print(f"[gemini_client] HTTP client ready (http2={_client_kwargs()['http2']})")
+
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the async client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(**_client_kwargs())
+        _async_clients[loop] = client
+    return client
+
+
+def _timeout(read_timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(read_timeout, connect=GEMINI_CONNECT_TIMEOUT)
+
+
+# -------------------------------------------------------------------
+# 2. Retry policy
+# -------------------------------------------------------------------
+
+def _should_retry(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in _RETRY_STATUS
+    return isinstance(exc, httpx.TransportError)
+
+
+def _backoff_delay(attempt: int, exc: Exception) -> float:
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), _MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                pass
+    return random.uniform(0, GEMINI_RETRY_BACKOFF_SECONDS * (2 ** attempt))
+
+
+def extract_text(result: Dict[str, Any], default: str) -> str:
+    """Pull the first candidate's text out of a generateContent response."""
+    candidates = result.get('candidates') or [{}]
+    parts = candidates[0].get('content', {}).get('parts') or [{}]
+    return parts[0].get('text', default)
+
+
+# -------------------------------------------------------------------
+# 3. Sync API
+# -------------------------------------------------------------------
+
+def generate_content(payload: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    """POST a generateContent request and return the decoded JSON body."""
+    attempt = 0
+    while True:
+        try:
+            response = get_http_client().post(API_URL, content=json.dumps(payload), timeout=_timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if attempt >= GEMINI_MAX_RETRIES or not _should_retry(e):
+                raise
+            time.sleep(_backoff_delay(attempt, e))
+            attempt += 1
+
+
+def _parse_sse_line(line: str) -> Iterator[str]:
+    if not line or not line.startswith("data:"):
+        return
+    chunk = json.loads(line[len("data:"):].strip())
+    candidates = chunk.get('candidates') or [{}]
+    for part in candidates[0].get('content', {}).get('parts', []):
+        text = part.get('text')
+        if text:
+            yield text
+
+
+def stream_generate_content(payload: Dict[str, Any], timeout: float = 30) -> Iterator[str]:
+    """
+    Yield answer text fragments from streamGenerateContent (SSE).
+    Retries only happen before the first fragment has been yielded.
+    """
+    attempt = 0
+    while True:
+        yielded = False
+        try:
+            with get_http_client().stream(
+                "POST", API_STREAM_URL, content=json.dumps(payload), timeout=_timeout(timeout)
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    for text in _parse_sse_line(line):
+                        yielded = True
+                        yield text
+            return
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if yielded or attempt >= GEMINI_MAX_RETRIES or not _should_retry(e):
+                raise
+            time.sleep(_backoff_delay(attempt, e))
+            attempt += 1
+
+
+# -------------------------------------------------------------------
+# 4. Async API
+# -------------------------------------------------------------------
+
+async def agenerate_content(payload: Dict[str, Any], timeout: float = 30) -> Dict[str, Any]:
+    """Async twin of generate_content()."""
+    attempt = 0
+    while True:
+        try:
+            response = await get_async_http_client().post(
+                API_URL, content=json.dumps(payload), timeout=_timeout(timeout)
+            )
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if attempt >= GEMINI_MAX_RETRIES or not _should_retry(e):
+                raise
+            await asyncio.sleep(_backoff_delay(attempt, e))
+            attempt += 1
+
+
+async def astream_generate_content(payload: Dict[str, Any], timeout: float = 30) -> AsyncIterator[str]:
+    """Async twin of stream_generate_content()."""
+    attempt = 0
+    while True:
+        yielded = False
+        try:
+            async with get_async_http_client().stream(
+                "POST", API_STREAM_URL, content=json.dumps(payload), timeout=_timeout(timeout)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    for text in _parse_sse_line(line):
+                        yielded = True
+                        yield text
+            return
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if yielded or attempt >= GEMINI_MAX_RETRIES or not _should_retry(e):
+                raise
+            await asyncio.sleep(_backoff_delay(attempt, e))
+            attempt += 1
+
+
+async def aclose_clients() -> None:
+    """Close pooled connections, sync and async (FastAPI shutdown hook)."""
+    global _client
+    for client in list(_async_clients.values()):
+        await client.aclose()
+    _async_clients.clear()
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
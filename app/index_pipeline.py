@@ -0,0 +1,341 @@
+# app/index_pipeline.py
+"""
+Streaming HTML -> text -> chunk -> embed pipeline for the indexer.
+
+Key ideas:
+- PageTextParser is an incremental html.parser.HTMLParser: HTML is fed in
+  INDEX_HTML_READ_CHARS pieces straight from crawler_cache/, and words come
+  out as they are parsed. No DOM tree and no whole-page text string. Text
+  cut off mid-word at the end of one piece is joined to the next.
+- Boilerplate (script/style/nav/header/footer/form, ...) is skipped while
+  parsing. Links inside nav/footer are still collected: they drive the crawl.
+- Every word carries the h1-h3 heading it sits under, so each chunk gets
+  its own heading trail in metadata instead of the page's full list.
+- iter_chunks() is a sliding CHUNK_SIZE / OVERLAP word window that yields
+  chunks lazily; chunks of all changed pages flow into fixed-size batches
+  of INDEX_EMBED_BATCH_SIZE, each embedded in one encode() call and upserted
+  in one call. Memory stays at one page piece + one batch.
+- extract_page() (the crawler's parse step) runs the same parser but keeps
+  only a running SHA-256 of the words, so change detection and indexing
+  agree on what a page's text is.
+- Text is grouped into DOM blocks so that boilerplate blocks and
+  near-duplicate chunks can be dropped on the way (app/dedup.py).
+- The blocks of every page chunked are also stored as a text sidecar
+  (app/page_cache.py); as long as the page's text_hash is unchanged,
+  re-chunking streams the sidecar and skips HTML parsing.
+"""
+
+import hashlib
+import json
+from html.parser import HTMLParser
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from chromadb.api.models.Collection import Collection
+
+from app.Day_19_A import (
+    CHUNK_SIZE,
+    OVERLAP,
+    INDEX_EMBED_BATCH_SIZE,
+    INDEX_HTML_READ_CHARS,
+)
+from app.crawler import canonical_url, is_crawlable
+from app.dedup import ChunkDeduplicator, block_fingerprint
+from app.embedding_batcher import get_embedding_model
+from app.page_cache import iter_text_sidecar, open_cached_html, text_sidecar_writer, url_key
+
+
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "nav", "header", "footer", "form"}
+_HEADING_TAGS = {"h1", "h2", "h3"}
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "aside", "li", "ul", "ol", "dl", "dt", "dd",
+    "table", "tr", "td", "th", "blockquote", "pre", "figure", "figcaption", "address",
+    "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr",
+}
+_MAX_HEADINGS_PER_CHUNK = 8
+
+# (word, index into PageTextParser.headings or -1)
+Word = Tuple[str, int]
+
+
+# -------------------------------------------------------------------
+# 1. Incremental parser
+# -------------------------------------------------------------------
+
+class PageTextParser(HTMLParser):
+    """Feed HTML in pieces; drain() returns the blocks of words completed so far."""
+
+    def __init__(self, url: str):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.title = ""
+        self.canonical = url
+        self.headings: List[str] = []
+        self.links: Dict[str, None] = {}  # ordered set
+
+        self._skip: List[str] = []
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._heading_parts: Optional[List[str]] = None
+        self._heading_idx = -1
+        self._block: List[Word] = []
+        self._blocks: List[List[Word]] = []
+        # Last text ended mid-word with no tag since: the next text may continue it
+        self._open_word = False
+
+    def _flush(self) -> None:
+        if self._block:
+            self._blocks.append(self._block)
+            self._block = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._open_word = False
+        if tag == "a" or tag == "link":
+            href = dict(attrs).get("href")
+            if href:
+                target = urljoin(self.url, href)
+                if tag == "a" and is_crawlable(target):
+                    self.links[canonical_url(target)] = None
+                elif tag == "link" and "canonical" in (dict(attrs).get("rel") or "").lower().split():
+                    if is_crawlable(target):
+                        self.canonical = canonical_url(target)
+
+        if tag in _SKIP_TAGS:
+            self._skip.append(tag)
+        elif tag == "title" and not self.title:
+            self._in_title = True
+        elif tag in _HEADING_TAGS and not self._skip:
+            self._flush()
+            self._heading_parts = []
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag: str) -> None:
+        self._open_word = False
+        if tag in self._skip:
+            # Pop back to the matching open tag (tolerates unclosed children)
+            while self._skip and self._skip.pop() != tag:
+                pass
+        elif tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = " ".join(" ".join(self._title_parts).split())
+        elif tag in _HEADING_TAGS and self._heading_parts is not None:
+            words = " ".join(self._heading_parts).split()
+            self._heading_parts = None
+            if words:
+                self.headings.append(" ".join(words))
+                self._heading_idx = len(self.headings) - 1
+                self._blocks.append([(w, self._heading_idx) for w in words])
+        elif tag in _BLOCK_TAGS:
+            self._flush()
+
+    @staticmethod
+    def _append_text(parts: List[str], data: str, continues: bool) -> None:
+        if continues and parts:
+            parts[-1] += data
+        else:
+            parts.append(data)
+
+    def handle_data(self, data: str) -> None:
+        if not data:
+            return
+        # feed() pieces are cut at arbitrary characters, so text can arrive mid-word
+        continues = self._open_word and not data[0].isspace()
+        self._open_word = not data[-1].isspace()
+        if self._in_title:
+            self._append_text(self._title_parts, data, continues)
+        elif self._skip:
+            return
+        elif self._heading_parts is not None:
+            self._append_text(self._heading_parts, data, continues)
+        else:
+            words = data.split()
+            if continues and self._block:
+                words[0] = self._block.pop()[0] + words[0]
+            self._block.extend((w, self._heading_idx) for w in words)
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+
+    def drain(self) -> List[List[Word]]:
+        blocks, self._blocks = self._blocks, []
+        return blocks
+
+
+def iter_html_pieces(url: str, piece_chars: int = INDEX_HTML_READ_CHARS) -> Iterator[str]:
+    """The cached HTML of `url`, decompressed from crawler_cache/ in pieces."""
+    with open_cached_html(url) as f:
+        while True:
+            piece = f.read(piece_chars)
+            if not piece:
+                return
+            yield piece
+
+
+def iter_blocks(parser: PageTextParser, pieces: Iterable[str]) -> Iterator[List[Word]]:
+    for piece in pieces:
+        parser.feed(piece)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def iter_page_blocks(parser: PageTextParser, url: str, text_hash: Optional[str]) -> Iterator[List[Word]]:
+    """
+    Blocks of the cached page `url`: streamed from its text sidecar when that
+    was extracted from `text_hash`, else parsed from the HTML while a new
+    sidecar is written alongside. `parser.headings` fills up either way.
+    """
+    stored = iter_text_sidecar(url, text_hash)
+    if stored is not None:
+        for heading_idx, text in stored:
+            # A heading's own block is the first one under it
+            if heading_idx == len(parser.headings):
+                parser.headings.append(text)
+            yield [(w, heading_idx) for w in text.split()]
+        return
+
+    with text_sidecar_writer(url, text_hash) as write:
+        for block in iter_blocks(parser, iter_html_pieces(url)):
+            # A block never spans a heading, so one index covers all its words
+            write([block[0][1], " ".join(w for w, _ in block)])
+            yield block
+
+
+def iter_words(blocks: Iterable[List[Word]], dedup: Optional[ChunkDeduplicator] = None) -> Iterator[Word]:
+    """Words of every block, minus the blocks `dedup` knows to be boilerplate."""
+    for block in blocks:
+        if dedup is not None:
+            words = [w for w, _ in block]
+            if dedup.is_boilerplate(block_fingerprint(words), words):
+                continue
+        yield from block
+
+
+# -------------------------------------------------------------------
+# 2. Crawl-time extraction
+# -------------------------------------------------------------------
+
+def extract_page(html: str, url: str) -> Dict[str, Any]:
+    """
+    The crawler's parse step: title, canonical, headings, links and a hash of
+    the extracted words, plus the fingerprint of every block (for boilerplate
+    detection across pages). The text itself is not kept.
+    """
+    parser = PageTextParser(url)
+    digest = hashlib.sha256()
+    word_count = 0
+    fingerprints: Dict[int, None] = {}
+    pieces = (html[i:i + INDEX_HTML_READ_CHARS] for i in range(0, len(html), INDEX_HTML_READ_CHARS))
+    for block in iter_blocks(parser, pieces):
+        words = [w for w, _ in block]
+        fingerprints[block_fingerprint(words)] = None
+        for word in words:
+            digest.update((" " + word if word_count else word).encode("utf-8"))
+            word_count += 1
+
+    return {
+        "title": parser.title,
+        "canonical": parser.canonical,
+        "headings": parser.headings[:20],
+        "links": list(parser.links),
+        "word_count": word_count,
+        "text_hash": digest.hexdigest(),
+        "block_fingerprints": list(fingerprints),
+    }
+
+
+# -------------------------------------------------------------------
+# 3. Chunking
+# -------------------------------------------------------------------
+
+def iter_chunks(words: Iterable[Word], size: int = CHUNK_SIZE, overlap: int = OVERLAP) -> Iterator[List[Word]]:
+    """Windows of `size` words, each sharing `overlap` with the previous one; the last may be shorter."""
+    step = max(1, size - overlap)
+    window: List[Word] = []
+    fresh = 0  # words in the window not yet emitted in a chunk
+    for word in words:
+        window.append(word)
+        fresh += 1
+        if len(window) == size:
+            yield window
+            window = window[step:]
+            fresh = 0
+    if fresh:
+        yield window
+
+
+def _heading_trail(window: List[Word], headings: List[str]) -> List[str]:
+    indices = dict.fromkeys(idx for _, idx in window if idx >= 0)
+    return [headings[i] for i in islice(indices, _MAX_HEADINGS_PER_CHUNK)]
+
+
+def iter_chunk_records(
+    pages: Iterable[Tuple[str, Dict[str, Any]]], dedup: Optional[ChunkDeduplicator] = None
+) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    (chunk_id, document, metadata) for every chunk of every (canonical, page)
+    given. With `dedup`, boilerplate blocks and near-duplicate chunks are left out.
+    """
+    for url, page in pages:
+        prefix = url_key(url)[:16]
+        path = urlsplit(url).path or "/"
+        parser = PageTextParser(url)
+        blocks = iter_page_blocks(parser, page.get("cache_url", url), page.get("text_hash"))
+        words = iter_words(blocks, dedup)
+        for i, window in enumerate(iter_chunks(words)):
+            chunk_id, document = f"{prefix}-{i:04d}", " ".join(w for w, _ in window)
+            if dedup is not None and not dedup.keep(chunk_id, document):
+                continue
+            yield chunk_id, document, {
+                "path": path,
+                "canonical": url,
+                "url": url,
+                "title": page.get("title") or parser.title,
+                "headings": json.dumps(_heading_trail(window, parser.headings), ensure_ascii=False),
+                "chunk_index": i,
+                "text_hash": page["text_hash"],
+            }
+
+
+# -------------------------------------------------------------------
+# 4. Batched embed + upsert
+# -------------------------------------------------------------------
+
+def iter_batches(records: Iterable[Any], batch_size: int = INDEX_EMBED_BATCH_SIZE) -> Iterator[List[Any]]:
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def index_pages(
+    collection: Collection,
+    pages: Iterable[Tuple[str, Dict[str, Any]]],
+    dedup: Optional[ChunkDeduplicator] = None,
+) -> Dict[str, List[str]]:
+    """
+    Stream every given page through parse -> chunk -> (dedup) -> embed -> upsert.
+    Returns canonical URL -> chunk ids written.
+    """
+    model = get_embedding_model()
+    written: Dict[str, List[str]] = {}
+    for batch in iter_batches(iter_chunk_records(pages, dedup)):
+        ids = [chunk_id for chunk_id, _, _ in batch]
+        documents = [doc for _, doc, _ in batch]
+        metadatas = [meta for _, _, meta in batch]
+        embeddings = model.encode(
+            documents,
+            batch_size=len(documents),
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings.tolist())
+        for chunk_id, meta in zip(ids, metadatas):
+            written.setdefault(meta["canonical"], []).append(chunk_id)
+    return written
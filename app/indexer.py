@@ -0,0 +1,246 @@
+# app/indexer.py
+"""
+Incremental crawl + re-index of the website KB.
+
+Key ideas:
+- crawler_cache/manifest.json remembers, per canonical URL, the HTTP
+  validators (ETag / Last-Modified), the sitemap <lastmod>, a SHA-256 of
+  the extracted text and the ids of the chunks indexed for it.
+- Fetching is done by the async crawler (app/crawler.py). Pages whose
+  sitemap <lastmod> is unchanged are not fetched at all; the rest are
+  fetched with If-None-Match / If-Modified-Since, and a 304 reuses the
+  compressed HTML in crawler_cache/ (app/page_cache.py). The manifest also
+  names each page's cache files.
+- A page is re-chunked and re-embedded only when its text hash changed,
+  by the streaming parse -> chunk -> embed pipeline (app/index_pipeline.py).
+  Pages that disappeared (no longer linked, or 404/410) have their chunks
+  deleted. A run that hit network errors never deletes unseen pages.
+- Blocks repeated across pages and near-duplicate chunks are left out
+  (app/dedup.py). If the set of boilerplate blocks changes, every page is
+  re-chunked.
+- Each run writes last_run_summary.json with the usual totals plus a
+  "diff" (added / changed / removed URLs, unchanged counts) and a "dedup"
+  report of the blocks, chunks and bytes removed.
+- Every run ends by publishing the KB as an immutable versioned artifact
+  (app/kb_versions.py); servers notice the new CURRENT version and swap to
+  it without a restart.
+
+Run locally, then commit app/chroma_db_leanext (app/kb_index_versions is gitignored;
+start.sh publishes the committed DB on deploy):
+    python -m app.indexer [--force]
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from chromadb.api.models.Collection import Collection
+
+from app.Day_19_A import (
+    SCRAPE_MAX_DEPTH,
+    RENDER_JS,
+    CRAWL_MANIFEST_PATH,
+    CRAWL_SUMMARY_PATH,
+    INDEX_EMBED_BATCH_SIZE,
+)
+from app.crawler import crawl_site
+from app.dedup import ChunkDeduplicator, boilerplate_digest, find_boilerplate_blocks
+from app.index_pipeline import extract_page, index_pages
+from app.kb_versions import publish_kb_version
+from app.page_cache import cached_files, has_cached_html, remove_cached_page
+
+
+# -------------------------------------------------------------------
+# 1. Manifest
+# -------------------------------------------------------------------
+
+def load_manifest() -> Dict[str, Any]:
+    """
+    {"pages": canonical URL -> {etag, last_modified, lastmod, text_hash,
+    chunk_ids, title, fetched_at, cache_key, html_file, text_file},
+    "boilerplate": id of the boilerplate set}.
+    """
+    try:
+        with open(CRAWL_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    return {"pages": manifest.get("pages", {}), "boilerplate": manifest.get("boilerplate")}
+
+
+def save_manifest(pages: Dict[str, Dict[str, Any]], boilerplate: Optional[str] = None) -> None:
+    tmp_path = CRAWL_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": 2, "pages": pages, "boilerplate": boilerplate}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, CRAWL_MANIFEST_PATH)
+
+
+# -------------------------------------------------------------------
+# 2. Collection updates
+# -------------------------------------------------------------------
+
+def _delete_page_chunks(collection: Collection, url: str, chunk_ids: Optional[List[str]]) -> None:
+    if chunk_ids:
+        collection.delete(ids=chunk_ids)
+    # Also catches chunks indexed before the manifest existed
+    collection.delete(where={"canonical": url})
+
+
+def _register_existing_chunks(collection: Collection, dedup: ChunkDeduplicator, chunk_ids: List[str]) -> None:
+    """Let new chunks be checked against the chunks of pages that were not re-indexed."""
+    for start in range(0, len(chunk_ids), INDEX_EMBED_BATCH_SIZE):
+        data = collection.get(ids=chunk_ids[start:start + INDEX_EMBED_BATCH_SIZE], include=["documents"])
+        for chunk_id, document in zip(data.get("ids") or [], data.get("documents") or []):
+            dedup.add_existing(chunk_id, document or "")
+
+
+# -------------------------------------------------------------------
+# 3. Incremental run
+# -------------------------------------------------------------------
+
+def _write_summary(summary: Dict[str, Any]) -> None:
+    with open(CRAWL_SUMMARY_PATH, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4)
+
+
+def run_incremental_index(collection: Collection, force: bool = False) -> Dict[str, Any]:
+    """
+    Crawl the site and bring `collection` up to date, touching only pages
+    whose extracted text changed. `force` ignores validators and hashes.
+    Returns the summary written to last_run_summary.json.
+    """
+    started = time.time()
+    manifest_doc = load_manifest()
+    manifest = manifest_doc["pages"]
+    previous = {} if force else manifest
+    if collection.count() == 0:
+        # Nothing indexed yet (new DB): keep validators, but re-index every page
+        previous = {url: {**entry, "text_hash": None, "chunk_ids": []} for url, entry in previous.items()}
+
+    sitemap, results = crawl_site(extract_page, previous)
+
+    # Boilerplate is decided over the whole crawl; a different set changes every page's chunks
+    crawled = {r.page["canonical"]: r.page for r in results if r.page is not None}
+    boilerplate = find_boilerplate_blocks(page["block_fingerprints"] for page in crawled.values())
+    boilerplate_id = boilerplate_digest(boilerplate)
+    rechunk_all = boilerplate_id != manifest_doc["boilerplate"]
+    if rechunk_all and manifest:
+        print(f"[indexer] Boilerplate changed ({len(boilerplate)} blocks): re-chunking every page")
+
+    pages: Dict[str, Dict[str, Any]] = {}
+    diff: Dict[str, Any] = {"added": [], "changed": [], "removed": [], "unchanged": 0, "rechunked": 0,
+                            "not_modified": 0, "skipped_lastmod": 0, "errors": 0}
+    gone = set()
+    to_index: List[Tuple[str, Dict[str, Any]]] = []
+    cache_urls: Dict[str, str] = {}
+
+    for result in results:
+        url, status, page = result.url, result.status, result.page
+        if result.source == "not_modified":
+            diff["not_modified"] += 1
+        elif result.source == "lastmod":
+            diff["skipped_lastmod"] += 1
+        elif status == 0:
+            diff["errors"] += 1
+        elif status in (404, 410):
+            gone.add(url)
+
+        if page is None:
+            if status == 0 and previous.get(url):
+                pages[url] = previous[url]  # Unreachable this run: keep what is indexed
+            continue
+
+        canonical = page["canonical"]
+        if canonical in pages:
+            continue  # Alias of a page already handled this run
+        known = previous.get(canonical) or {}
+
+        record = {
+            "etag": result.validators.get("etag", known.get("etag")),
+            "last_modified": result.validators.get("last_modified", known.get("last_modified")),
+            "lastmod": sitemap.get(canonical, sitemap.get(url)),
+            "text_hash": page["text_hash"],
+            "title": page["title"],
+            "fetched_at": time.time() if status == 200 else known.get("fetched_at"),
+            "chunk_ids": known.get("chunk_ids", []),
+        }
+
+        # Fetched pages are cached under their canonical URL, 304s under the requested one
+        cache_url = cache_urls[canonical] = canonical if has_cached_html(canonical) else url
+
+        text_unchanged = known.get("text_hash") == page["text_hash"]
+        if text_unchanged and not rechunk_all:
+            diff["unchanged"] += 1
+        else:
+            _delete_page_chunks(collection, canonical, known.get("chunk_ids"))
+            to_index.append((canonical, {**page, "cache_url": cache_url}))
+            if text_unchanged:
+                diff["rechunked"] += 1
+            else:
+                diff["changed" if known.get("text_hash") else "added"].append(canonical)
+
+        pages[canonical] = record
+
+    dedup = ChunkDeduplicator(boilerplate)
+    reindexed = {canonical for canonical, _page in to_index}
+    _register_existing_chunks(
+        collection, dedup,
+        [cid for canonical, record in pages.items() if canonical not in reindexed for cid in record["chunk_ids"]],
+    )
+
+    # One streaming pass over every new/changed page, embedded in fixed-size batches
+    written = index_pages(collection, to_index, dedup)
+    for canonical, _page in to_index:
+        pages[canonical]["chunk_ids"] = written.get(canonical, [])
+        print(f"[indexer] Indexed {len(pages[canonical]['chunk_ids'])} chunks for {canonical}")
+    for canonical, cache_url in cache_urls.items():
+        pages[canonical].update(cached_files(cache_url))
+
+    # Deleting unseen pages is only safe when the crawl itself was clean
+    for url, entry in manifest.items():
+        if url in pages or (diff["errors"] and url not in gone):
+            if url not in pages:
+                pages[url] = entry
+            continue
+        _delete_page_chunks(collection, url, entry.get("chunk_ids"))
+        remove_cached_page(url)
+        diff["removed"].append(url)
+        print(f"[indexer] Removed {url}")
+
+    save_manifest(pages, boilerplate_id)
+
+    summary = {
+        "timestamp": time.time(),
+        "total_chunks": collection.count(),
+        "unique_pages_indexed": len(pages),
+        "max_depth": SCRAPE_MAX_DEPTH,
+        "js_rendered": RENDER_JS,
+        "sitemap_only": False,
+        "canonical_urls": list(pages),
+        "duration_seconds": round(time.time() - started, 2),
+        "diff": diff,
+        "dedup": dedup.stats(),
+    }
+    try:
+        # Immutable artifact + CURRENT pointer: running servers hot-swap to it
+        summary["kb_version"] = publish_kb_version(collection, summary)
+    except Exception as e:
+        print(f"[indexer] Could not publish a KB version: {e}")
+        summary["kb_version"] = None
+    _write_summary(summary)
+    print(
+        f"[indexer] Done: +{len(diff['added'])} ~{len(diff['changed'])} -{len(diff['removed'])} "
+        f"={diff['unchanged']} pages, {summary['total_chunks']} chunks, KB version {summary['kb_version']}"
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally crawl the site and update the KB collection.")
+    parser.add_argument("--force", action="store_true", help="ignore validators and text hashes; re-index every page")
+    args = parser.parse_args()
+
+    from app.Day_19_B import load_or_build_knowledge_base
+    load_or_build_knowledge_base(reindex=True, force=args.force)
@@ -0,0 +1,352 @@
+# app/kb_versions.py
+"""
+Versioned, immutable KB index artifacts and their hot swap in a running server.
+
+Key ideas:
+- After every indexer run, publish_kb_version() exports the KB into
+  KB_VERSIONS_DIR/<version>/ (kb_index.lbx from app/mmap_index.py plus a
+  manifest.json). The version id is the content fingerprint of the chunks,
+  the same id cached answers are tagged with. A published directory is
+  never modified. The CURRENT pointer file is switched with an atomic
+  rename, and versions beyond KB_VERSIONS_KEEP are pruned.
+- KBSnapshot bundles everything derived from one KB version: the vector
+  index, the BM25 index, the chunk store and the version id. It also
+  answers Chroma's .query()/.count(), so the pipeline uses it as its
+  collection; a request that holds a snapshot only ever sees that version.
+- KBVersionManager holds the current snapshot. A poll thread (every
+  KB_VERSION_POLL_SECONDS) or POST /admin/kb/reload notices a new version,
+  builds its snapshot in the background and swaps one reference.
+  In-flight requests finish on the old snapshot; listeners rebuild caches
+  that depend on the KB version.
+- KB_VERSIONS_DIR is not committed (.gitignore). Only the Chroma DB is
+  committed. On deploy, start.sh runs `python -m app.kb_versions`, which
+  publishes that DB. A fresh checkout therefore ships exactly CURRENT plus
+  the live version.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from chromadb.api.models.Collection import Collection
+
+from app.Day_19_A import (
+    KB_VERSIONS_DIR,
+    KB_VERSIONS_KEEP,
+    KB_VERSION_POLL_SECONDS,
+)
+from app.chunk_store import ChunkStore
+from app.lexical_index import BM25Index
+from app.mmap_index import export_mmap_index
+from app.vector_index import InMemoryVectorIndex
+
+
+KB_INDEX_FILENAME = "kb_index.lbx"
+_CURRENT_FILE = os.path.join(KB_VERSIONS_DIR, "CURRENT")
+
+
+def kb_fingerprint(ids: Sequence[str], documents: Sequence[Optional[str]]) -> str:
+    """Short fingerprint of the KB contents (chunk ids + texts)."""
+    digest = hashlib.sha256()
+    for chunk_id, doc in sorted(zip(ids, documents), key=lambda pair: pair[0]):
+        digest.update(str(chunk_id).encode("utf-8") + b"\0" + (doc or "").encode("utf-8") + b"\0")
+    return digest.hexdigest()[:12]
+
+
+# -------------------------------------------------------------------
+# 1. Artifacts on disk
+# -------------------------------------------------------------------
+
+def kb_version_index_path(version: str) -> str:
+    return os.path.join(KB_VERSIONS_DIR, version, KB_INDEX_FILENAME)
+
+
+def read_current_version() -> Optional[str]:
+    """The version CURRENT points at, or None if nothing has been published."""
+    try:
+        with open(_CURRENT_FILE, "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return version if version and os.path.exists(kb_version_index_path(version)) else None
+
+
+def _write_current(version: str) -> None:
+    tmp_path = f"{_CURRENT_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, _CURRENT_FILE)
+
+
+def _prune_versions(keep: int, protect: str) -> None:
+    """Delete the oldest published versions beyond `keep` (never `protect`)."""
+    versions = sorted(
+        (name for name in os.listdir(KB_VERSIONS_DIR)
+         if os.path.isdir(os.path.join(KB_VERSIONS_DIR, name)) and ".tmp" not in name),
+        key=lambda name: os.path.getmtime(os.path.join(KB_VERSIONS_DIR, name)),
+        reverse=True,
+    )
+    for name in versions[max(1, keep):]:
+        if name != protect:
+            # Processes still mapping the old file keep their pages until they swap
+            shutil.rmtree(os.path.join(KB_VERSIONS_DIR, name), ignore_errors=True)
+            print(f"[kb_versions] Pruned KB version {name}")
+
+
+def publish_kb_version(collection: Collection, summary: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Export `collection` as an immutable versioned artifact and point CURRENT
+    at it. Publishing unchanged contents again only re-points CURRENT.
+    Returns the version id.
+    """
+    index = InMemoryVectorIndex.from_collection(collection)
+    version = kb_fingerprint(index.ids, index.documents)
+    final_dir = os.path.join(KB_VERSIONS_DIR, version)
+
+    if not os.path.isdir(final_dir):
+        os.makedirs(KB_VERSIONS_DIR, exist_ok=True)
+        tmp_dir = f"{final_dir}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        export_mmap_index(index, os.path.join(tmp_dir, KB_INDEX_FILENAME))
+        manifest = {
+            "version": version,
+            "created_at": time.time(),
+            "collection": collection.name,
+            "chunks": len(index),
+            "dim": index.dim,
+            "space": index.space,
+            "index_file": KB_INDEX_FILENAME,
+            "crawl": {k: (summary or {}).get(k) for k in ("timestamp", "unique_pages_indexed", "diff", "dedup")},
+        }
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        try:
+            os.rename(tmp_dir, final_dir)
+        except OSError:
+            # Another publisher got there first with the same contents
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        print(f"[kb_versions] Published KB version {version} ({len(index)} chunks)")
+
+    _write_current(version)
+    _prune_versions(KB_VERSIONS_KEEP, protect=version)
+    return version
+
+
+# -------------------------------------------------------------------
+# 2. Snapshot of one version
+# -------------------------------------------------------------------
+
+class KBSnapshot:
+    """
+    Everything derived from one KB version. Backed by a vector index
+    (numpy / mmap backends) or by a Chroma collection ("chroma" backend).
+    """
+
+    def __init__(
+        self,
+        version: Optional[str] = None,
+        vector_index: Optional[InMemoryVectorIndex] = None,
+        collection: Optional[Collection] = None,
+        name: str = "leanext_kb",
+    ):
+        self.vector_index = vector_index
+        self.collection = collection
+        self.name = name
+        self.loaded_at = time.time()
+        self._version = version
+        self._columns: Optional[Tuple[Sequence[str], Sequence[Optional[str]], Sequence[Optional[Dict[str, Any]]]]] = None
+        self._lexical_index: Optional[BM25Index] = None
+        self._chunk_store: Optional[ChunkStore] = None
+        self._lock = threading.Lock()
+
+    def columns(self) -> Tuple[Sequence[str], Sequence[Optional[str]], Sequence[Optional[Dict[str, Any]]]]:
+        """(ids, documents, metadatas) of every chunk in this version."""
+        if self._columns is None:
+            with self._lock:
+                if self._columns is None:
+                    if self.vector_index is not None:
+                        index = self.vector_index
+                        self._columns = (index.ids, index.documents, index.metadatas)
+                    else:
+                        data = self.collection.get(include=["documents", "metadatas"])
+                        self._columns = (data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or [])
+        return self._columns
+
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            ids, documents, _metadatas = self.columns()
+            self._version = kb_fingerprint(ids, documents)
+        return self._version
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        if self._lexical_index is None:
+            columns = self.columns()
+            with self._lock:
+                if self._lexical_index is None:
+                    self._lexical_index = BM25Index(*columns)
+        return self._lexical_index
+
+    @property
+    def chunk_store(self) -> ChunkStore:
+        if self._chunk_store is None:
+            ids, _documents, metadatas = self.columns()
+            with self._lock:
+                if self._chunk_store is None:
+                    self._chunk_store = ChunkStore(ids, metadatas)
+        return self._chunk_store
+
+    def warm(self) -> "KBSnapshot":
+        """Build every derived structure now (before the snapshot goes live)."""
+        self.version, self.lexical_index, self.chunk_store
+        return self
+
+    # ---- Chroma-compatible surface ---------------------------------
+
+    def count(self) -> int:
+        return len(self.vector_index) if self.vector_index is not None else self.collection.count()
+
+    def query(
+        self,
+        query_embeddings: List[List[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        if self.vector_index is not None:
+            return self.vector_index.query_batch(query_embeddings, n_results=n_results, where=where)
+        return self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            where=where or {},
+            include=include or ["documents", "metadatas", "distances"],
+        )
+
+
+# -------------------------------------------------------------------
+# 3. Hot swap
+# -------------------------------------------------------------------
+
+class KBVersionManager:
+    """Holds the live KBSnapshot and swaps in new versions in the background."""
+
+    def __init__(
+        self,
+        loader: Callable[[Optional[str]], KBSnapshot],
+        versioned: bool,
+        poll_seconds: float = KB_VERSION_POLL_SECONDS,
+    ):
+        self._loader = loader
+        self.versioned = versioned
+        self.poll_seconds = poll_seconds
+        self._snapshot: Optional[KBSnapshot] = None
+        self._lock = threading.Lock()
+        self._loading: Optional[threading.Thread] = None
+        self._watcher: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[str], None]] = []
+
+        self._swaps = 0
+        self._failed_loads = 0
+        self._last_error: Optional[str] = None
+
+    def current(self) -> KBSnapshot:
+        """The live snapshot (loaded synchronously on first use)."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    target = read_current_version() if self.versioned else None
+                    self._snapshot = self._loader(target)
+                snapshot = self._snapshot
+        return snapshot
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """`callback(new_version)` runs after every swap."""
+        self._listeners.append(callback)
+
+    def _load_and_swap(self, version: Optional[str]) -> None:
+        try:
+            snapshot = self._loader(version).warm()
+        except Exception as e:
+            with self._lock:
+                self._failed_loads += 1
+                self._last_error = str(e)
+                self._loading = None
+            print(f"[kb_versions] Loading KB version {version} failed, keeping the current one: {e}")
+            return
+
+        # Swap and clear the flag together: a reload can only start once this one is live
+        with self._lock:
+            old, self._snapshot = self._snapshot, snapshot
+            self._swaps += 1
+            self._loading = None
+        print(f"[kb_versions] Swapped KB {old.version if old else None} -> {snapshot.version}")
+
+        for callback in self._listeners:
+            try:
+                callback(snapshot.version)
+            except Exception as e:
+                print(f"[kb_versions] Version listener failed: {e}")
+
+    def check_for_update(self, force: bool = False) -> bool:
+        """
+        Start a background load if CURRENT names a version other than the
+        live one (or always, with `force`). Returns True if a load started.
+        """
+        if self._snapshot is None:
+            return False  # nothing live yet; the first current() loads the newest version
+        target = read_current_version() if self.versioned else None
+        if not force and (target is None or target == self._snapshot.version):
+            return False
+
+        with self._lock:
+            if self._loading is not None:
+                return False
+            loader = threading.Thread(
+                target=self._load_and_swap, args=(target,), name="kb-version-load", daemon=True
+            )
+            self._loading = loader
+        loader.start()
+        return True
+
+    def start_watcher(self) -> None:
+        """Poll CURRENT every poll_seconds (once per process)."""
+        if self._watcher is not None or not self.versioned or self.poll_seconds <= 0:
+            return
+
+        def _watch() -> None:
+            while True:
+                time.sleep(self.poll_seconds)
+                try:
+                    self.check_for_update()
+                except Exception as e:
+                    print(f"[kb_versions] Version check failed: {e}")
+
+        self._watcher = threading.Thread(target=_watch, name="kb-version-watch", daemon=True)
+        self._watcher.start()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "live_version": snapshot.version if snapshot else None,
+            "published_version": read_current_version() if self.versioned else None,
+            "loaded_at": snapshot.loaded_at if snapshot else None,
+            "loading": self._loading is not None,
+            "swaps": self._swaps,
+            "failed_loads": self._failed_loads,
+            "last_error": self._last_error,
+        }
+
+
+if __name__ == "__main__":
+    from app.Day_19_B import get_kb_collection
+
+    publish_kb_version(get_kb_collection())
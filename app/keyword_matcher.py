@@ -0,0 +1,57 @@
+# app/keyword_matcher.py
+"""
+Compiled keyword matchers for small talk and lead triggers.
+
+Key ideas:
+- One case-insensitive alternation regex per keyword list, compiled once at
+  import. A single finditer() pass over the query returns every trigger hit.
+- Keywords only match as whole words/phrases: "lean" no longer fires inside
+  "Leanext", and "ERP" matches "erp" (the old `k in text.lower()` test could
+  never match the upper-case config entries).
+- Alternatives are ordered longest first, so "lean master" wins over "lean".
+- Spaces inside a phrase match any run of whitespace.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+from app.Day_19_A import SMALL_TALK_TRIGGERS, LEAD_TRIGGER_KEYWORDS
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class KeywordMatcher:
+    """Whole-word, case-insensitive matcher over a fixed keyword list."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._canonical: Dict[str, str] = {}
+        for kw in keywords:
+            self._canonical.setdefault(_norm(kw), kw)
+
+        alternatives = sorted(self._canonical, key=len, reverse=True)
+        pattern = "|".join(r"\s+".join(re.escape(w) for w in kw.split()) for kw in alternatives)
+        self._regex = re.compile(rf"(?<!\w)(?:{pattern})(?!\w)", re.IGNORECASE) if alternatives else None
+
+    def find_all(self, text: str) -> List[str]:
+        """Every configured keyword found in `text`, in order of appearance, no repeats."""
+        if not self._regex or not text:
+            return []
+        found = (self._canonical[_norm(m.group(0))] for m in self._regex.finditer(text))
+        return list(dict.fromkeys(found))
+
+    def first(self, text: str) -> Optional[str]:
+        """The first configured keyword found in `text`, or None."""
+        if not self._regex or not text:
+            return None
+        m = self._regex.search(text)
+        return self._canonical[_norm(m.group(0))] if m else None
+
+    def matches(self, text: str) -> bool:
+        return self.first(text) is not None
+
+
+# Built once from Day_19_A
+SMALL_TALK_MATCHER = KeywordMatcher(SMALL_TALK_TRIGGERS.keys())
+LEAD_TRIGGER_MATCHER = KeywordMatcher(LEAD_TRIGGER_KEYWORDS)
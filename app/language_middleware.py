@@ -1,10 +1,16 @@
 """
 Multilingual Middleware Module: Handles language detection and translation
 for the RAG pipeline using googletrans.
+Detection is done offline from the Unicode script of the text, and every
+translation goes through a (text, src, dest) cache, so repeated phrases and
+answers need no network round trip.
 """
 import logging
 from googletrans import Translator, LANGUAGES
 from .Day_19_A import SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE, LANGUAGE_FAIL_MESSAGE, LANGUAGE_MAP
+from .script_detector import detect_script_language
+from .translation_cache import get_translation_cache
+from .canned_translations import get_canned_translation
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,12 +25,28 @@ class LanguageTranslator:
         self.translator = Translator()
         self.supported_codes = SUPPORTED_LANGUAGES
         self.default_code = DEFAULT_LANGUAGE
+        self.cache = get_translation_cache()
+
+    def _translate_cached(self, text: str, src: str, dest: str) -> str:
+        """googletrans translate() behind the two-tier cache. Raises on failure."""
+        cached = self.cache.get(text, src, dest)
+        if cached is not None:
+            return cached
+        translated = self.translator.translate(text, src=src, dest=dest).text
+        self.cache.put(text, src, dest, translated)
+        return translated
 
     def detect_language(self, text: str) -> str:
         """
         Detects the language of the input text.
         Returns the language code if supported, otherwise returns the default code ('en').
+        The Unicode script decides locally; only Devanagari text without any
+        Hindi/Marathi evidence falls back to the googletrans detect() call.
         """
+        local_code = detect_script_language(text)
+        if local_code is not None:
+            return local_code
+
         try:
             # First, check if the text is short or simple, which can confuse auto-detectors
             if len(text.strip()) < 5:
@@ -59,9 +81,9 @@ class LanguageTranslator:
             return text, self.default_code
         
         try:
-            translation = self.translator.translate(text, src=detected_lang_code, dest=self.default_code)
+            translated_text = self._translate_cached(text, detected_lang_code, self.default_code)
             logging.info(f"Translated query from {detected_lang_code} to English.")
-            return translation.text, detected_lang_code
+            return translated_text, detected_lang_code
         except Exception as e:
             logging.error(f"Translation to English failed: {e}. Returning original text and error message.")
             # If translation fails, return the original text and an error flag for handling
@@ -74,12 +96,21 @@ class LanguageTranslator:
         """
         if dest_lang == self.default_code or not dest_lang:
             return text
-            
+
+        # Small talk / fallback replies are pre-translated (app/canned_translations.py)
+        canned = get_canned_translation(text, dest_lang)
+        if canned is not None:
+            return canned
+
         try:
             # Use 'auto' as source to let googletrans confirm the English source text
-            translation = self.translator.translate(text, src='auto', dest=dest_lang)
+            translated_text = self._translate_cached(text, 'auto', dest_lang)
             logging.info(f"Translated answer to {LANGUAGE_MAP.get(dest_lang, dest_lang)}.")
-            return translation.text
+            return translated_text
         except Exception as e:
             logging.error(f"Translation from English failed for {dest_lang}: {e}")
-            return LANGUAGE_FAIL_MESSAGE
+            return self.failure_message(dest_lang)
+
+    def failure_message(self, lang: str) -> str:
+        """LANGUAGE_FAIL_MESSAGE in `lang` when pre-translated, else in English."""
+        return get_canned_translation(LANGUAGE_FAIL_MESSAGE, lang) or LANGUAGE_FAIL_MESSAGE
@@ -0,0 +1,123 @@
+# app/lexical_index.py
+"""
+In-memory BM25 inverted index over the KB chunks, plus rank fusion.
+
+Key ideas:
+- Dense retrieval alone ranks exact product names ("3P", "IMS", "LMS")
+  poorly; a lexical index catches them. Tokens are lower-cased runs of
+  letters/digits, so "3P" is the token "3p".
+- Postings are stored per term as (row array, precomputed BM25 weight
+  array). Scoring a query is one `scores[rows] += weights` per query term:
+  no per-document Python loop.
+- reciprocal_rank_fusion() merges the BM25 and vector rankings by id
+  (score = sum of 1 / (k + rank)), so neither score scale dominates.
+- BM25 needs no model, so it can answer on its own while the embedding
+  model is still loading after a cold start. coverage() turns a raw score
+  into the share of the query's term weight a chunk matched (0..1), which
+  is comparable across queries where raw BM25 scores are not.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.vector_index import match_where
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+class BM25Index:
+    """Okapi BM25 over parallel id / document / metadata sequences."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        documents: Sequence[Optional[str]],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+
+        term_rows: Dict[str, List[int]] = defaultdict(list)
+        term_tfs: Dict[str, List[int]] = defaultdict(list)
+        lengths = np.zeros(len(ids), dtype=np.float32)
+
+        for row, doc in enumerate(documents):
+            tokens = tokenize(doc)
+            lengths[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_rows[term].append(row)
+                term_tfs[term].append(tf)
+
+        n_docs = len(ids)
+        avg_len = float(lengths.mean()) if n_docs and lengths.sum() else 1.0
+
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: Dict[str, float] = {}
+        # A term no chunk contains weighs as much as the rarest possible one
+        self._unseen_idf = math.log(1.0 + (n_docs + 0.5) / 0.5)
+        for term, rows in term_rows.items():
+            rows_arr = np.asarray(rows, dtype=np.int64)
+            tf = np.asarray(term_tfs[term], dtype=np.float32)
+            df = len(rows)
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            self._idf[term] = idf
+            norm = k1 * (1.0 - b + b * lengths[rows_arr] / avg_len)
+            self._postings[term] = (rows_arr, (idf * tf * (k1 + 1.0) / (tf + norm)).astype(np.float32))
+
+        print(f"[lexical_index] BM25 index ready: {n_docs} chunks, {len(self._postings)} terms")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to n_results (row, bm25_score) pairs, best first; zero scores dropped."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if posting is not None:
+                rows, weights = posting
+                scores[rows] += weights
+
+        hits = np.flatnonzero(scores)
+        if where:
+            hits = np.asarray([r for r in hits if match_where(self.metadatas[r] or {}, where)], dtype=np.int64)
+        if not hits.size:
+            return []
+
+        order = hits[np.argsort(-scores[hits], kind="stable")][:n_results]
+        return [(int(r), float(scores[r])) for r in order]
+
+    def coverage(self, query: str, score: float) -> float:
+        """
+        `score` as a share of the query's total idf: about 1.0 for an
+        average-length chunk holding every query term once, lower for each
+        term it misses (unknown terms count at full weight). Capped at 1.
+        """
+        total = sum(self._idf.get(term, self._unseen_idf) for term in set(tokenize(query)))
+        return min(1.0, score / total) if total > 0 else 0.0
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse several best-first id lists into one, by summed 1 / (k + rank)."""
+    fused: Dict[str, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, _id in enumerate(ranking, start=1):
+            fused[_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
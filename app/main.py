@@ -9,29 +9,51 @@ Leanext RAG FastAPI Backend
     - GET  /               -> health check
     - POST /chat           -> main chat endpoint
     - OPTIONS /chat        -> preflight support for widget
+    - POST /chat/stream    -> same answer streamed as Server-Sent Events
     - GET  /debug/indexed  -> debug info (safe, won't crash if stats fail)
+    - GET  /debug/stats    -> pipeline executor / cache / coalescing counters
+    - POST /admin/kb/reload -> swap in the newest published KB version (X-Admin-Token)
     - POST /feedback       -> stub for like/dislike
     - POST /regenerate     -> stub for "regenerate" button
 """
 
-from fastapi import FastAPI, Body, Response
+from fastapi import FastAPI, Body, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+import hmac
 import threading
 import time
+import json
 import logging
 
 # ---- Core RAG entrypoints (these ultimately use Day_19_C under the hood) ----
 from app.Day_19_B import (
-    search_leanext_kb,          # high-level RAG answer (string)
-    search_leanext_kb_formatted # optional richer format (if you want later)
+    search_leanext_kb_formatted, # optional richer format (if you want later)
+    get_kb_search_collection,
+    get_kb_version_manager,
 )
+from app.Day_19_C import answer_query_with_cache_first, build_chat_response, stream_answer_query
 
 # ---- FAQ helpers (our new helper module F) ----
-from app.Day_19_F import load_faq_suggestions
+from app.Day_19_F import load_faq_suggestions, reset_faq_cache
 
 # ---- Optional analytics / index helpers (wrapped in try/except later) ----
 from app.Day_19_E import get_index_stats, list_indexed_documents
 
+# ---- Bounded worker pool: keeps the blocking pipeline off the event loop ----
+from app.chat_executor import get_pipeline_executor, ExecutorSaturatedError
+from app.embedding_batcher import get_embedding_batcher, warm_up_embedding_model
+from app.embedding_cache import get_embedding_cache
+from app.semantic_cache import get_semantic_cache
+from app.gemini_client import aclose_clients
+from app.spell_corrector import rebuild_spell_corrector, spell_corrector_stats
+from app.single_flight import get_answer_flight
+from app.translation_cache import get_translation_cache
+from app.canned_translations import load_canned_translations
+from app.context_packer import get_context_packer
+from app.session_store import get_session_store
+from app.Day_19_A import KB_ADMIN_TOKEN
+
 # Basic logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -68,7 +90,8 @@ def background_startup():
     logger.info("⏳ Background initialization started...")
 
     try:
-    
+        # 1) Start loading the embedding model; BM25 serves retrieval until it is ready
+        warm_up_embedding_model()
 
         # 2) Pre-warm FAQ suggestions from helper module F
         try:
@@ -77,6 +100,20 @@ def background_startup():
         except Exception as faq_err:
             logger.warning(f"[Init] FAQ suggestions failed: {faq_err}")
 
+        # 3) Load pre-translated canned replies (small talk / fallbacks)
+        canned = load_canned_translations()
+        logger.info(f"[Init] Canned translations loaded: {len(canned)} languages.")
+
+        # 4) Load the live KB snapshot; later versions are hot-swapped and
+        #    caches built from the old chunks are dropped
+        kb_versions = get_kb_version_manager()
+        kb_versions.add_listener(get_semantic_cache().set_index_version)
+        kb_versions.add_listener(rebuild_spell_corrector)
+        kb_versions.add_listener(reset_faq_cache)
+        get_semantic_cache().set_index_version(kb_versions.current().warm().version)
+        kb_versions.start_watcher()
+        logger.info(f"[Init] KB version {kb_versions.current().version} live.")
+
     except Exception as e:
         logger.error(f"[Init] Background init error: {e}")
 
@@ -84,15 +121,52 @@ def background_startup():
 # Run heavy-ish startup in another thread (daemonized)
 threading.Thread(target=background_startup, daemon=True).start()
 
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    """Release pooled keep-alive connections to Gemini."""
+    await aclose_clients()
+
 # ----------------------------------------------------
 # CHAT ENDPOINT (Core RAG call)
 # ----------------------------------------------------
+def _history_to_text(history) -> str:
+    """Widget sends a list of recent user queries; RAG expects 'q1 | q2 | q3'."""
+    if isinstance(history, list):
+        return " | ".join(h.strip() for h in history if isinstance(h, str) and h.strip())
+    return (history or "").strip() if isinstance(history, str) else ""
+
+
+def _session_for(payload: dict):
+    """Server-side session for the widget's session_id (None if it sent none)."""
+    session_id = payload.get("session_id")
+    if not isinstance(session_id, str) or not session_id.strip():
+        return None
+    return get_session_store().get(session_id.strip()[:128])
+
+
+def _chat_answer(query: str, history_queries: str, session) -> dict:
+    """Runs on the pipeline executor: one cache-first RAG turn, shaped for the widget."""
+    (answer, source, distance, top_k_metadata_list, _is_unclear, _,
+     detected_lang_code, lead_score) = answer_query_with_cache_first(
+        query, get_kb_search_collection(), history_queries=history_queries, session=session
+    )
+    return build_chat_response(query, answer, source, distance, top_k_metadata_list, detected_lang_code, lead_score)
+
+
 @app.post("/chat")
 async def chat(payload: dict = Body(...)):
     """
     Main chat endpoint used by your website widget.
-    Uses search_leanext_kb() which internally calls
-    the RAG logic defined in Day_19_C.
+    Runs Day_19_C's cache-first RAG turn and returns answer, source,
+    distance, detected_lang, related_page and lead_score.
+
+    History comes from the server-side session named by `session_id`;
+    the widget's `history` list is only used when the session has no turns
+    yet (e.g. after a restart or on another worker).
+
+    The call is blocking, so it runs on the bounded pipeline executor.
+    When the executor queue is full we answer 503 + Retry-After right away.
     """
     query = (payload.get("query") or "").strip()
 
@@ -101,13 +175,18 @@ async def chat(payload: dict = Body(...)):
             "response": "Please ask a question related to Leanext's services or solutions."
         }
 
+    session = _session_for(payload)
+    history_queries = _history_to_text(payload.get("history"))
+
     try:
-        # This is your existing high-level helper from Day_19_B.
-        # It ultimately uses Day_19_C's RAG engine, so your core logic stays intact.
-        answer = search_leanext_kb(query)
-        return {
-            "response": answer
-        }
+        return await get_pipeline_executor().run(_chat_answer, query, history_queries, session)
+    except ExecutorSaturatedError as e:
+        logger.warning(f"/chat rejected, pipeline queue full (retry after {e.retry_after}s)")
+        return JSONResponse(
+            status_code=503,
+            content={"response": "We're handling a lot of questions right now. Please try again in a moment."},
+            headers={"Retry-After": str(e.retry_after)},
+        )
     except Exception as e:
         logger.error(f"/chat error: {e}")
         # Safe fallback if something goes wrong in the pipeline
@@ -122,6 +201,68 @@ async def chat(payload: dict = Body(...)):
 async def chat_options():
     return Response(status_code=200)
 
+# ----------------------------------------------------
+# STREAMING CHAT ENDPOINT (Server-Sent Events)
+# ----------------------------------------------------
+def _chat_stream_events(query: str, history_queries: str, session):
+    """Runs on the pipeline executor: opens the KB and yields Day_19_C stream events."""
+    yield from stream_answer_query(query, get_kb_search_collection(), history_queries=history_queries, session=session)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(payload: dict = Body(...)):
+    """
+    Streaming variant of /chat for the widget.
+
+    Emits `token` events ({"text": ...}) as Gemini generates the answer and one
+    final `done` event with answer, source, distance, detected_lang,
+    related_page and lead_score. If Gemini fails after tokens were sent, a
+    `reset` event precedes the fallback answer so the widget drops the partial
+    text. Failures mid-stream become an `error` event.
+    """
+    query = (payload.get("query") or "").strip()
+    history_queries = _history_to_text(payload.get("history"))
+
+    if not query:
+        return {
+            "response": "Please ask a question related to Leanext's services or solutions."
+        }
+
+    session = _session_for(payload)
+
+    try:
+        events = get_pipeline_executor().stream(_chat_stream_events, query, history_queries, session)
+    except ExecutorSaturatedError as e:
+        logger.warning(f"/chat/stream rejected, pipeline queue full (retry after {e.retry_after}s)")
+        return JSONResponse(
+            status_code=503,
+            content={"response": "We're handling a lot of questions right now. Please try again in a moment."},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    async def event_source():
+        try:
+            async for event, data in events:
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"/chat/stream error: {e}")
+            yield _sse("error", {"message": "Sorry, I'm having trouble answering that right now. Please try again in a moment."})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.options("/chat/stream")
+async def chat_stream_options():
+    return Response(status_code=200)
+
 # ----------------------------------------------------
 # DEBUG ENDPOINT (for widget debug panel)
 # ----------------------------------------------------
@@ -162,6 +303,48 @@ async def debug_indexed():
 
     return data
 
+# ----------------------------------------------------
+# STATS ENDPOINT (queue depth / wait time accounting)
+# ----------------------------------------------------
+@app.get("/debug/stats")
+async def debug_stats():
+    """Runtime counters for the serving path."""
+    return {
+        "pipeline_executor": get_pipeline_executor().stats(),
+        "embedding_batcher": get_embedding_batcher().stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "semantic_cache": get_semantic_cache().stats(),
+        "spell_corrector": spell_corrector_stats(),
+        "single_flight": get_answer_flight().stats(),
+        "translation_cache": get_translation_cache().stats(),
+        "context_packer": get_context_packer().stats(),
+        "sessions": get_session_store().stats(),
+        "kb_versions": get_kb_version_manager().stats(),
+    }
+
+# ----------------------------------------------------
+# KB RELOAD (hot swap after an out-of-process re-index)
+# ----------------------------------------------------
+@app.post("/admin/kb/reload")
+async def reload_kb(x_admin_token: str = Header(None)):
+    """
+    Load the newest published KB version in the background and swap it in.
+    Requests already running finish on the version they started with.
+    Only the "numpy" and "mmap" backends load published versions; with
+    "chroma" a reload would keep querying the index this process opened.
+    """
+    if not KB_ADMIN_TOKEN or not hmac.compare_digest((x_admin_token or "").encode(), KB_ADMIN_TOKEN.encode()):
+        return JSONResponse(status_code=403, content={"error": "Forbidden"})
+
+    manager = get_kb_version_manager()
+    if not manager.versioned:
+        return JSONResponse(
+            status_code=409,
+            content={"error": "KB_SEARCH_BACKEND does not hot-swap published versions; restart to reload"},
+        )
+    started = manager.check_for_update(force=True)
+    return {"reloading": started, **manager.stats()}
+
 # ----------------------------------------------------
 # FEEDBACK ENDPOINT (Stops /feedback 404 errors)
 # ----------------------------------------------------
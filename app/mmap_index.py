@@ -0,0 +1,161 @@
+# app/mmap_index.py
+"""
+Memory-mapped, read-only KB index file shared by every gunicorn worker.
+
+Key ideas:
+- `export_mmap_index()` writes the in-memory NumPy index (app/vector_index.py)
+  into one flat file:
+
+      [header][pad][float32 matrix, count x dim][pad][uint64 offsets][utf-8 blob]
+
+  The blob holds, per row, the id, the document and the metadata JSON; the
+  offsets array (3 * count + 1 entries) points into it.
+- `MmapVectorIndex` opens that file with mmap(ACCESS_READ). The matrix is a
+  zero-copy np.frombuffer view, and ids / documents are decoded lazily
+  only for the rows a query returns. Metadata JSON is parsed once, when
+  the file is opened, so neither results nor `where` filtering parse JSON
+  per query (it is a few hundred small dicts). N workers therefore share one
+  copy of the index in the OS page cache instead of each holding its own
+  Chroma client and embedding state.
+- It subclasses InMemoryVectorIndex, so scoring, `where` filtering and the
+  Chroma-shaped results are identical to the NumPy backend.
+
+Export from a machine that has the Chroma DB:
+    python -m app.mmap_index
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+
+from app.vector_index import InMemoryVectorIndex
+
+
+_MAGIC = b"LBIX"
+_VERSION = 1
+# magic, version, count, dim, space, matrix_off, offsets_off, blob_off, blob_len
+_HEADER = struct.Struct("<4sIII8sQQQQ")
+_ALIGN = 64
+_FIELDS_PER_ROW = 3  # id, document, metadata JSON
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+# -------------------------------------------------------------------
+# 1. Export
+# -------------------------------------------------------------------
+
+def export_mmap_index(index: InMemoryVectorIndex, path: str) -> str:
+    """Write `index` to `path` atomically (tmp file + rename). Returns the path."""
+    encoded = []
+    for i in range(len(index)):
+        encoded.append(str(index.ids[i]).encode("utf-8"))
+        encoded.append((index.documents[i] or "").encode("utf-8"))
+        encoded.append(
+            json.dumps(index.metadatas[i] or {}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        )
+
+    offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = b"".join(encoded)
+
+    matrix = np.ascontiguousarray(index.matrix, dtype="<f4")
+    count, dim = len(index), index.dim
+
+    matrix_off = _align(_HEADER.size)
+    offsets_off = _align(matrix_off + matrix.nbytes)
+    blob_off = offsets_off + offsets.nbytes
+
+    header = _HEADER.pack(
+        _MAGIC, _VERSION, count, dim, index.space.encode("ascii")[:8],
+        matrix_off, offsets_off, blob_off, len(blob),
+    )
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(b"\0" * (matrix_off - f.tell()))
+        f.write(matrix.tobytes())
+        f.write(b"\0" * (offsets_off - f.tell()))
+        f.write(offsets.tobytes())
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+    print(f"[mmap_index] Exported {count} vectors (dim={dim}) to {path}")
+    return path
+
+
+# -------------------------------------------------------------------
+# 2. Read-only mapped index
+# -------------------------------------------------------------------
+
+class _BlobColumn(Sequence):
+    """Lazily decoded view of one field of every row in the packed blob."""
+
+    def __init__(self, buf: mmap.mmap, offsets: np.ndarray, blob_off: int, field: int,
+                 count: int, decode: Callable[[bytes], Any]):
+        self._buf = buf
+        self._offsets = offsets
+        self._blob_off = blob_off
+        self._field = field
+        self._count = count
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        i = int(i)
+        if i < 0:
+            i += self._count
+        k = i * _FIELDS_PER_ROW + self._field
+        start = self._blob_off + int(self._offsets[k])
+        end = self._blob_off + int(self._offsets[k + 1])
+        return self._decode(self._buf[start:end])
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(self._count):
+            yield self[i]
+
+
+class MmapVectorIndex(InMemoryVectorIndex):
+    """InMemoryVectorIndex whose arrays live in a shared read-only mapping."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, count, dim, space,
+         matrix_off, offsets_off, blob_off, _blob_len) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a v{_VERSION} KB index file")
+
+        self.matrix = np.frombuffer(self._mm, dtype="<f4", count=count * dim, offset=matrix_off).reshape(count, dim)
+        offsets = np.frombuffer(self._mm, dtype="<u8", count=count * _FIELDS_PER_ROW + 1, offset=offsets_off)
+
+        self.ids = _BlobColumn(self._mm, offsets, blob_off, 0, count, lambda b: b.decode("utf-8"))
+        self.documents = _BlobColumn(self._mm, offsets, blob_off, 1, count, lambda b: b.decode("utf-8"))
+        self.metadatas = list(_BlobColumn(self._mm, offsets, blob_off, 2, count, lambda b: json.loads(b)))
+        self.space = space.rstrip(b"\0").decode("ascii")
+
+        print(f"[mmap_index] Mapped {count} vectors (dim={dim}, space={self.space}) from {path}")
+
+    @classmethod
+    def open(cls, path: str) -> "MmapVectorIndex":
+        return cls(path)
+
+
+if __name__ == "__main__":
+    from app.Day_19_B import KB_MMAP_INDEX_PATH, get_kb_collection
+
+    export_mmap_index(InMemoryVectorIndex.from_collection(get_kb_collection()), KB_MMAP_INDEX_PATH)
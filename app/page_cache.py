@@ -0,0 +1,220 @@
+# app/page_cache.py
+"""
+On-disk layout of crawler_cache/: compressed raw HTML plus extracted-text sidecars.
+
+Key ideas:
+- Files are still named by url_key() (sha256 of the canonical URL). The raw
+  HTML is stored compressed: <key>.html.zst when CRAWL_CACHE_COMPRESSION is
+  "zstd" and the optional `zstandard` package is installed, otherwise
+  <key>.html.gz (stdlib gzip). Plain <key>.html files from older crawls
+  are still read. The next write of a page replaces its plain file;
+  `python -m app.page_cache` converts all of them at once.
+- <key>.text.jsonl.{zst,gz} is the extracted-text sidecar. Its header
+  line holds the canonical URL and the text_hash the text was extracted
+  under. Every further line is one DOM block: [heading index, words].
+  Re-chunking streams the sidecar instead of parsing HTML. A sidecar whose
+  text_hash no longer matches is ignored and rewritten.
+- Every file is written to a temporary name and os.replace()d, so readers
+  never see half a page.
+- The indexer manifest records each page's cache key and file names next
+  to its validators, fetch time and text hash (cached_files()), so a
+  page's files are found without re-hashing URLs.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional
+
+from app.Day_19_A import CRAWLER_CACHE_DIR, CRAWL_CACHE_COMPRESSION
+
+try:
+    import zstandard
+    _ZSTD_AVAILABLE = True
+except ImportError:
+    _ZSTD_AVAILABLE = False
+
+
+_HTML = ".html"
+_TEXT = ".text.jsonl"
+_SIDECAR_FORMAT = 1
+
+# Suffix new files are written with; reads also accept the others below
+_WRITE_SUFFIX = ".zst" if CRAWL_CACHE_COMPRESSION == "zstd" and _ZSTD_AVAILABLE else ".gz"
+_READ_SUFFIXES = [_WRITE_SUFFIX] + [s for s in (".zst", ".gz", "") if s != _WRITE_SUFFIX]
+if not _ZSTD_AVAILABLE:
+    _READ_SUFFIXES.remove(".zst")
+
+
+# -------------------------------------------------------------------
+# 1. Paths and codecs
+# -------------------------------------------------------------------
+
+def url_key(url: str) -> str:
+    """sha256 of the canonical URL: the crawler_cache/ file name and chunk-id prefix."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _path(key: str, kind: str, suffix: str) -> str:
+    return os.path.join(CRAWLER_CACHE_DIR, key + kind + suffix)
+
+
+def _find(key: str, kind: str) -> Optional[str]:
+    for suffix in _READ_SUFFIXES:
+        path = _path(key, kind, suffix)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _open_text(path: str, mode: str) -> IO[str]:
+    if path.endswith(".zst"):
+        return zstandard.open(path, mode, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+@contextmanager
+def _atomic_writer(key: str, kind: str) -> Iterator[IO[str]]:
+    """Text stream for a new cache file; it replaces older copies only when the block exits cleanly."""
+    final_path = _path(key, kind, _WRITE_SUFFIX)
+    tmp_path = _path(f"{key}.{os.getpid()}.tmp", kind, _WRITE_SUFFIX)  # keeps the codec suffix
+    try:
+        with _open_text(tmp_path, "wt") as f:
+            yield f
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    for suffix in _READ_SUFFIXES:
+        if suffix != _WRITE_SUFFIX:
+            try:
+                os.remove(_path(key, kind, suffix))  # older format of the same file
+            except OSError:
+                pass
+
+
+# -------------------------------------------------------------------
+# 2. Raw HTML
+# -------------------------------------------------------------------
+
+def has_cached_html(url: str) -> bool:
+    return _find(url_key(url), _HTML) is not None
+
+
+def open_cached_html(url: str) -> IO[str]:
+    """Decompressing text stream over the cached HTML of `url` (OSError if there is none)."""
+    path = _find(url_key(url), _HTML)
+    if path is None:
+        raise FileNotFoundError(f"No cached HTML for {url}")
+    return _open_text(path, "rt")
+
+
+def read_cached_html(url: str) -> Optional[str]:
+    try:
+        with open_cached_html(url) as f:
+            return f.read()
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+def write_cached_html(url: str, html: str) -> None:
+    with _atomic_writer(url_key(url), _HTML) as f:
+        f.write(html)
+
+
+def remove_cached_page(url: str) -> None:
+    """Delete every cached file of `url` (HTML in any format and the text sidecar)."""
+    key = url_key(url)
+    for kind in (_HTML, _TEXT):
+        for suffix in (".zst", ".gz", ""):
+            try:
+                os.remove(_path(key, kind, suffix))
+            except OSError:
+                pass
+
+
+def cached_files(url: str) -> Dict[str, Optional[str]]:
+    """Manifest fields locating the cached files of `url` (names relative to crawler_cache/)."""
+    key = url_key(url)
+    html_path, text_path = _find(key, _HTML), _find(key, _TEXT)
+    return {
+        "cache_key": key,
+        "html_file": os.path.basename(html_path) if html_path else None,
+        "text_file": os.path.basename(text_path) if text_path else None,
+    }
+
+
+# -------------------------------------------------------------------
+# 3. Extracted-text sidecars
+# -------------------------------------------------------------------
+
+def iter_text_sidecar(url: str, text_hash: Optional[str]) -> Optional[Iterator[List[Any]]]:
+    """
+    The stored blocks of `url` if its sidecar was extracted from text with
+    `text_hash`, else None (missing, stale or unreadable).
+    """
+    path = _find(url_key(url), _TEXT)
+    if path is None or not text_hash:
+        return None
+    try:
+        f = _open_text(path, "rt")
+        header = json.loads(f.readline() or "{}")
+    except (OSError, EOFError, ValueError):
+        return None
+    if header.get("format") != _SIDECAR_FORMAT or header.get("text_hash") != text_hash:
+        f.close()
+        return None
+
+    def _blocks() -> Iterator[List[Any]]:
+        with f:
+            for line in f:
+                yield json.loads(line)
+
+    return _blocks()
+
+
+@contextmanager
+def text_sidecar_writer(url: str, text_hash: Optional[str]) -> Iterator[Callable[[List[Any]], None]]:
+    """
+    write(block) appends one block to a new sidecar for `url`. The sidecar
+    becomes visible only if every block was written (the `with` exits cleanly).
+    """
+    with _atomic_writer(url_key(url), _TEXT) as f:
+        f.write(json.dumps({"format": _SIDECAR_FORMAT, "url": url, "text_hash": text_hash}) + "\n")
+        yield lambda block: f.write(json.dumps(block, ensure_ascii=False) + "\n")
+
+
+# -------------------------------------------------------------------
+# 4. One-off conversion of older caches
+# -------------------------------------------------------------------
+
+def compact_cache() -> Dict[str, int]:
+    """Re-write every plain <key>.html in crawler_cache/ compressed. Returns byte counts."""
+    before = after = files = 0
+    for name in sorted(os.listdir(CRAWLER_CACHE_DIR)):
+        if not name.endswith(_HTML):
+            continue
+        key = name[: -len(_HTML)]
+        path = os.path.join(CRAWLER_CACHE_DIR, name)
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        with _atomic_writer(key, _HTML) as f:
+            f.write(html)
+        before += len(html.encode("utf-8"))
+        after += os.path.getsize(_path(key, _HTML, _WRITE_SUFFIX))
+        files += 1
+
+    print(f"[page_cache] Compressed {files} pages: {before} -> {after} bytes ({_WRITE_SUFFIX[1:]})")
+    return {"files": files, "bytes_before": before, "bytes_after": after}
+
+
+if __name__ == "__main__":
+    compact_cache()
@@ -0,0 +1,94 @@
+# app/script_detector.py
+"""
+Offline language detection from Unicode script histograms.
+
+Key ideas:
+- Every supported non-English language is written in its own script:
+  Devanagari (hi, mr), Bengali (bn), Gujarati (gu), Kannada (kn). Counting
+  letters per Unicode block is therefore enough to pick the language with
+  no network call.
+- Latin-only text is English (the default language).
+- Devanagari is shared by Hindi and Marathi. They are told apart by
+  function words and by the letter ळ, which is common in Marathi and
+  rare in Hindi. When neither side has any evidence the result is
+  ambiguous and the caller may fall back to a remote detector.
+"""
+
+import re
+from typing import Dict, Optional
+
+from app.Day_19_A import DEFAULT_LANGUAGE, SCRIPT_DETECTION_MIN_SHARE
+
+
+# Unicode block -> language (Devanagari is resolved separately)
+_SCRIPT_RANGES = [
+    (0x0900, 0x097F, "deva"),
+    (0x0980, 0x09FF, "bn"),
+    (0x0A80, 0x0AFF, "gu"),
+    (0x0C80, 0x0CFF, "kn"),
+]
+
+_DEVANAGARI_WORD_RE = re.compile(r"[ऀ-ॿ]+")
+
+_HINDI_MARKERS = {
+    "है", "हैं", "था", "थे", "का", "की", "के", "में", "क्या", "और", "नहीं",
+    "मुझे", "मैं", "आप", "कैसे", "कितना", "कितनी", "कौन", "यह", "वह", "हूँ", "हूं",
+    "चाहिए", "बताइए", "बताओ", "लिए", "से",
+}
+_MARATHI_MARKERS = {
+    "आहे", "आहेत", "नाही", "काय", "मला", "तुम्ही", "आणि", "कसे", "कशी", "किती",
+    "कोण", "हे", "ते", "मी", "पाहिजे", "सांगा", "साठी", "मध्ये", "होते", "आहात",
+}
+_MARATHI_LETTER_LLA = "\u0933"  # ळ
+
+
+def script_histogram(text: str) -> Dict[str, int]:
+    """Letter counts per script: 'latin', 'deva', 'bn', 'gu', 'kn'."""
+    counts: Dict[str, int] = {}
+    for ch in text:
+        cp = ord(ch)
+        if ch.isascii():
+            if ch.isalpha():
+                counts["latin"] = counts.get("latin", 0) + 1
+            continue
+        for start, end, script in _SCRIPT_RANGES:
+            if start <= cp <= end:
+                counts[script] = counts.get(script, 0) + 1
+                break
+    return counts
+
+
+def _hindi_or_marathi(text: str) -> Optional[str]:
+    words = _DEVANAGARI_WORD_RE.findall(text)
+    hi = sum(1 for w in words if w in _HINDI_MARKERS)
+    mr = sum(1 for w in words if w in _MARATHI_MARKERS)
+    # Marathi genitive endings are glued to the noun ("कोर्सची", "कंपनीच्या")
+    mr += sum(1 for w in words if len(w) > 3 and w.endswith(("च्या", "ची", "चे")))
+    mr += 2 * text.count(_MARATHI_LETTER_LLA)
+
+    if hi == mr:
+        return None
+    return "hi" if hi > mr else "mr"
+
+
+def detect_script_language(text: str) -> Optional[str]:
+    """
+    Return the language code implied by the text's script, or None when it
+    cannot be decided locally (Devanagari without hi/mr evidence).
+    """
+    counts = script_histogram(text or "")
+    total = sum(counts.values())
+    if not total:
+        return DEFAULT_LANGUAGE
+
+    script, count = max(
+        ((s, c) for s, c in counts.items() if s != "latin"),
+        key=lambda item: item[1],
+        default=("latin", 0),
+    )
+    if script == "latin" or count / total < SCRIPT_DETECTION_MIN_SHARE:
+        return DEFAULT_LANGUAGE
+
+    if script == "deva":
+        return _hindi_or_marathi(text)
+    return script
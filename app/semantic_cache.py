@@ -0,0 +1,469 @@
+# app/semantic_cache.py
+"""
+Vectorised semantic answer cache on top of chat_cache.db.
+
+Key ideas:
+- The `cache` table stays the source of truth for questions and answers.
+- Embeddings of every cached question live in one in-memory float32 matrix,
+  so a lookup is a single dot product against all rows plus an argmax.
+  A hit needs cosine similarity >= CACHE_MATCH_THRESHOLD, so paraphrased
+  repeat questions are served without cleaning, retrieval or generation.
+- The vectors are persisted next to the DB in an append-only file
+  (header + fixed-width [row id, vector] records). New entries are appended
+  to the matrix and to the file; nothing is rebuilt on insert.
+- Every row remembers the KB index_version its answer was generated with.
+  After a KB hot swap (app/kb_versions.py) set_index_version() marks rows
+  of other versions stale and lookups skip them, so no answer built from
+  the old chunks is served. Untagged rows (curated answers, older DBs)
+  stay valid.
+- Until the embedding model has loaded, lookups fall back to an exact
+  match on the question text (current index version only), so
+  pre-generated FAQ answers are served from the first request after deploy.
+- Answers are keyed by the question alone, so follow-ups whose meaning
+  comes from the chat history ("how much does it cost?", "and for
+  hospitals?") neither read nor write the cache: with history present, a
+  query that is short (CACHE_FOLLOWUP_MAX_WORDS) or refers back with a
+  pronoun is answered fresh, and is not stored for other conversations.
+- Several gunicorn workers share chat_cache.db and the vector file. Writes
+  to the file take an fcntl lock (<file>.lock). Overwriting a question
+  appends its record again, so every change shows up as new bytes at the
+  end of the file. Before each lookup a worker checks the file's size and
+  inode. If either moved, it reads the new records and refreshes those
+  rows from the table, so answers saved by other workers are served too.
+"""
+
+import os
+import re
+import sqlite3
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.Day_19_A import (
+    CACHE_DB_PATH,
+    CACHE_EMBEDDINGS_PATH,
+    CACHE_MATCH_THRESHOLD,
+    CACHE_FOLLOWUP_MAX_WORDS,
+)
+from app.embedding_batcher import embed_query_vector, embed_query_vectors, is_embedding_model_ready
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+
+_FILE_MAGIC = b"LBSC"
+_HEADER = struct.Struct("<4sI")  # magic, embedding dim
+
+
+_SQL_BATCH = 500  # ids per "WHERE id IN (...)" query
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Words that point back at an earlier turn
+_REFERRING_WORDS = frozenset(
+    "it its it's this that these those they them their theirs there he she him her his "
+    "same above previous former latter more else".split()
+)
+
+
+def _record_dtype(dim: int) -> np.dtype:
+    return np.dtype([("id", "<i8"), ("vec", "<f4", (dim,))])
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock shared by every worker process writing `path`."""
+    if fcntl is None:
+        yield
+        return
+    with open(path + ".lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def is_history_dependent(query: str, history: str = "") -> bool:
+    """True if `query` only makes sense together with `history`, so its answer must not be shared."""
+    if not history or not history.strip():
+        return False
+    words = _WORD_RE.findall(query.lower())
+    return len(words) <= CACHE_FOLLOWUP_MAX_WORDS or any(w in _REFERRING_WORDS for w in words)
+
+
+# -------------------------------------------------------------------
+# 1. Cache
+# -------------------------------------------------------------------
+
+class SemanticAnswerCache:
+    """Nearest-question lookup over every row of the `cache` table."""
+
+    def __init__(self, db_path: str, embeddings_path: str, threshold: float):
+        self.db_path = db_path
+        self.embeddings_path = embeddings_path
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._schema_checked = False
+
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._row_ids: List[int] = []
+        self._queries: List[str] = []
+        self._answers: List[str] = []
+        self._sources: List[str] = []
+        self._versions: List[Optional[str]] = []
+        self._row_of_query: Dict[str, int] = {}
+        self._index_version: Optional[str] = None
+        self._stale_rows: Set[int] = set()
+        # (st_dev, st_ino) of the vector file and the byte offset read up to
+        self._file_ident: Optional[Tuple[int, int]] = None
+        self._file_offset = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._exact_hits = 0
+        self._followups_bypassed = 0
+        self._synced_rows = 0
+
+    # ---- storage ---------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                query TEXT UNIQUE,
+                answer TEXT,
+                source TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        if not self._schema_checked:
+            # Older chat_cache.db files predate the index_version tag
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if "index_version" not in columns:
+                conn.execute("ALTER TABLE cache ADD COLUMN index_version TEXT")
+            self._schema_checked = True
+        return conn
+
+    def _read_vector_file(self, offset: int = 0) -> List[Tuple[int, np.ndarray]]:
+        """
+        (row id, vector) of every whole record after byte `offset` (0 = the
+        whole file), in file order. Remembers how far the file was read.
+        """
+        try:
+            with open(self.embeddings_path, "rb") as f:
+                st = os.fstat(f.fileno())
+                magic, dim = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _FILE_MAGIC:
+                    return []
+                dtype = _record_dtype(dim)
+                start = max(offset, _HEADER.size)
+                count = max(0, st.st_size - start) // dtype.itemsize  # skip a record still being appended
+                f.seek(start)
+                records = np.fromfile(f, dtype=dtype, count=count)
+        except FileNotFoundError:
+            return []
+        except (OSError, struct.error, ValueError) as e:
+            print(f"[semantic_cache] Ignoring unreadable vector file: {e}")
+            return []
+
+        self._file_ident = (st.st_dev, st.st_ino)
+        self._file_offset = start + count * dtype.itemsize
+        return [(int(r["id"]), r["vec"]) for r in records]
+
+    def _rewrite_vector_file(self) -> None:
+        """Compact the file to one record per row (caller holds the file lock)."""
+        dim = self._matrix.shape[1]
+        records = np.empty(self._size, dtype=_record_dtype(dim))
+        records["id"] = self._row_ids
+        records["vec"] = self._matrix[: self._size]
+
+        tmp_path = self.embeddings_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(_FILE_MAGIC, dim))
+            records.tofile(f)
+        os.replace(tmp_path, self.embeddings_path)
+
+        st = os.stat(self.embeddings_path)
+        self._file_ident = (st.st_dev, st.st_ino)
+        self._file_offset = st.st_size
+
+    def _append_vector_file(self, row_id: int, vector: np.ndarray) -> None:
+        dim = vector.shape[0]
+        record = np.empty(1, dtype=_record_dtype(dim))
+        record["id"] = row_id
+        record["vec"] = vector
+
+        with _file_lock(self.embeddings_path):
+            with open(self.embeddings_path, "ab") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size == 0:
+                    f.write(_HEADER.pack(_FILE_MAGIC, dim))
+                    self._file_ident, self._file_offset = (st.st_dev, st.st_ino), _HEADER.size
+                start = f.tell()
+                record.tofile(f)
+                if self._file_ident == (st.st_dev, st.st_ino) and self._file_offset == start:
+                    # Nothing from other workers in between: our own record needs no re-read
+                    self._file_offset = f.tell()
+
+    def _sync_from_file(self) -> None:
+        """
+        Pick up rows other workers saved since the last look (caller holds
+        self._lock). Costs one stat() when nothing changed.
+        """
+        try:
+            st = os.stat(self.embeddings_path)
+        except OSError:
+            return
+        ident = (st.st_dev, st.st_ino)
+        if ident == self._file_ident and st.st_size == self._file_offset:
+            return
+
+        latest = dict(self._read_vector_file(self._file_offset if ident == self._file_ident else 0))
+        if not latest:
+            return
+        ids = list(latest)
+        rows = []
+        with self._connect() as conn:
+            for i in range(0, len(ids), _SQL_BATCH):
+                batch = ids[i:i + _SQL_BATCH]
+                rows += conn.execute(
+                    f"SELECT id, query, answer, source, index_version FROM cache WHERE id IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+
+        for row_id, query, answer, source, version in rows:
+            row = self._row_of_query.get(query)
+            if row is None:
+                self._append_row(row_id, query, answer, source, version, latest[row_id])
+            else:
+                self._update_row(row, answer, source, version)
+        self._synced_rows += len(rows)
+
+    # ---- in-memory matrix ------------------------------------------
+
+    def _is_stale(self, version: Optional[str]) -> bool:
+        return version is not None and self._index_version is not None and version != self._index_version
+
+    def _append_row(
+        self, row_id: int, query: str, answer: str, source: str, version: Optional[str], vector: np.ndarray
+    ) -> None:
+        if self._matrix.shape[1] != vector.shape[0]:
+            self._matrix = np.zeros((max(16, self._size), vector.shape[0]), dtype=np.float32)
+
+        if self._size == self._matrix.shape[0]:
+            grown = np.zeros((max(16, 2 * self._size), self._matrix.shape[1]), dtype=np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+
+        self._matrix[self._size] = vector
+        self._row_ids.append(row_id)
+        self._queries.append(query)
+        self._answers.append(answer)
+        self._sources.append(source)
+        self._versions.append(version)
+        if self._is_stale(version):
+            self._stale_rows.add(self._size)
+        self._row_of_query[query] = self._size
+        self._size += 1
+
+    def _update_row(self, row: int, answer: str, source: str, version: Optional[str]) -> None:
+        self._answers[row] = answer
+        self._sources[row] = source
+        self._versions[row] = version
+        if self._is_stale(version):
+            self._stale_rows.add(row)
+        else:
+            self._stale_rows.discard(row)
+
+    def load(self) -> None:
+        """Read the cache table and line it up with the persisted vectors."""
+        with self._lock:
+            if self._loaded:
+                return
+
+            with _file_lock(self.embeddings_path):
+                with self._connect() as conn:
+                    rows = conn.execute("SELECT id, query, answer, source, index_version FROM cache ORDER BY id").fetchall()
+
+                records = self._read_vector_file()
+                stored = dict(records)
+                missing = [q for row_id, q, _, _, _ in rows if row_id not in stored]
+                fresh = dict(zip(missing, embed_query_vectors(missing))) if missing else {}
+
+                for row_id, query, answer, source, version in rows:
+                    vector = stored.get(row_id)
+                    if vector is None:
+                        vector = fresh[query]
+                    self._append_row(row_id, query, answer, source, version, vector)
+
+                # Only rewrite the sidecar when it is out of step with the table
+                # (missing rows, deleted rows or repeated records of updated rows).
+                if self._size and (missing or len(records) != self._size):
+                    self._rewrite_vector_file()
+
+            self._loaded = True
+            print(f"[semantic_cache] Loaded {self._size} cached answers ({len(missing)} newly embedded)")
+
+    # ---- public API ------------------------------------------------
+
+    def _exact_lookup(self, query: str) -> Optional[Tuple[str, str, str, float]]:
+        """The row stored under exactly `query`, unless it is stale. Needs no embedding model."""
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT answer, source, index_version FROM cache WHERE query = ?", (query,)
+                ).fetchone()
+            if row is None or self._is_stale(row[2]):
+                return None
+        return row[0], row[1], query, 1.0
+
+    def _bypass_followup(self, query: str, history: str) -> bool:
+        if not is_history_dependent(query, history):
+            return False
+        with self._lock:
+            self._followups_bypassed += 1
+        return True
+
+    def lookup(self, query: str, history: str = "") -> Optional[Tuple[str, str, str, float]]:
+        """
+        Return (answer, source, matched_query, similarity) for the nearest hit, else None.
+        A follow-up that depends on `history` (the earlier turns) always misses.
+        """
+        if self._bypass_followup(query, history):
+            return None
+        if not is_embedding_model_ready():
+            # Cold start: no vectors yet, but an exact question (e.g. a pre-generated
+            # FAQ button) is answered straight from the table
+            hit = self._exact_lookup(query)
+            with self._lock:
+                if hit is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+                    self._exact_hits += 1
+            return hit
+        self.load()
+        vector = embed_query_vector(query)
+
+        with self._lock:
+            self._sync_from_file()
+            if not self._size:
+                self._misses += 1
+                return None
+
+            sims = self._matrix[: self._size] @ vector
+            if self._stale_rows:
+                sims[np.fromiter(self._stale_rows, dtype=np.int64, count=len(self._stale_rows))] = -np.inf
+            best = int(np.argmax(sims))
+            similarity = float(sims[best])
+
+            if similarity < self.threshold:
+                self._misses += 1
+                return None
+
+            self._hits += 1
+            return self._answers[best], self._sources[best], self._queries[best], similarity
+
+    def save(
+        self, query: str, answer: str, source: str, index_version: Optional[str] = None, history: str = ""
+    ) -> bool:
+        """
+        Insert or overwrite one cached answer; new questions are appended incrementally.
+        `index_version` tags answers generated against a specific KB build. Answers
+        to follow-ups that depend on `history` are not stored (returns False).
+        """
+        if self._bypass_followup(query, history):
+            return False
+        self.load()
+        vector = embed_query_vector(query)
+
+        with self._lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        """
+                        INSERT INTO cache (query, answer, source, index_version) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(query) DO UPDATE SET
+                            answer = excluded.answer,
+                            source = excluded.source,
+                            index_version = excluded.index_version
+                        """,
+                        (query, answer, source, index_version),
+                    )
+                    row_id = conn.execute("SELECT id FROM cache WHERE query = ?", (query,)).fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"[semantic_cache] Failed to save answer: {e}")
+                return False
+
+            row = self._row_of_query.get(query)
+            if row is not None:
+                self._update_row(row, answer, source, index_version)
+            else:
+                self._append_row(row_id, query, answer, source, index_version, vector)
+            # Appended even for an overwrite, so other workers see the change
+            self._append_vector_file(row_id, vector)
+            return True
+
+    def set_index_version(self, index_version: Optional[str]) -> None:
+        """Serve only answers tagged with `index_version` (or untagged) from now on."""
+        with self._lock:
+            self._index_version = index_version
+            self._stale_rows = {row for row, version in enumerate(self._versions) if self._is_stale(version)}
+        print(f"[semantic_cache] KB index version {index_version}: {len(self._stale_rows)} stale answers skipped")
+
+    def index_version_of(self, query: str) -> Optional[str]:
+        """The index_version an exact cached question was generated with (None if untagged/absent)."""
+        with self._lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT index_version FROM cache WHERE query = ?", (query,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._size,
+                "stale_entries": len(self._stale_rows),
+                "index_version": self._index_version,
+                "hits": self._hits,
+                "exact_hits_cold_start": self._exact_hits,
+                "misses": self._misses,
+                "followups_bypassed": self._followups_bypassed,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "threshold": self.threshold,
+                "rows_synced": self._synced_rows,
+            }
+
+
+# -------------------------------------------------------------------
+# 2. Process-wide singleton
+# -------------------------------------------------------------------
+
+_semantic_cache: Optional[SemanticAnswerCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticAnswerCache:
+    """Return the process-wide semantic cache bound to chat_cache.db."""
+    global _semantic_cache
+
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticAnswerCache(
+                    db_path=CACHE_DB_PATH,
+                    embeddings_path=CACHE_EMBEDDINGS_PATH,
+                    threshold=CACHE_MATCH_THRESHOLD,
+                )
+
+    return _semantic_cache
@@ -0,0 +1,155 @@
+# app/session_store.py
+"""
+Server-side conversation sessions for /chat and /chat/stream.
+
+Key ideas:
+- Sessions are keyed by the session_id the widget sends with every call,
+  expire after SESSION_TTL_SECONDS idle, and are evicted least-recently-used
+  beyond SESSION_MAX_SESSIONS (OrderedDict, oldest first).
+- Each session keeps its last SESSION_MAX_TURNS English queries together with
+  their embeddings, computed once when the turn is recorded.
+- combine_with_history() blends the current query vector with those cached
+  vectors (newer turns weigh more), so retrieval follows the conversation
+  without re-encoding "query | Previous Context: ..." text every turn.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.Day_19_A import (
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_SESSIONS,
+    SESSION_MAX_TURNS,
+    SESSION_HISTORY_WEIGHT,
+    SESSION_HISTORY_DECAY,
+)
+
+
+class ConversationSession:
+    """Recent turns of one visitor's conversation."""
+
+    __slots__ = ("session_id", "last_seen", "_turns", "_lock")
+
+    def __init__(self, session_id: str, max_turns: int):
+        self.session_id = session_id
+        self.last_seen = time.monotonic()
+        self._turns: Deque[Tuple[str, Optional[np.ndarray]]] = deque(maxlen=max_turns)
+        self._lock = threading.Lock()
+
+    def add_turn(self, english_query: str, vector: Optional[np.ndarray]) -> None:
+        """Record a turn; `vector` may be None if the embedding model was not ready."""
+        with self._lock:
+            self._turns.append((english_query, vector))
+
+    def history_text(self) -> str:
+        """Prior queries oldest first, in the 'q1 | q2 | q3' form the pipeline uses."""
+        with self._lock:
+            return " | ".join(text for text, _ in self._turns)
+
+    def history_vectors(self) -> List[np.ndarray]:
+        """Embeddings of prior queries, newest first (turns without one are skipped)."""
+        with self._lock:
+            return [vec for _, vec in reversed(self._turns) if vec is not None]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._turns)
+
+
+def combine_with_history(
+    query_vector: np.ndarray,
+    history_vectors: List[np.ndarray],
+    history_weight: float = SESSION_HISTORY_WEIGHT,
+    decay: float = SESSION_HISTORY_DECAY,
+) -> np.ndarray:
+    """
+    Weighted blend of the query vector (1 - history_weight) and the history
+    vectors (history_weight, split by `decay` per step back), re-normalised.
+    """
+    if not history_vectors:
+        return query_vector
+
+    steps = np.power(decay, np.arange(len(history_vectors), dtype=np.float32))
+    steps *= history_weight / steps.sum()
+
+    combined = (1.0 - history_weight) * np.asarray(query_vector, dtype=np.float32)
+    combined = combined + steps @ np.vstack(history_vectors).astype(np.float32)
+    norm = float(np.linalg.norm(combined))
+    return combined / norm if norm else combined
+
+
+# -------------------------------------------------------------------
+# Store
+# -------------------------------------------------------------------
+
+class SessionStore:
+    """TTL + LRU map of session_id -> ConversationSession."""
+
+    def __init__(self, ttl_seconds: float, max_sessions: int, max_turns: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max(1, max_sessions)
+        self.max_turns = max_turns
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._created = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def _drop_expired(self, now: float) -> None:
+        # Oldest-touched first, so stop at the first live session
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_seen < self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self._expired += 1
+
+    def get(self, session_id: str) -> ConversationSession:
+        """Return the live session for `session_id`, creating it if needed."""
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ConversationSession(session_id, self.max_turns)
+                self._sessions[session_id] = session
+                self._created += 1
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self._evicted += 1
+            else:
+                self._sessions.move_to_end(session_id)
+
+            session.last_seen = now
+            return session
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "created": self._created,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store sized from Day_19_A."""
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore(SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS, SESSION_MAX_TURNS)
+
+    return _store
@@ -0,0 +1,107 @@
+# app/single_flight.py
+"""
+Single-flight coalescing of identical in-flight pipeline runs.
+
+Key ideas:
+- The first caller for a key (the "leader") runs the work; callers that
+  arrive with the same key while it is still running wait on the leader's
+  Future and share its result (or its exception).
+- The key is dropped as soon as the leader finishes, so this is *not* a
+  cache: later requests go through the normal cache-first path, which by
+  then has the leader's answer.
+- A caller that has to produce output while it works (the streaming turn)
+  uses begin()/finish() instead of do(): as the leader it runs the work
+  inline and publishes the result when done; otherwise it waits like do().
+- Counters (executions, coalesced callers, peak waiters) for /debug/stats.
+"""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+        self._executions = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+
+    def begin(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Join the flight for `key`: (future, True) makes the caller the leader,
+        who must call finish(); (future, False) means wait on future.result().
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._coalesced += 1
+                self._waiters[key] += 1
+                self._max_waiters = max(self._max_waiters, self._waiters[key])
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._waiters[key] = 0
+            self._executions += 1
+            return future, True
+
+    def finish(self, key: Hashable, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Leader only: hand `result` (or `error`) to every waiter and close the flight."""
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self._waiters.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() once per concurrent `key`; duplicates get the leader's result."""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except Exception as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = self._executions + self._coalesced
+            return {
+                "executions": self._executions,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._in_flight),
+                "max_waiters": self._max_waiters,
+                "coalesced_rate": round(self._coalesced / calls, 4) if calls else 0.0,
+            }
+
+
+# -------------------------------------------------------------------
+# Process-wide group for answer_query_with_cache_first
+# -------------------------------------------------------------------
+
+_answer_flight: Optional[SingleFlight] = None
+_answer_flight_lock = threading.Lock()
+
+
+def get_answer_flight() -> SingleFlight:
+    """Return the singleton group that coalesces duplicate chat turns."""
+    global _answer_flight
+
+    if _answer_flight is None:
+        with _answer_flight_lock:
+            if _answer_flight is None:
+                _answer_flight = SingleFlight("answer")
+
+    return _answer_flight
@@ -0,0 +1,324 @@
+# app/spell_corrector.py
+"""
+Local spell-correction gate in front of the Gemini cleaning call.
+
+Key ideas:
+- Vocabulary = words from the indexed KB chunks + FAQ_SEED_QUESTIONS +
+  SUGGESTED_FAQS (+ a small list of common English words), with counts.
+- Symmetric-delete lookup (SymSpell style): every vocabulary word is indexed
+  under all of its deletions up to SPELL_MAX_EDIT_DISTANCE, so candidates for
+  a typo are found by generating the typo's own deletions, with no scan of
+  the vocabulary. Candidates are ranked by true edit distance, then count.
+- Glued domain terms ("sixsigma", "leanmaster") are split back into the
+  multi-word LEAD_TRIGGER_KEYWORDS they come from. Any other split into two
+  known words ("someone" -> "some one") is only a guess and escalates.
+- Acronyms and codes (all-caps or containing digits: OEE, IMS, ISO 9001)
+  are never rewritten. Unknown words of SPELL_MIN_WORD_LENGTH characters
+  or fewer are too short to correct safely, so they escalate to Gemini.
+- Each word gets a confidence; if the weakest word is below
+  SPELL_CONFIDENCE_THRESHOLD the caller escalates to Gemini. Counters show
+  how often the LLM call was avoided.
+"""
+
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.Day_19_A import (
+    FAQ_SEED_QUESTIONS,
+    SUGGESTED_FAQS,
+    LEAD_TRIGGER_KEYWORDS,
+    SPELL_MAX_EDIT_DISTANCE,
+    SPELL_CONFIDENCE_THRESHOLD,
+    SPELL_MIN_WORD_LENGTH,
+    KB_SEARCH_BACKEND,
+)
+
+
+_WORD_RE = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)?")
+# Tokens looked at when correcting: letters and digits, so "ISO9001" stays whole
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+(?:['’][A-Za-z]+)?")
+
+# Everyday words users type that may not appear on the website itself.
+_COMMON_WORDS = """
+a about after all also am an and any are as at be because been before being best
+between both but by can could did do does doing for from get give go good had has
+have he help her here how i if in into is it its just know like looking me more
+most my need new no not now of on one only or other our out please price pricing
+provide really required should show so some tell than thank thanks that the their
+them then there these they this those through to too under up us use want was way
+we well were what whats when where which who why will with would yes you your
+""".split()
+
+
+class SpellCorrection(NamedTuple):
+    text: str
+    confidence: float
+    changed: bool
+
+
+def _osa_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal-string-alignment (Damerau-Levenshtein) distance, early exit past max."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    prev_prev: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable from `word` by removing up to max_distance characters."""
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        nxt = set()
+        for w in frontier:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        nxt -= found
+        found |= nxt
+        frontier = nxt
+    return found
+
+
+def _match_case(original: str, corrected: str) -> str:
+    if original.isupper() and len(original) > 1:
+        return corrected.upper()
+    if original[0].isupper():
+        return corrected[0].upper() + corrected[1:]
+    return corrected
+
+
+# -------------------------------------------------------------------
+# 1. Corrector
+# -------------------------------------------------------------------
+
+class SymSpellCorrector:
+    """Symmetric-delete spelling corrector over a domain vocabulary."""
+
+    def __init__(self, max_edit_distance: int, confidence_threshold: float, min_word_length: int = SPELL_MIN_WORD_LENGTH):
+        self.max_edit_distance = max_edit_distance
+        self.confidence_threshold = confidence_threshold
+        self.min_word_length = min_word_length
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._deletes: Dict[str, List[str]] = defaultdict(list)
+        self._compounds: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self._queries = 0
+        self._local_clean = 0
+        self._local_fixed = 0
+        self._escalated = 0
+
+    # ---- vocabulary ------------------------------------------------
+
+    def add_word(self, word: str, count: int = 1) -> None:
+        word = word.lower()
+        if self._counts[word] == 0:
+            for d in _deletes(word, self.max_edit_distance):
+                self._deletes[d].append(word)
+        self._counts[word] += count
+
+    def add_compound(self, phrase: str) -> None:
+        """Register a multi-word domain term; its glued form is split back with confidence."""
+        words = phrase.lower().split()
+        if len(words) > 1:
+            self._compounds["".join(words)] = " ".join(words)
+            for word in words:
+                if not self._counts.get(word):
+                    self.add_word(word)
+
+    def add_text(self, text: str) -> None:
+        for word in _WORD_RE.findall(text or ""):
+            self.add_word(word)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    # ---- lookup ----------------------------------------------------
+
+    def _best_candidate(self, word: str) -> Optional[Tuple[str, int, float]]:
+        """Return (suggestion, distance, confidence) for an unknown word."""
+        candidates: Set[str] = set()
+        for d in _deletes(word, self.max_edit_distance):
+            candidates.update(self._deletes.get(d, ()))
+
+        scored = []
+        for cand in candidates:
+            dist = _osa_distance(word, cand, self.max_edit_distance)
+            if dist <= self.max_edit_distance:
+                scored.append((dist, -self._counts[cand], cand))
+        if not scored:
+            return None
+
+        scored.sort()
+        dist, neg_count, best = scored[0]
+        rivals = [s for s in scored[1:] if s[0] == dist]
+        if dist == 1:
+            # Unambiguous, or clearly more common than the runner-up
+            confidence = 0.9 if not rivals or -neg_count >= 2 * -rivals[0][1] else 0.7
+        else:
+            confidence = 0.6
+        return best, dist, confidence
+
+    def _split_compound(self, word: str) -> Optional[str]:
+        """'sixsigma' -> 'six sigma' when both halves are known words (no confidence implied)."""
+        best = None
+        best_score = 0
+        for i in range(2, len(word) - 1):
+            left, right = word[:i], word[i:]
+            if self._counts.get(left) and self._counts.get(right):
+                score = min(self._counts[left], self._counts[right])
+                if score > best_score:
+                    best, best_score = f"{left} {right}", score
+        return best
+
+    def _correct_word(self, word: str) -> Tuple[str, float]:
+        lower = word.lower()
+        if len(lower) <= 2 or self._counts.get(lower):
+            return word, 1.0
+        if (word.isupper() and len(word) > 1) or any(ch.isdigit() for ch in word):
+            # Acronym or code (OEE, IMS, 9001): leave it exactly as typed
+            return word, 1.0
+        if len(lower) <= self.min_word_length:
+            # One edit away from too many real words ("oee" -> "one"); let Gemini decide
+            return word, min(0.5, self.confidence_threshold - 0.1)
+
+        compound = self._compounds.get(lower)
+        if compound:
+            return _match_case(word, compound), 0.9
+
+        found = self._best_candidate(lower)
+        if found is not None and found[1] == 1:
+            suggestion, _dist, confidence = found
+            return _match_case(word, suggestion), confidence
+
+        if self._split_compound(lower):
+            # "someone", "cannot", "onsite": real words outside our vocabulary, not typos
+            return word, min(0.5, self.confidence_threshold - 0.1)
+
+        if found is None:
+            # Out-of-vocabulary and nothing close: probably fine, but let Gemini decide
+            return word, 0.5
+        suggestion, _dist, confidence = found
+        return _match_case(word, suggestion), confidence
+
+    def correct(self, text: str) -> SpellCorrection:
+        """Correct every word of `text`; confidence is that of the weakest word."""
+        confidence = 1.0
+
+        def _sub(match: "re.Match[str]") -> str:
+            nonlocal confidence
+            fixed, conf = self._correct_word(match.group(0))
+            confidence = min(confidence, conf)
+            return fixed
+
+        corrected = _TOKEN_RE.sub(_sub, text)
+        return SpellCorrection(corrected, confidence, corrected != text)
+
+    # ---- gate used by clean_query_with_gemini ----------------------
+
+    def try_local(self, text: str) -> Optional[str]:
+        """Return the locally corrected text if confident, else None (escalate to Gemini)."""
+        result = self.correct(text)
+        with self._lock:
+            self._queries += 1
+            if result.confidence < self.confidence_threshold:
+                self._escalated += 1
+                return None
+            if result.changed:
+                self._local_fixed += 1
+            else:
+                self._local_clean += 1
+        return result.text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            avoided = self._local_clean + self._local_fixed
+            return {
+                "vocabulary_size": len(self._counts),
+                "queries": self._queries,
+                "llm_calls_avoided": avoided,
+                "already_clean": self._local_clean,
+                "corrected_locally": self._local_fixed,
+                "escalated_to_gemini": self._escalated,
+                "avoided_rate": round(avoided / self._queries, 4) if self._queries else 0.0,
+            }
+
+
+# -------------------------------------------------------------------
+# 2. Process-wide singleton built from KB + FAQ text
+# -------------------------------------------------------------------
+
+_corrector: Optional[SymSpellCorrector] = None
+_corrector_lock = threading.Lock()
+
+
+def build_spell_corrector() -> SymSpellCorrector:
+    from app.Day_19_B import get_kb_collection, get_kb_vector_index
+
+    corrector = SymSpellCorrector(SPELL_MAX_EDIT_DISTANCE, SPELL_CONFIDENCE_THRESHOLD)
+
+    for word in _COMMON_WORDS:
+        corrector.add_word(word)
+    for question in FAQ_SEED_QUESTIONS + SUGGESTED_FAQS:
+        corrector.add_text(question)
+    for keyword in LEAD_TRIGGER_KEYWORDS:
+        corrector.add_compound(keyword)
+
+    try:
+        if KB_SEARCH_BACKEND in ("numpy", "mmap"):
+            documents = get_kb_vector_index().documents
+        else:
+            documents = get_kb_collection().get(include=["documents"]).get("documents") or []
+        for doc in documents:
+            corrector.add_text(doc)
+    except Exception as e:
+        print(f"[spell_corrector] KB vocabulary unavailable, using FAQ text only: {e}")
+
+    print(f"[spell_corrector] Vocabulary ready: {len(corrector)} words")
+    return corrector
+
+
+def get_spell_corrector() -> SymSpellCorrector:
+    """Return the process-wide corrector (vocabulary built on first use)."""
+    global _corrector
+
+    if _corrector is None:
+        with _corrector_lock:
+            if _corrector is None:
+                _corrector = build_spell_corrector()
+
+    return _corrector
+
+
+def spell_corrector_stats() -> Optional[Dict[str, Any]]:
+    """Counters of the corrector if it has been built (never builds the vocabulary)."""
+    corrector = _corrector
+    return corrector.stats() if corrector is not None else None
+
+
+def rebuild_spell_corrector(index_version: Optional[str] = None) -> None:
+    """
+    KB version listener: build the vocabulary of the new chunks on the swap
+    thread, then replace the old corrector (queries keep using it meanwhile).
+    """
+    global _corrector
+
+    corrector = build_spell_corrector()
+    with _corrector_lock:
+        _corrector = corrector
@@ -0,0 +1,118 @@
+# app/stage_graph.py
+"""
+Tiny dependency-graph runner for the per-turn RAG pipeline.
+
+Key ideas:
+- Each stage is a plain function plus the names of the stages it needs.
+  Its dependencies' results are passed in as keyword arguments.
+- Stages are scheduled lazily: nothing runs until someone calls start() or
+  result() on it (or on a stage that depends on it). That lets the caller
+  speculatively start cheap/independent work (cache lookup, cleaning,
+  draft retrieval) while keeping expensive stages (generation) behind
+  data-dependent decisions such as "was it a cache hit?".
+- A stage is submitted to the pool only once all of its dependencies are
+  done (via future callbacks), so pool threads never block waiting on
+  each other and a small pool cannot deadlock.
+- Soft dependencies: a stage may return another stage's future instead of
+  a value (e.g. "reuse the draft retrieval if cleaning changed nothing").
+  Its own future then completes with that one, again via a callback.
+- cancel() drops speculative stages that turned out to be unnecessary; a
+  stage that has not started yet never runs (one already running finishes
+  and its result is ignored).
+"""
+
+import threading
+from concurrent.futures import CancelledError, Executor, Future
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+
+class StageGraph:
+    """Lazily scheduled DAG of stages executed on a shared thread pool."""
+
+    def __init__(self, pool: Executor):
+        self._pool = pool
+        self._stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, fn: Callable[..., Any], deps: Iterable[str] = ()) -> "StageGraph":
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    @staticmethod
+    def _forward(source: Future, target: Future) -> None:
+        if source.cancelled():
+            target.set_exception(CancelledError())
+        elif source.exception() is not None:
+            target.set_exception(source.exception())
+        else:
+            target.set_result(source.result())
+
+    def _launch(self, name: str, future: Future, dep_futures: Dict[str, Future]) -> None:
+        fn, _ = self._stages[name]
+        try:
+            kwargs = {dep: f.result() for dep, f in dep_futures.items()}
+        except Exception as e:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(e)
+            return
+
+        def _run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return  # cancelled before it started
+            try:
+                value = fn(**kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                return
+            if isinstance(value, Future):
+                value.add_done_callback(lambda f: self._forward(f, future))
+            else:
+                future.set_result(value)
+
+        self._pool.submit(_run)
+
+    def future(self, name: str) -> Future:
+        """Return the stage's future, scheduling it (and its dependencies) if needed."""
+        with self._lock:
+            existing = self._futures.get(name)
+            if existing is not None:
+                return existing
+            future: Future = Future()
+            self._futures[name] = future
+
+        _, deps = self._stages[name]
+        dep_futures = {dep: self.future(dep) for dep in deps}
+        if not dep_futures:
+            self._launch(name, future, dep_futures)
+            return future
+
+        remaining = [len(dep_futures)]
+        counter_lock = threading.Lock()
+
+        def _on_dep_done(_f: Future) -> None:
+            with counter_lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._launch(name, future, dep_futures)
+
+        for f in dep_futures.values():
+            f.add_done_callback(_on_dep_done)
+        return future
+
+    def start(self, *names: str) -> None:
+        """Kick off stages without waiting for them."""
+        for name in names:
+            self.future(name)
+
+    def cancel(self, *names: str) -> None:
+        """Skip stages that have been scheduled but not started yet."""
+        with self._lock:
+            futures = [self._futures[name] for name in names if name in self._futures]
+        for future in futures:
+            future.cancel()
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Run (if needed) and wait for one stage."""
+        return self.future(name).result(timeout=timeout)
@@ -0,0 +1,138 @@
+# app/translation_cache.py
+"""
+Two-tier cache for googletrans results.
+
+Key ideas:
+- Keyed on (text, src, dest). Answers are fixed strings far more often than
+  not (cache hits, small talk, the unclear-query message, popular FAQs), so
+  the same translation is requested again and again.
+- Tier 1: in-process LRU (OrderedDict) of TRANSLATION_CACHE_MAX_ENTRIES.
+- Tier 2: SQLite table on disk, so translations survive restarts and are
+  shared by every worker. Disk hits are promoted into the LRU.
+- Only successful translations are stored.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.Day_19_A import TRANSLATION_CACHE_DB_PATH, TRANSLATION_CACHE_MAX_ENTRIES
+
+
+_Key = Tuple[str, str, str]
+
+
+class TranslationCache:
+    """In-memory LRU in front of a SQLite table of translations."""
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self._lru: "OrderedDict[_Key, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    # ---- storage ---------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    text TEXT NOT NULL,
+                    src TEXT NOT NULL,
+                    dest TEXT NOT NULL,
+                    translated TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (text, src, dest)
+                )
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: _Key, translated: str) -> None:
+        with self._lock:
+            self._lru[key] = translated
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    # ---- public API ------------------------------------------------
+
+    def get(self, text: str, src: str, dest: str) -> Optional[str]:
+        key = (text, src, dest)
+        with self._lock:
+            translated = self._lru.get(key)
+            if translated is not None:
+                self._lru.move_to_end(key)
+                self._memory_hits += 1
+                return translated
+
+        try:
+            row = self._connect().execute(
+                "SELECT translated FROM translations WHERE text = ? AND src = ? AND dest = ?", key
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[translation_cache] Disk lookup failed: {e}")
+            row = None
+
+        if row is None:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        self._remember(key, row[0])
+        with self._lock:
+            self._disk_hits += 1
+        return row[0]
+
+    def put(self, text: str, src: str, dest: str, translated: str) -> None:
+        self._remember((text, src, dest), translated)
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO translations (text, src, dest, translated) VALUES (?, ?, ?, ?)",
+                (text, src, dest, translated),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"[translation_cache] Disk write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "entries_in_memory": len(self._lru),
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round((self._memory_hits + self._disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# -------------------------------------------------------------------
+# Process-wide singleton
+# -------------------------------------------------------------------
+
+_cache: Optional[TranslationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """Return the singleton cache backed by TRANSLATION_CACHE_DB_PATH."""
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TranslationCache(TRANSLATION_CACHE_DB_PATH, TRANSLATION_CACHE_MAX_ENTRIES)
+
+    return _cache
@@ -0,0 +1,197 @@
+# app/vector_index.py
+"""
+In-memory NumPy vector index: an alternative to Chroma's .query().
+
+Key ideas:
+- The KB is tiny (~120 chunks), so the HNSW machinery buys nothing.
+  We load every embedding, id, document and metadata from the persisted
+  collection once and keep them as one contiguous, L2-normalised float32
+  matrix plus parallel Python lists.
+- Top-k for one query is a single matrix-vector product; several queries
+  are answered with one matrix-matrix product.
+- Distances are reported in the collection's own space ("l2", "cosine" or
+  "ip"), so results line up with what collection.query() would return.
+- Results are returned in Chroma's raw shape ({"ids": [[...]], ...}) so the
+  callers in Day_19_B do not care which backend answered.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from chromadb.api.models.Collection import Collection
+
+
+# -------------------------------------------------------------------
+# 1. Metadata filtering (subset of Chroma's `where` syntax)
+# -------------------------------------------------------------------
+
+def match_where(meta: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Chroma-style `where` filter against one metadata dict.
+    Supports plain equality, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte, $and, $or.
+    """
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(match_where(meta, sub) for sub in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_where(meta, sub) for sub in cond):
+                return False
+            continue
+
+        value = meta.get(key)
+        if not isinstance(cond, dict):
+            if value != cond:
+                return False
+            continue
+
+        for op, target in cond.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+
+    return True
+
+
+# -------------------------------------------------------------------
+# 2. Index
+# -------------------------------------------------------------------
+
+class InMemoryVectorIndex:
+    """Exact brute-force index over a normalised float32 matrix."""
+
+    def __init__(
+        self,
+        ids: Sequence[str],
+        embeddings: Any,
+        documents: Sequence[Optional[str]],
+        metadatas: Sequence[Optional[Dict[str, Any]]],
+        space: str = "l2",
+    ):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.size == 0:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        self.matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        self.ids: List[str] = list(ids)
+        self.documents: List[Optional[str]] = list(documents)
+        self.metadatas: List[Dict[str, Any]] = [m or {} for m in metadatas]
+        self.space = space
+
+    @classmethod
+    def from_collection(cls, collection: Collection) -> "InMemoryVectorIndex":
+        """Pull the full collection out of Chroma once."""
+        data = collection.get(include=["embeddings", "documents", "metadatas"])
+        space = (collection.metadata or {}).get("hnsw:space", "l2")
+
+        index = cls(
+            ids=data.get("ids") or [],
+            embeddings=data.get("embeddings") or [],
+            documents=data.get("documents") or [],
+            metadatas=data.get("metadatas") or [],
+            space=space,
+        )
+        print(
+            f"[vector_index] Loaded {len(index)} vectors from '{collection.name}' "
+            f"(dim={index.dim}, space={space})"
+        )
+        return index
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return int(self.matrix.shape[1]) if self.matrix.size else 0
+
+    # ---- scoring ---------------------------------------------------
+
+    def _to_distance(self, sims: np.ndarray) -> np.ndarray:
+        """
+        Convert cosine similarity of unit vectors to the collection's distance.
+        Chroma's "l2" is the *squared* L2 distance: |a-b|^2 = 2 - 2*cos.
+        """
+        if self.space == "l2":
+            return np.maximum(2.0 - 2.0 * sims, 0.0)
+        return 1.0 - sims
+
+    def _candidate_rows(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        return np.fromiter(
+            (i for i, m in enumerate(self.metadatas) if match_where(m, where)),
+            dtype=np.int64,
+        )
+
+    def _top_k(self, sims: np.ndarray, n_results: int) -> np.ndarray:
+        k = min(n_results, sims.shape[-1])
+        if k <= 0:
+            return np.empty((sims.shape[0], 0), dtype=np.int64)
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(sims, part, axis=1).argsort(axis=1)[:, ::-1]
+        return np.take_along_axis(part, order, axis=1)
+
+    # ---- public queries --------------------------------------------
+
+    def query_batch(
+        self,
+        query_vectors: Any,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        """Top-k for several queries with one matrix-matrix product."""
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        if not len(self):
+            empty: List[List[Any]] = [[] for _ in range(len(queries))]
+            return {"ids": empty, "documents": list(empty), "metadatas": list(empty), "distances": list(empty)}
+        q_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        q_norms[q_norms == 0] = 1.0
+        queries = queries / q_norms
+
+        rows = self._candidate_rows(where)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+
+        sims = queries @ matrix.T
+        top = self._top_k(sims, n_results)
+        dists = self._to_distance(np.take_along_axis(sims, top, axis=1))
+
+        out: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q_top, q_dists in zip(top, dists):
+            idx = q_top if rows is None else rows[q_top]
+            out["ids"].append([self.ids[i] for i in idx])
+            out["documents"].append([self.documents[i] for i in idx])
+            out["metadatas"].append([self.metadatas[i] for i in idx])
+            out["distances"].append([float(d) for d in q_dists])
+
+        return out
+
+    def query(
+        self,
+        query_vector: Any,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, List[List[Any]]]:
+        """Top-k for one query (a single matrix-vector product)."""
+        return self.query_batch([query_vector], n_results=n_results, where=where)
@@ -12,6 +12,7 @@
     leadTriggerKeywords: ["pricing", "demo", "consulting"],
     leadScoreThreshold: 5.0,
     debugMode: false,
+    streaming: true,                // use /chat/stream (SSE) and render tokens as they arrive
     suggestedFaqs: [],
     fullFaqs: [],
     cssUrl: "widget.css"            // will be overridden by embed.js if needed
@@ -47,6 +48,49 @@
     return res.json();
   }
 
+  // POST that reads a text/event-stream body and calls onEvent(event, data)
+  // for every `event:` / `data:` block as it arrives.
+  async function postSSE(url, body, apiKey, onEvent) {
+    const headers = {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream"
+    };
+    if (apiKey) {
+      headers["X-API-Key"] = apiKey;
+    }
+    const res = await fetch(url, {
+      method: "POST",
+      headers,
+      body: JSON.stringify(body),
+      credentials: "omit"
+    });
+    if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let sep;
+      while ((sep = buffer.indexOf("\n\n")) !== -1) {
+        const block = buffer.slice(0, sep);
+        buffer = buffer.slice(sep + 2);
+
+        let event = "message";
+        const dataLines = [];
+        block.split("\n").forEach((line) => {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) dataLines.push(line.slice(5).trimStart());
+        });
+        if (dataLines.length) onEvent(event, JSON.parse(dataLines.join("\n")));
+      }
+    }
+  }
+
   async function getJSON(url) {
     const res = await fetch(url, { credentials: "omit" });
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
@@ -405,6 +449,14 @@
     }
   }
 
+  // ---------- Session id (server keeps history + embeddings per session) ----------
+  function newSessionId() {
+    if (window.crypto && typeof window.crypto.randomUUID === "function") {
+      return window.crypto.randomUUID();
+    }
+    return "s-" + Date.now().toString(36) + "-" + Math.random().toString(36).slice(2, 10);
+  }
+
   function getHistoryForBackend(state, numTurns = 3) {
     const historyQueries = state.messages
       .filter((m) => m.role === "user")
@@ -433,6 +485,7 @@
     container.className = "leanext-chat-message assistant";
 
     const content = document.createElement("div");
+    content.className = "leanext-chat-message-content";
     content.innerHTML = markdownToHtml(text);
 
     const metaEl = document.createElement("div");
@@ -490,6 +543,41 @@
     } else {
       state.messages.push(msgData);
     }
+
+    return row;
+  }
+
+  // Streams /chat/stream into an existing assistant row; resolves with the
+  // final `done` payload (same fields as the JSON /chat response).
+  async function streamChat(state, text, history, row, messagesEl) {
+    const options = state.options;
+    const contentEl = row.querySelector(".leanext-chat-message-content");
+    let streamed = "";
+    let final = null;
+
+    await postSSE(
+      options.backendUrl + "/chat/stream",
+      { query: text, history, session_id: state.sessionId },
+      options.apiKey,
+      (event, data) => {
+        if (event === "token") {
+          streamed += data.text || "";
+          contentEl.innerHTML = markdownToHtml(streamed);
+          messagesEl.scrollTop = messagesEl.scrollHeight;
+        } else if (event === "reset") {
+          // Generation failed part-way: drop the partial answer, the
+          // fallback message follows as a fresh token.
+          streamed = "";
+          contentEl.innerHTML = "";
+        } else if (event === "done") {
+          final = data;
+        } else if (event === "error") {
+          final = { answer: data.message, source: "Error" };
+        }
+      }
+    );
+
+    return final || { answer: streamed };
   }
 
   async function handleFeedback(state, msgIndex, type, upBtn, downBtn) {
@@ -536,7 +624,8 @@
     try {
       const resp = await postJSON(backendUrl + "/regenerate", {
         query: cleanedQuestion,
-        history
+        history,
+        session_id: state.sessionId
       }, apiKey);
 
       const newText =
@@ -595,7 +684,7 @@
       language: "en",
       distance: null
     };
-    appendAssistantMessage(
+    const placeholderRow = appendAssistantMessage(
       state,
       messagesEl,
       "Assistant is thinking… ✍️",
@@ -605,10 +694,23 @@
 
     try {
       const history = getHistoryForBackend(state, 3);
-      const resp = await postJSON(options.backendUrl + "/chat", {
-        query: text,
-        history
-      }, options.apiKey);
+      let resp = null;
+      if (options.streaming) {
+        try {
+          resp = await streamChat(state, text, history, placeholderRow, messagesEl);
+        } catch (streamErr) {
+          // Older backend without /chat/stream, or the stream could not start
+          console.warn("Streaming unavailable, falling back to /chat", streamErr);
+        }
+      }
+      if (!resp) {
+        resp = await postJSON(options.backendUrl + "/chat", {
+          query: text,
+          history,
+          session_id: state.sessionId
+        }, options.apiKey);
+      }
+      placeholderRow.remove();
 
       let finalText = resp.answer || "Sorry, I couldn't find an answer.";
       const meta = {
@@ -660,6 +762,7 @@
     const data = {
       ts: Date.now(),
       messages: state.messages,
+      sessionId: state.sessionId,
       leadScore: state.leadScore,
       leadLogged: state.leadLogged
     };
@@ -681,6 +784,7 @@
       if (days > 30) return;
 
       state.messages = [];
+      state.sessionId = data.sessionId || state.sessionId;
       state.leadScore = data.leadScore || 0;
       state.leadLogged = data.leadLogged || false;
 
@@ -708,6 +812,7 @@
       const state = {
         options,
         messages: [],
+        sessionId: newSessionId(),
         leadScore: 0,
         leadLogged: false,
         showLeadForm: false,
@@ -7,8 +7,21 @@ export PORT=${PORT:-8000}
 
 echo "➡ Listening on PORT: $PORT"
 
+# Workers: keep 1 unless KB_SEARCH_BACKEND=mmap, where every worker maps the
+# same read-only published index file (app/kb_index_versions/<version>/kb_index.lbx)
+# instead of loading its own copy.
+export WEB_CONCURRENCY=${WEB_CONCURRENCY:-1}
+
+# Pre-translated small talk / fallback replies: rebuilt only when missing or
+# out of date; a failed build just means those replies are translated live.
+python -m app.canned_translations --if-stale || echo "⚠ Canned translations not built; using live translation"
+
+# Publish the committed Chroma DB as the live KB version (app/kb_index_versions
+# is not in git). Unchanged contents only re-point CURRENT.
+python -m app.kb_versions || echo "⚠ KB version not published; serving the unversioned index"
+
 # Run the FastAPI app inside app/main.py
 gunicorn app.main:app \
-  --workers 1 \
+  --workers $WEB_CONCURRENCY \
   --worker-class uvicorn.workers.UvicornWorker \
   --bind 0.0.0.0:$PORT
@@ -0,0 +1,75 @@
+"""Bounded pipeline executor (app/chat_executor.py): admission control and the /chat 503."""
+
+import threading
+
+import pytest
+
+from app.chat_executor import BoundedPipelineExecutor, ExecutorSaturatedError
+
+
+@pytest.fixture
+def blocked_executor():
+    """One worker and a queue of one; both slots are taken by tasks waiting on `release`."""
+    executor = BoundedPipelineExecutor(max_workers=1, max_queue=1)
+    release = threading.Event()
+    futures = [executor.submit(release.wait, 5) for _ in range(executor.capacity)]
+    yield executor, release, futures
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+
+def test_requests_beyond_capacity_are_rejected(blocked_executor):
+    executor, _release, _futures = blocked_executor
+
+    with pytest.raises(ExecutorSaturatedError) as excinfo:
+        executor.submit(lambda: "never runs")
+
+    assert excinfo.value.retry_after >= 1
+    stats = executor.stats()
+    assert stats["rejected"] == 1
+    assert stats["running"] + stats["queued"] == executor.capacity
+
+
+def test_slots_are_released_when_work_finishes(blocked_executor):
+    executor, release, futures = blocked_executor
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert executor.submit(lambda: 42).result(timeout=5) == 42
+    assert executor.stats()["completed"] == executor.capacity + 1
+
+
+def test_failed_work_releases_its_slot():
+    executor = BoundedPipelineExecutor(max_workers=1, max_queue=0)
+
+    def boom():
+        raise ValueError("pipeline failed")
+
+    with pytest.raises(ValueError):
+        executor.submit(boom).result(timeout=5)
+    assert executor.submit(lambda: "ok").result(timeout=5) == "ok"
+    assert executor.stats()["failed"] == 1
+
+
+def test_chat_endpoint_answers_503_with_retry_after(monkeypatch):
+    pytest.importorskip("sentence_transformers")
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    class _Saturated:
+        async def run(self, *args, **kwargs):
+            raise ExecutorSaturatedError(7)
+
+        def stream(self, *args, **kwargs):
+            raise ExecutorSaturatedError(7)
+
+    monkeypatch.setattr(main, "get_pipeline_executor", lambda: _Saturated())
+    client = TestClient(main.app)
+
+    for path in ("/chat", "/chat/stream"):
+        response = client.post(path, json={"query": "What is Lean Six Sigma?"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
@@ -0,0 +1,94 @@
+"""Prompt context assembly (app/context_packer.py): stitching and budget trimming."""
+
+from app.context_packer import ContextPacker
+
+
+def _page_chunks(path, words, size=10, overlap=4, first_index=0):
+    """Chunks cut like the index pipeline does, with their chunk_index metadata."""
+    step = size - overlap
+    chunks = []
+    for n, start in enumerate(range(0, len(words) - overlap, step)):
+        chunks.append({
+            "document": " ".join(words[start:start + size]),
+            "metadata": {"path": path, "chunk_index": first_index + n},
+            "distance": 0.2,
+        })
+    return chunks
+
+
+def _words(prefix, n):
+    return [f"{prefix}{i}" for i in range(n)]
+
+
+def test_adjacent_chunks_are_stitched_in_page_order():
+    packer = ContextPacker(token_budget=1000, min_overlap_words=5, duplicate_jaccard=0.8)
+    words = _words("w", 22)
+    first, second, third = _page_chunks("/lean", words)
+    # retriever ranked the later chunks first; overlap (4 words) is under min_overlap_words
+    packed = packer.pack([third, first, second])
+    assert packed.passages == 1
+    assert packed.merged == 2
+    assert packed.text == "Source Page (/lean): " + " ".join(words)
+
+
+def test_non_adjacent_chunks_of_a_page_stay_separate():
+    packer = ContextPacker(token_budget=1000, min_overlap_words=1, duplicate_jaccard=0.8)
+    chunks = _page_chunks("/lean", _words("w", 28))
+    packed = packer.pack([chunks[0], chunks[2]])
+    assert packed.merged == 0
+    assert packed.passages == 2
+
+
+def test_chunks_without_chunk_index_fall_back_to_overlap_matching():
+    packer = ContextPacker(token_budget=1000, min_overlap_words=3, duplicate_jaccard=0.8)
+    words = _words("w", 16)
+    first, second = _page_chunks("/lean", words)
+    for chunk in (first, second):
+        del chunk["metadata"]["chunk_index"]
+    packed = packer.pack([second, first])
+    assert packed.merged == 1
+    assert packed.text == "Source Page (/lean): " + " ".join(words)
+
+
+def _result(path, text):
+    return {"document": text, "metadata": {"path": path}, "distance": 0.2}
+
+
+def test_passages_over_budget_are_skipped_in_rank_order():
+    packer = ContextPacker(token_budget=60, min_overlap_words=5, duplicate_jaccard=0.8)
+    best = _result("/a", " ".join(_words("a", 20)))
+    too_big = _result("/b", " ".join(_words("b", 40)))
+    small = _result("/c", " ".join(_words("c", 5)))
+
+    packed = packer.pack([best, too_big, small])
+
+    assert packed.passages == 2
+    assert packed.dropped_budget == 1
+    assert packed.packed_tokens <= 60
+    assert packed.text.index("(/a)") < packed.text.index("(/c)")
+    assert "(/b)" not in packed.text
+
+
+def test_first_passage_alone_over_budget_is_truncated_on_a_word_boundary():
+    packer = ContextPacker(token_budget=20, min_overlap_words=5, duplicate_jaccard=0.8)
+    words = _words("w", 50)
+
+    packed = packer.pack([_result("/a", " ".join(words))])
+
+    assert packed.passages == 1
+    assert packed.packed_tokens <= 20
+    kept = packed.text[len("Source Page (/a): "):].split()
+    assert kept == words[: len(kept)]
+
+
+def test_duplicate_passages_from_other_pages_are_dropped():
+    packer = ContextPacker(token_budget=1000, min_overlap_words=5, duplicate_jaccard=0.8)
+    boilerplate = " ".join(_words("footer", 12))
+
+    packed = packer.pack([_result("/a", boilerplate), _result("/b", boilerplate)])
+
+    assert packed.passages == 1
+    assert packed.dropped_duplicates == 1
+    stats = packer.stats()
+    assert stats["packs"] == 1
+    assert stats["tokens_saved"] == stats["raw_tokens"] - stats["packed_tokens"] > 0
@@ -0,0 +1,68 @@
+"""Index-time deduplication (app/dedup.py): boilerplate blocks and MinHash near-duplicates."""
+
+import numpy as np
+
+from app.dedup import ChunkDeduplicator, MinHasher, block_fingerprint, find_boilerplate_blocks
+
+
+BLURB = (
+    "our lean six sigma green belt course covers define measure analyse improve and control "
+    "with hands on projects weekly coaching and a final certification exam for every participant"
+)
+OTHER = (
+    "iso 9001 internal auditor training explains clauses audit planning evidence sampling "
+    "nonconformity reports and corrective actions for manufacturing and service organisations"
+)
+
+
+def _dedup(threshold=0.85):
+    return ChunkDeduplicator(set(), threshold=threshold, num_perm=64, bands=16)
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(128)
+    same = np.mean(hasher.signature(BLURB) == hasher.signature(BLURB.upper()))
+    different = np.mean(hasher.signature(BLURB) == hasher.signature(OTHER))
+
+    assert same == 1.0
+    assert different < 0.1
+
+
+def test_near_duplicate_chunk_is_removed():
+    dedup = _dedup()
+    near_copy = BLURB.replace("participant", "learner")  # only the last shingle differs
+
+    assert dedup.keep("a-0000", BLURB)
+    assert not dedup.keep("b-0000", near_copy)
+    assert dedup.keep("c-0000", OTHER)
+
+    stats = dedup.stats()
+    assert stats["chunks_checked"] == 3
+    assert stats["near_duplicate_chunks_removed"] == 1
+    assert stats["near_duplicate_bytes_removed"] == len(near_copy.encode("utf-8"))
+
+
+def test_chunks_from_unchanged_pages_are_registered_for_comparison():
+    dedup = _dedup()
+    dedup.add_existing("kept-0000", BLURB)
+
+    assert not dedup.keep("new-0000", BLURB)
+    assert dedup.stats()["chunks_checked"] == 1
+
+
+def test_boilerplate_blocks_need_enough_pages():
+    footer = block_fingerprint("Contact us for a free consultation".split())
+    course = block_fingerprint("Green Belt course outline".split())
+    pages = [[footer, course], [footer], [footer], [footer]]
+
+    boilerplate = find_boilerplate_blocks(pages, min_pages=3, min_share=0.5)
+
+    assert boilerplate == {footer}
+    dedup = ChunkDeduplicator(boilerplate)
+    assert dedup.is_boilerplate(footer, ["Contact", "us"])
+    assert not dedup.is_boilerplate(course, ["Green", "Belt"])
+    assert dedup.stats()["boilerplate_blocks_removed"] == 1
+
+
+def test_fingerprints_ignore_case():
+    assert block_fingerprint(["Contact", "Us"]) == block_fingerprint(["contact", "us"])
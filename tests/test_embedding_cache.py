@@ -0,0 +1,62 @@
+"""Shared query-embedding LRU (app/embedding_cache.py): keys, eviction and read-only vectors."""
+
+import numpy as np
+import pytest
+
+from app.embedding_cache import EmbeddingLRUCache, normalize_text
+
+
+def _vec(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_query_variants_share_one_key():
+    assert normalize_text("  What is   LEAN?\n") == normalize_text("what is lean?")
+    assert normalize_text("ＬＥＡＮ") == "lean"  # full-width NFKC folding
+
+
+def test_hits_return_the_stored_read_only_vector():
+    cache = EmbeddingLRUCache(max_entries=4, max_bytes=1 << 20)
+    stored = cache.put("what is lean?", [0.5, 0.5, 0.5, 0.5])
+
+    hit = cache.get("what is lean?")
+    assert hit is stored
+    assert hit.dtype == np.float32
+    with pytest.raises(ValueError):
+        hit[0] = 1.0
+    assert cache.get("unknown") is None
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_by_count():
+    cache = EmbeddingLRUCache(max_entries=2, max_bytes=1 << 20)
+    cache.put("a", _vec(1))
+    cache.put("b", _vec(2))
+    cache.get("a")  # "b" is now the least recently used
+    cache.put("c", _vec(3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_bounds_the_cache():
+    entry_bytes = _vec(0).nbytes + 1
+    cache = EmbeddingLRUCache(max_entries=100, max_bytes=3 * entry_bytes)
+    for key in "abcde":
+        cache.put(key, _vec(0))
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] == 3 * entry_bytes
+    assert cache.get("a") is None and cache.get("e") is not None
+
+
+def test_overwriting_a_key_keeps_the_byte_count_exact():
+    cache = EmbeddingLRUCache(max_entries=4, max_bytes=1 << 20)
+    cache.put("a", _vec(1))
+    cache.put("a", _vec(2))
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == _vec(0).nbytes + 1
+    assert cache.get("a")[0] == 2
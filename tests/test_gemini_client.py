@@ -0,0 +1,56 @@
+"""Async Gemini helpers (app/gemini_client.py) against an in-process transport."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import gemini_client
+
+
+def _answer(text: str) -> dict:
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Route the pooled clients to a handler instead of the network."""
+    calls = {"n": 0}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls["n"] += 1
+        if request.url.path.endswith(":streamGenerateContent"):
+            body = "".join(f"data: {json.dumps(_answer(w))}\n\n" for w in ("Lean ", "works"))
+            return httpx.Response(200, text=body)
+        if calls["n"] == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json=_answer("Hello"))
+
+    base = gemini_client._client_kwargs
+    monkeypatch.setattr(gemini_client, "_client_kwargs", lambda: {**base(), "http2": False, "transport": httpx.MockTransport(handler)})
+    monkeypatch.setattr(gemini_client, "_backoff_delay", lambda attempt, exc: 0.0)
+    monkeypatch.setattr(gemini_client, "_async_clients", {})
+    return calls
+
+
+def test_agenerate_content_retries_then_returns_json(transport):
+    async def run():
+        try:
+            return await gemini_client.agenerate_content({"contents": []})
+        finally:
+            await gemini_client.aclose_clients()
+
+    result = asyncio.run(run())
+    assert gemini_client.extract_text(result, "") == "Hello"
+    assert transport["n"] == 2
+
+
+def test_astream_generate_content_yields_fragments(transport):
+    async def run():
+        try:
+            return [t async for t in gemini_client.astream_generate_content({"contents": []})]
+        finally:
+            await gemini_client.aclose_clients()
+
+    assert asyncio.run(run()) == ["Lean ", "works"]
@@ -0,0 +1,115 @@
+"""Streaming index pipeline (app/index_pipeline.py): parsing, chunking and batched upserts."""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app import index_pipeline
+from app.index_pipeline import PageTextParser, extract_page, iter_batches, iter_blocks, iter_chunks
+
+
+PAGE = """
+<html><head><title>Lean Training</title><script>var tracking = 1;</script></head>
+<body>
+  <nav><a href="/contact">Contact</a> Home Services</nav>
+  <h1>Green Belt</h1>
+  <p>Five day course with a project.</p>
+  <h2>Exam</h2>
+  <ul><li>Online exam</li><li>Certificate</li></ul>
+  <footer>Copyright Leanext</footer>
+</body></html>
+"""
+
+
+def _blocks(html, piece_chars):
+    parser = PageTextParser("https://leanext.example/lean")
+    pieces = [html[i:i + piece_chars] for i in range(0, len(html), piece_chars)]
+    return parser, list(iter_blocks(parser, pieces))
+
+
+def test_parser_skips_boilerplate_and_tags_words_with_headings():
+    parser, blocks = _blocks(PAGE, 10_000)
+
+    assert parser.title == "Lean Training"
+    assert parser.headings == ["Green Belt", "Exam"]
+    assert [" ".join(w for w, _ in b) for b in blocks] == [
+        "Green Belt", "Five day course with a project.", "Exam", "Online exam", "Certificate",
+    ]
+    assert blocks[1][0] == ("Five", 0)
+    assert blocks[3][0] == ("Online", 1)
+    text = " ".join(w for b in blocks for w, _ in b)
+    assert "tracking" not in text and "Copyright" not in text and "Home" not in text
+
+
+@pytest.mark.parametrize("piece_chars", [1, 7, 64])
+def test_words_cut_between_pieces_are_rejoined(piece_chars):
+    whole_parser, whole = _blocks(PAGE, 10_000)
+    parser, pieces = _blocks(PAGE, piece_chars)
+
+    assert pieces == whole
+    assert (parser.title, parser.headings) == (whole_parser.title, whole_parser.headings)
+
+
+def test_extract_page_hashes_the_extracted_words():
+    page = extract_page(PAGE, "https://leanext.example/lean")
+    words = "Green Belt Five day course with a project. Exam Online exam Certificate"
+
+    assert page["text_hash"] == hashlib.sha256(words.encode("utf-8")).hexdigest()
+    assert page["word_count"] == len(words.split())
+    assert len(page["block_fingerprints"]) == 5
+    # Script and footer changes do not count as a content change
+    restyled = PAGE.replace("tracking = 1", "tracking = 2").replace("Copyright", "(c)")
+    assert extract_page(restyled, "https://leanext.example/lean")["text_hash"] == page["text_hash"]
+
+
+def test_chunks_overlap_and_cover_every_word():
+    words = [(f"w{i}", -1) for i in range(25)]
+
+    chunks = list(iter_chunks(words, size=10, overlap=4))
+
+    assert [len(c) for c in chunks] == [10, 10, 10, 7]
+    assert chunks[1][:4] == chunks[0][-4:]
+    assert chunks[-1][-1] == ("w24", -1)
+    assert list(iter_chunks(words[:10], size=10, overlap=4)) == [words[:10]]
+
+
+def test_batches_have_a_fixed_size():
+    assert [len(b) for b in iter_batches(range(7), batch_size=3)] == [3, 3, 1]
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, documents, **kwargs):
+        self.calls.append(len(documents))
+        return np.ones((len(documents), 4), dtype=np.float32)
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.upserts = []
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.upserts.append((ids, documents, metadatas))
+
+
+def test_index_pages_embeds_and_upserts_chunk_records(monkeypatch):
+    model = _FakeModel()
+    monkeypatch.setattr(index_pipeline, "get_embedding_model", lambda: model)
+    monkeypatch.setattr(index_pipeline, "iter_page_blocks", lambda parser, url, text_hash: iter_blocks(parser, [PAGE]))
+    collection = _FakeCollection()
+    pages = [(url, {"text_hash": "h", "title": "Lean"}) for url in ("https://leanext.example/a", "https://leanext.example/b")]
+
+    written = index_pipeline.index_pages(collection, pages)
+
+    assert sorted(written) == [url for url, _ in pages]
+    ids, documents, metadatas = collection.upserts[0]
+    assert model.calls == [len(ids)] == [2]
+    assert documents[0].startswith("Green Belt Five day course")
+    assert metadatas[0]["path"] == "/a"
+    assert metadatas[0]["chunk_index"] == 0
+    assert metadatas[0]["headings"] == '["Green Belt", "Exam"]'
@@ -0,0 +1,115 @@
+"""Incremental re-index (app/indexer.py): pages whose text hash is unchanged are skipped."""
+
+import json
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app import indexer
+from app.crawler import CrawlResult
+from app.dedup import boilerplate_digest
+
+
+class _FakeCollection:
+    def __init__(self, chunks):
+        self.chunks = dict(chunks)
+        self.deleted_ids = []
+        self.deleted_pages = []
+
+    def count(self):
+        return len(self.chunks)
+
+    def delete(self, ids=None, where=None):
+        for chunk_id in ids or []:
+            self.deleted_ids.append(chunk_id)
+            self.chunks.pop(chunk_id, None)
+        if where:
+            self.deleted_pages.append(where["canonical"])
+
+    def get(self, ids, include):
+        return {"ids": ids, "documents": [self.chunks.get(i, "") for i in ids]}
+
+
+def _page(url, text_hash, fingerprint):
+    return {"canonical": url, "text_hash": text_hash, "title": url, "block_fingerprints": [fingerprint]}
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Two indexed pages in the manifest; the crawl and the pipeline are replaced per test."""
+    manifest_path = tmp_path / "manifest.json"
+    monkeypatch.setattr(indexer, "CRAWL_MANIFEST_PATH", str(manifest_path))
+    monkeypatch.setattr(indexer, "CRAWL_SUMMARY_PATH", str(tmp_path / "last_run_summary.json"))
+    monkeypatch.setattr(indexer, "has_cached_html", lambda url: True)
+    monkeypatch.setattr(indexer, "cached_files", lambda url: {})
+    monkeypatch.setattr(indexer, "remove_cached_page", lambda url: None)
+    monkeypatch.setattr(indexer, "publish_kb_version", lambda collection, summary: "v-test")
+
+    indexer.save_manifest(
+        {
+            "https://x/lean": {"text_hash": "lean-v1", "chunk_ids": ["lean-0000"]},
+            "https://x/iso": {"text_hash": "iso-v1", "chunk_ids": ["iso-0000"]},
+        },
+        boilerplate_digest(set()),
+    )
+    indexed = []
+
+    def _index_pages(collection, pages, dedup):
+        indexed.extend(url for url, _page in pages)
+        return {url: [f"{url}-new"] for url, _page in pages}
+
+    monkeypatch.setattr(indexer, "index_pages", _index_pages)
+    collection = _FakeCollection({"lean-0000": "lean text", "iso-0000": "iso text"})
+    return collection, indexed, manifest_path
+
+
+def _crawl_returns(monkeypatch, results):
+    monkeypatch.setattr(indexer, "crawl_site", lambda parse, previous: ({}, results))
+
+
+def test_unchanged_pages_are_not_reindexed(site, monkeypatch):
+    collection, indexed, manifest_path = site
+    _crawl_returns(monkeypatch, [
+        CrawlResult("https://x/lean", 0, 304, "not_modified", _page("https://x/lean", "lean-v1", 1), {}),
+        CrawlResult("https://x/iso", 0, 200, "fetched", _page("https://x/iso", "iso-v2", 2), {}),
+    ])
+
+    summary = indexer.run_incremental_index(collection)
+
+    assert indexed == ["https://x/iso"]
+    assert "lean-0000" not in collection.deleted_ids
+    assert collection.deleted_ids == ["iso-0000"]
+    assert summary["diff"]["unchanged"] == 1
+    assert summary["diff"]["changed"] == ["https://x/iso"]
+    pages = json.loads(manifest_path.read_text())["pages"]
+    assert pages["https://x/lean"]["chunk_ids"] == ["lean-0000"]
+    assert pages["https://x/iso"]["chunk_ids"] == ["https://x/iso-new"]
+    assert pages["https://x/iso"]["text_hash"] == "iso-v2"
+
+
+def test_force_reindexes_every_page(site, monkeypatch):
+    collection, indexed, _manifest_path = site
+    _crawl_returns(monkeypatch, [
+        CrawlResult("https://x/lean", 0, 200, "fetched", _page("https://x/lean", "lean-v1", 1), {}),
+        CrawlResult("https://x/iso", 0, 200, "fetched", _page("https://x/iso", "iso-v1", 2), {}),
+    ])
+
+    summary = indexer.run_incremental_index(collection, force=True)
+
+    assert sorted(indexed) == ["https://x/iso", "https://x/lean"]
+    assert summary["diff"]["unchanged"] == 0
+
+
+def test_pages_missing_from_a_clean_crawl_are_removed(site, monkeypatch):
+    collection, indexed, manifest_path = site
+    _crawl_returns(monkeypatch, [
+        CrawlResult("https://x/lean", 0, 304, "not_modified", _page("https://x/lean", "lean-v1", 1), {}),
+    ])
+
+    summary = indexer.run_incremental_index(collection)
+
+    assert indexed == []
+    assert summary["diff"]["removed"] == ["https://x/iso"]
+    assert "iso-0000" in collection.deleted_ids
+    assert "https://x/iso" not in json.loads(manifest_path.read_text())["pages"]
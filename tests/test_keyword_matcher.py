@@ -0,0 +1,62 @@
+"""Compiled keyword matchers (app/keyword_matcher.py) compared with the old substring checks."""
+
+import pytest
+
+from app.Day_19_A import LEAD_TRIGGER_KEYWORDS, SMALL_TALK_TRIGGERS
+from app.keyword_matcher import LEAD_TRIGGER_MATCHER, SMALL_TALK_MATCHER, KeywordMatcher
+
+
+def _old_lead_trigger(query):
+    """The check calculate_lead_score used before the matcher."""
+    lower_query = query.lower()
+    return any(keyword in lower_query for keyword in LEAD_TRIGGER_KEYWORDS)
+
+
+def _old_small_talk(query):
+    """The check check_small_talk used before the matcher."""
+    normalized_query = query.lower()
+    for key, response in SMALL_TALK_TRIGGERS.items():
+        if key in normalized_query:
+            return key
+    return None
+
+
+@pytest.mark.parametrize("query", [
+    "Do you offer a six sigma certification?",
+    "Can I book a demo?",
+    "Tell me about your consulting services",
+])
+def test_lower_case_triggers_match_like_before(query):
+    assert LEAD_TRIGGER_MATCHER.matches(query) is _old_lead_trigger(query) is True
+
+
+@pytest.mark.parametrize("query", ["Do you sell ERP software?", "Is there an LMS?", "Explain LEAN"])
+def test_upper_case_config_entries_now_match(query):
+    # The old test lower-cased the query but not the keyword, so "ERP" never fired
+    assert LEAD_TRIGGER_MATCHER.matches(query)
+
+
+@pytest.mark.parametrize("query", ["Any demonstrations nearby?", "Do you publish discourses on quality?"])
+def test_keywords_inside_other_words_no_longer_match(query):
+    assert _old_lead_trigger(query)
+    assert not LEAD_TRIGGER_MATCHER.matches(query)
+
+
+def test_lean_does_not_fire_inside_leanext():
+    assert not LEAD_TRIGGER_MATCHER.matches("Where is Leanext located?")
+    assert LEAD_TRIGGER_MATCHER.first("Is Leanext good at lean?") == "LEAN"
+
+
+def test_small_talk_needs_whole_words():
+    assert _old_small_talk("othello themes") == "hello"
+    assert SMALL_TALK_MATCHER.first("othello themes") is None
+    assert SMALL_TALK_MATCHER.first("Hello there!") == "hello"
+    assert SMALL_TALK_MATCHER.first("So, how   are you today?") == "how are you"
+
+
+def test_longest_phrase_wins_and_hits_are_unique():
+    matcher = KeywordMatcher(["lean", "lean master", "demo"])
+
+    assert matcher.first("Become a Lean Master") == "lean master"
+    assert matcher.find_all("demo of lean, then another demo") == ["demo", "lean"]
+    assert KeywordMatcher([]).first("anything") is None
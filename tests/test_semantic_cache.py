@@ -0,0 +1,111 @@
+"""Semantic answer cache (app/semantic_cache.py) over a throwaway chat_cache.db."""
+
+import hashlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+from app import semantic_cache
+from app.semantic_cache import SemanticAnswerCache
+
+
+def _vector(text: str) -> np.ndarray:
+    """Deterministic unit vector per text (stands in for the embedding model)."""
+    seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+    v = np.random.default_rng(seed).standard_normal(16).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def model_ready(monkeypatch):
+    state = {"ready": True}
+    monkeypatch.setattr(semantic_cache, "is_embedding_model_ready", lambda: state["ready"])
+    monkeypatch.setattr(semantic_cache, "embed_query_vector", _vector)
+    monkeypatch.setattr(semantic_cache, "embed_query_vectors", lambda texts: [_vector(t) for t in texts])
+    return state
+
+
+@pytest.fixture
+def cache(tmp_path, model_ready):
+    return SemanticAnswerCache(str(tmp_path / "chat_cache.db"), str(tmp_path / "vectors.bin"), threshold=0.9)
+
+
+def test_pregenerated_faq_hits_while_model_is_loading(cache, model_ready):
+    cache.save("What is Lean Six Sigma?", "A method.", "FAQ", index_version="v1")
+    cache.set_index_version("v1")
+    model_ready["ready"] = False
+
+    assert cache.lookup("What is Lean Six Sigma?") == ("A method.", "FAQ", "What is Lean Six Sigma?", 1.0)
+    assert cache.lookup("Something never asked") is None
+    assert cache.stats()["exact_hits_cold_start"] == 1
+
+
+def test_cold_start_exact_hit_skips_other_index_versions(cache, model_ready):
+    cache.save("What is Lean Six Sigma?", "Old answer.", "FAQ", index_version="v1")
+    cache.set_index_version("v2")
+    model_ready["ready"] = False
+
+    assert cache.lookup("What is Lean Six Sigma?") is None
+
+
+@pytest.mark.parametrize("query", ["How much does it cost?", "and for hospitals?", "Tell me more"])
+def test_followups_with_history_bypass_the_cache(cache, query):
+    history = "What is your Lean Six Sigma Green Belt course?"
+    cache.save(query, "Answer for one conversation.", "RAG")
+
+    assert cache.save(query, "Answer for another conversation.", "RAG", history=history) is False
+    assert cache.lookup(query, history=history) is None
+    assert cache.lookup(query) == ("Answer for one conversation.", "RAG", query, pytest.approx(1.0))
+    assert cache.stats()["followups_bypassed"] == 2
+
+
+def test_standalone_question_with_history_still_uses_the_cache(cache):
+    query = "What does the Lean Six Sigma Green Belt course include?"
+    assert cache.save(query, "Five modules.", "RAG", history="Do you offer ISO training?")
+    assert cache.lookup(query, history="Do you offer ISO training?")[0] == "Five modules."
+    assert semantic_cache.is_history_dependent(query, "") is False
+
+
+def test_paraphrase_hit_and_unrelated_miss(cache, monkeypatch):
+    cache.save("What is Lean Six Sigma?", "A method.", "RAG")
+    # The paraphrase embeds close to the stored question, the other question does not
+    stored = _vector("What is Lean Six Sigma?")
+    monkeypatch.setattr(
+        semantic_cache, "embed_query_vector",
+        lambda text: stored if text == "Explain lean six sigma" else _vector(text),
+    )
+
+    answer, source, matched_query, similarity = cache.lookup("Explain lean six sigma")
+    assert (answer, source, matched_query) == ("A method.", "RAG", "What is Lean Six Sigma?")
+    assert similarity == pytest.approx(1.0)
+    assert cache.lookup("Do you offer ISO 9001 audits?") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_answers_from_an_old_index_version_are_skipped(cache):
+    cache.save("What is Lean Six Sigma?", "Old answer.", "RAG", index_version="v1")
+    cache.save("Who founded Leanext?", "Curated answer.", "FAQ")
+    cache.set_index_version("v2")
+
+    assert cache.lookup("What is Lean Six Sigma?") is None
+    assert cache.lookup("Who founded Leanext?")[0] == "Curated answer."
+    assert cache.stats()["stale_entries"] == 1
+
+    cache.save("What is Lean Six Sigma?", "New answer.", "RAG", index_version="v2")
+    assert cache.lookup("What is Lean Six Sigma?")[0] == "New answer."
+    assert cache.stats()["stale_entries"] == 0
+
+
+def test_answers_saved_by_another_worker_are_served(tmp_path, model_ready):
+    paths = str(tmp_path / "chat_cache.db"), str(tmp_path / "vectors.bin")
+    worker_a = SemanticAnswerCache(*paths, threshold=0.9)
+    worker_b = SemanticAnswerCache(*paths, threshold=0.9)
+    assert worker_b.lookup("What is Lean Six Sigma?") is None
+
+    worker_a.save("What is Lean Six Sigma?", "A method.", "RAG")
+
+    assert worker_b.lookup("What is Lean Six Sigma?")[0] == "A method."
@@ -0,0 +1,80 @@
+"""Single-flight coalescing (app/single_flight.py): duplicate in-flight calls share one run."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.single_flight import SingleFlight
+
+
+def _leader_and_duplicates(flight, key, fn, duplicates):
+    """Start a leader for `key`, then `duplicates` callers that join while it is blocked."""
+    started, release = threading.Event(), threading.Event()
+
+    def _work():
+        started.set()
+        release.wait(5)
+        return fn()
+
+    pool = ThreadPoolExecutor(max_workers=duplicates + 1)
+    leader = pool.submit(flight.do, key, _work)
+    assert started.wait(5)
+    waiters = [pool.submit(flight.do, key, _work) for _ in range(duplicates)]
+    while flight.stats()["coalesced"] < duplicates:
+        time.sleep(0.01)
+    release.set()
+    pool.shutdown(wait=True)
+    return leader, waiters
+
+
+def test_concurrent_duplicates_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    leader, waiters = _leader_and_duplicates(flight, "what is lean", lambda: calls.append(1) or "answer", 3)
+
+    assert leader.result() == "answer"
+    assert [w.result() for w in waiters] == ["answer"] * 3
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert stats["executions"] == 1
+    assert stats["coalesced"] == 3
+    assert stats["in_flight"] == 0
+
+
+def test_waiters_receive_the_leaders_exception():
+    flight = SingleFlight("test")
+
+    def _fail():
+        raise RuntimeError("gemini down")
+
+    leader, waiters = _leader_and_duplicates(flight, "q", _fail, 2)
+
+    for future in [leader] + waiters:
+        with pytest.raises(RuntimeError, match="gemini down"):
+            future.result()
+
+
+def test_finished_flight_is_not_a_cache():
+    flight = SingleFlight("test")
+    calls = []
+
+    flight.do("q", lambda: calls.append(1))
+    flight.do("q", lambda: calls.append(1))
+
+    assert len(calls) == 2
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_begin_and_finish_for_streaming_leaders():
+    flight = SingleFlight("test")
+    future, leader = flight.begin("q")
+    waiter_future, waiter_is_leader = flight.begin("q")
+
+    assert leader and not waiter_is_leader
+    assert waiter_future is future
+    flight.finish("q", future, "streamed answer")
+    assert waiter_future.result(timeout=1) == "streamed answer"
+    assert flight.begin("other")[1] is True
@@ -0,0 +1,44 @@
+"""Local spell-correction gate (app/spell_corrector.py): acronyms and short words."""
+
+import pytest
+
+from app.spell_corrector import SymSpellCorrector
+
+
+@pytest.fixture
+def corrector():
+    c = SymSpellCorrector(max_edit_distance=2, confidence_threshold=0.8)
+    for word in "what is one whats help is lean six sigma training management system".split():
+        c.add_word(word, count=5)
+    for word in "some any can not on site available".split():
+        c.add_word(word, count=5)
+    c.add_compound("six sigma")
+    return c
+
+
+@pytest.mark.parametrize("query", ["what is OEE", "ISO 9001 help", "whats IMS", "ISO9001 help"])
+def test_acronyms_and_codes_are_left_alone(corrector, query):
+    assert corrector.try_local(query) == query
+
+
+def test_short_unknown_word_escalates_instead_of_guessing(corrector):
+    # "oee" is one edit from "one" but too short to correct safely
+    assert corrector.correct("what is oee").text == "what is oee"
+    assert corrector.try_local("what is oee") is None
+    assert corrector.stats()["escalated_to_gemini"] == 1
+
+
+def test_longer_typos_are_still_corrected_locally(corrector):
+    assert corrector.try_local("lean sixsigma traning") == "lean six sigma training"
+    assert corrector.try_local("Managment systm") == "Management system"
+
+
+@pytest.mark.parametrize("word", ["someone", "anyone", "cannot", "onsite"])
+def test_real_words_are_not_split_into_known_halves(corrector, word):
+    query = f"is {word} available"
+    assert corrector.correct(query).text == query
+    assert corrector.try_local(query) is None
+
+
+def test_known_domain_compound_is_split(corrector):
+    assert corrector.try_local("sixsigma training") == "six sigma training"
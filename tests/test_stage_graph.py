@@ -0,0 +1,90 @@
+"""Per-turn stage graph (app/stage_graph.py): dependency order, laziness, soft deps, cancel."""
+
+import threading
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+
+from app.stage_graph import StageGraph
+
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def test_stages_run_after_their_dependencies_with_their_results(pool):
+    order = []
+    lock = threading.Lock()
+
+    def stage(name, value):
+        def _fn(**deps):
+            with lock:
+                order.append(name)
+            return value + sum(deps.values())
+        return _fn
+
+    graph = StageGraph(pool)
+    graph.add("translate", stage("translate", 1))
+    graph.add("clean", stage("clean", 10), deps=["translate"])
+    graph.add("retrieve", stage("retrieve", 100), deps=["translate"])
+    graph.add("generate", stage("generate", 1000), deps=["clean", "retrieve"])
+
+    assert graph.result("generate", timeout=5) == 1000 + (10 + 1) + (100 + 1)
+    assert order[0] == "translate"
+    assert order[-1] == "generate"
+    assert sorted(order[1:3]) == ["clean", "retrieve"]
+
+
+def test_stages_are_lazy(pool):
+    ran = []
+    graph = StageGraph(pool)
+    graph.add("cache", lambda: ran.append("cache") or None)
+    graph.add("generate", lambda cache: ran.append("generate"), deps=["cache"])
+
+    graph.result("cache", timeout=5)
+
+    assert ran == ["cache"]
+
+
+def test_dependency_failure_fails_dependents_without_running_them(pool):
+    ran = []
+
+    def _fail():
+        raise RuntimeError("translation failed")
+
+    graph = StageGraph(pool)
+    graph.add("translate", _fail)
+    graph.add("clean", lambda translate: ran.append("clean"), deps=["translate"])
+
+    with pytest.raises(RuntimeError, match="translation failed"):
+        graph.result("clean", timeout=5)
+    assert ran == []
+
+
+def test_soft_dependency_completes_with_the_returned_stage(pool):
+    graph = StageGraph(pool)
+    graph.add("draft", lambda: "draft context")
+    graph.add("retrieve", lambda: graph.future("draft"))
+
+    assert graph.result("retrieve", timeout=5) == "draft context"
+
+
+def test_cancelled_stage_never_runs(pool):
+    ran = []
+    gate = threading.Event()
+    graph = StageGraph(pool)
+    graph.add("translate", lambda: gate.wait(5))
+    graph.add("clean", lambda translate: ran.append("clean"), deps=["translate"])
+
+    graph.start("clean")
+    graph.cancel("clean")
+    gate.set()
+
+    with pytest.raises(CancelledError):
+        graph.result("clean", timeout=5)
+    graph.result("translate", timeout=5)
+    pool.shutdown(wait=True)
+    assert ran == []
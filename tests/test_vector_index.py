@@ -0,0 +1,82 @@
+"""In-memory NumPy index (app/vector_index.py) against Chroma's own .query()."""
+
+import uuid
+
+import numpy as np
+import pytest
+
+chromadb = pytest.importorskip("chromadb")
+from chromadb.config import Settings
+
+from app.vector_index import InMemoryVectorIndex, match_where
+
+
+def _collection(space):
+    client = chromadb.EphemeralClient(Settings(anonymized_telemetry=False))
+    collection = client.create_collection(f"kb-{uuid.uuid4().hex[:12]}", metadata={"hnsw:space": space})
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((30, 8)).astype(np.float32)
+    # MiniLM embeddings are unit length; only then is Chroma's l2 a function of cosine
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    collection.add(
+        ids=[f"chunk-{i:02d}" for i in range(30)],
+        embeddings=embeddings.tolist(),
+        documents=[f"document {i}" for i in range(30)],
+        metadatas=[{"path": "/lean" if i % 3 else "/iso", "chunk_index": i} for i in range(30)],
+    )
+    return collection, rng
+
+
+@pytest.mark.parametrize("space", ["l2", "cosine"])
+def test_top_k_matches_chroma(space):
+    collection, rng = _collection(space)
+    index = InMemoryVectorIndex.from_collection(collection)
+    query = rng.standard_normal(8).astype(np.float32)
+    query /= np.linalg.norm(query)
+
+    ours = index.query(query, n_results=5)
+    theirs = collection.query(query_embeddings=[query.tolist()], n_results=5)
+
+    assert ours["ids"] == theirs["ids"]
+    assert ours["documents"] == theirs["documents"]
+    assert ours["metadatas"] == theirs["metadatas"]
+    np.testing.assert_allclose(ours["distances"][0], theirs["distances"][0], atol=1e-4)
+
+
+def test_where_filter_matches_chroma():
+    collection, rng = _collection("cosine")
+    index = InMemoryVectorIndex.from_collection(collection)
+    query = rng.standard_normal(8).astype(np.float32)
+    where = {"$and": [{"path": "/lean"}, {"chunk_index": {"$gte": 10}}]}
+
+    ours = index.query(query, n_results=4, where=where)
+    theirs = collection.query(query_embeddings=[query.tolist()], n_results=4, where=where)
+
+    assert ours["ids"] == theirs["ids"]
+
+
+def test_batch_equals_single_queries():
+    collection, rng = _collection("cosine")
+    index = InMemoryVectorIndex.from_collection(collection)
+    queries = rng.standard_normal((3, 8)).astype(np.float32)
+
+    batch = index.query_batch(queries, n_results=3)
+
+    for i, query in enumerate(queries):
+        assert index.query(query, n_results=3)["ids"][0] == batch["ids"][i]
+
+
+def test_empty_index_returns_empty_rows():
+    index = InMemoryVectorIndex([], [], [], [])
+    assert index.query_batch(np.ones((2, 4)), n_results=3)["ids"] == [[], []]
+
+
+@pytest.mark.parametrize("where, expected", [
+    ({"path": "/lean"}, True),
+    ({"path": {"$ne": "/lean"}}, False),
+    ({"chunk_index": {"$in": [1, 2]}}, True),
+    ({"$or": [{"path": "/iso"}, {"chunk_index": {"$lt": 1}}]}, False),
+    ({"missing": {"$gt": 0}}, False),
+])
+def test_match_where(where, expected):
+    assert match_where({"path": "/lean", "chunk_index": 2}, where) is expected